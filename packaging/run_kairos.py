@@ -1,3 +1,6 @@
+from multiprocessing import freeze_support
 from kairos.main import main
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # frozen builds: worker processes (mailbox parsing) re-enter this script
+    freeze_support()
+    main()
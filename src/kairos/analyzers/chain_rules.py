@@ -1,5 +1,7 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, Set, Tuple
 from ..collectors.processes import ProcInfo
+from ..core import matcher
+from .proc_tree import ProcTree
 
 # Parents that shouldn't spawn scripting/LOLBINs in normal use
 OFFICE = {"winword.exe", "excel.exe", "powerpnt.exe", "outlook.exe", "onenote.exe", "visio.exe"}
@@ -10,10 +12,44 @@ SCRIPTY = {"powershell.exe", "wscript.exe", "cscript.exe", "mshta.exe", "rundll3
 SUSP_CMD_KEYWORDS = [
     " -enc", "downloadstring", "invoke-webrequest", "bitsadmin", "frombase64string"
 ]
+_KEYWORDS_ID = matcher.register("chains.keywords", SUSP_CMD_KEYWORDS)
 
-def find_suspicious_proc_chains(procs: List[ProcInfo]) -> List[Dict]:
+# Fixed ancestry patterns (oldest first, last element = flagged process).
+# Any length works; each is matched in O(len(pattern)) per process.
+ANCESTRY_PATTERNS: List[Tuple[str, List[Set[str]]]] = [
+    ("wmi-exec", [{"wmiprvse.exe"}, SCRIPTY]),
+    ("service-shell", [{"services.exe"}, {"cmd.exe"}, {"powershell.exe"}]),
+    ("script-relay", [{"wscript.exe", "cscript.exe", "mshta.exe"}, {"cmd.exe", "powershell.exe"}, {"rundll32.exe", "regsvr32.exe"}]),
+]
+
+# how many scripty hops we follow looking for an office/browser/mail origin
+MAX_CHAIN_DEPTH = 8
+
+def _risky_origin(name: str) -> bool:
+    return name in OFFICE or name in BROWSERS or name in MAILERS
+
+def _fmt_chain(chain: List[ProcInfo]) -> str:
+    return " -> ".join(f"{c.name} (pid={c.pid})" for c in chain)
+
+def _scripty_origin(tree: ProcTree, p: ProcInfo) -> Optional[List[ProcInfo]]:
+    """
+    Walk up through scripty intermediates (cmd -> powershell -> ...) and return
+    the chain (oldest first) if it starts at an office/browser/mail process.
+    """
+    chain = [p]
+    for anc in tree.ancestors(p.pid, max_depth=MAX_CHAIN_DEPTH):
+        chain.append(anc)
+        if _risky_origin(anc.name):
+            chain.reverse()
+            return chain
+        if anc.name not in SCRIPTY:
+            return None
+    return None
+
+def find_suspicious_proc_chains(procs: List[ProcInfo], tree: Optional[ProcTree] = None) -> List[Dict]:
     """Return artifacts (type=process) describing suspicious parent->child relationships."""
     arts: List[Dict] = []
+    tree = tree or ProcTree(procs)
     for p in procs:
         child = p.name
         parent = (p.parent_name or "")
@@ -21,18 +57,27 @@ def find_suspicious_proc_chains(procs: List[ProcInfo]) -> List[Dict]:
             continue
 
         # suspicious child?
-        child_is_scripty = child in SCRIPTY or any(k in (p.cmdline or "") for k in SUSP_CMD_KEYWORDS)
-        if not child_is_scripty:
-            continue
+        child_is_scripty = child in SCRIPTY or matcher.matches(p.cmdline or "", _KEYWORDS_ID)
+        if child_is_scripty:
+            if _risky_origin(parent):
+                arts.append({
+                    "type": "process",  # normalize so policy counts this under process
+                    "value": f"{parent} (ppid={p.ppid}) -> {child} (pid={p.pid}) :: {p.cmdline}"
+                })
+            elif parent in SCRIPTY:
+                # deeper chain, e.g. winword.exe -> cmd.exe -> powershell.exe
+                chain = _scripty_origin(tree, p)
+                if chain:
+                    arts.append({
+                        "type": "process",
+                        "value": f"{_fmt_chain(chain)} :: {p.cmdline}"
+                    })
 
-        # suspicious parent category?
-        parent_is_office = parent in OFFICE
-        parent_is_browser = parent in BROWSERS
-        parent_is_mail = parent in MAILERS
-
-        if parent_is_office or parent_is_browser or parent_is_mail:
-            arts.append({
-                "type": "process",  # normalize so policy counts this under process
-                "value": f"{parent} (ppid={p.ppid}) -> {child} (pid={p.pid}) :: {p.cmdline}"
-            })
-    return arts
\ No newline at end of file
+        for label, pattern in ANCESTRY_PATTERNS:
+            chain = tree.match_ancestry(p.pid, pattern)
+            if chain:
+                arts.append({
+                    "type": "process",
+                    "value": f"[{label}] {_fmt_chain(chain)} :: {p.cmdline}"
+                })
+    return arts
@@ -1,6 +1,11 @@
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from email.utils import parseaddr
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from pathlib import Path
+from urllib.parse import urlsplit
+import os
 import re
+from ..core.netindex import DomainSet, parse_ip
 from ..collectors.email_imap import RawEmail as ImapEmail
 from ..collectors.email_local import RawEmail as LocalEmail
 
@@ -8,6 +13,13 @@ RISKY_EXTS = {".exe",".scr",".ps1",".js",".jse",".vbs",".vbe",".wsf",".hta",".ln
 URL_SHORTENERS = {"bit.ly","tinyurl.com","t.co","goo.gl","ow.ly","is.gd","buff.ly","cutt.ly"}
 SUSP_TLDS = {".ru",".cn",".zip",".mov",".top",".click",".link"}
 
+# second-level labels under which registrations happen one level deeper
+# (example.co.uk); a compact stand-in for the full public suffix list
+_MULTI_LABEL_SUFFIXES = {
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "com.au", "net.au", "org.au", "co.nz", "co.za",
+    "co.jp", "ne.jp", "com.br", "com.cn", "com.mx", "co.in", "com.tr", "com.ru", "co.kr",
+}
+
 _url_re = re.compile(r"https?://[^\s)>\]]+", re.IGNORECASE)
 
 def _extract_urls(txt: str) -> List[str]:
@@ -18,22 +30,105 @@ def _extract_urls(txt: str) -> List[str]:
     urls = [u.rstrip(".,);]\"'") for u in urls]
     return urls[:25]
 
-def analyze_emails(emails: List[ImapEmail] | List[LocalEmail]) -> List[Dict[str, Any]]:
+def url_host(url: str) -> str:
+    try:
+        return (urlsplit(url).hostname or "").rstrip(".")
+    except ValueError:
+        return ""
+
+def sender_domain(from_addr: str) -> str:
+    """example.com for "Alice <alice@example.com>"."""
+    return parseaddr(from_addr or "")[1].rpartition("@")[2].strip().lower().rstrip(".")
+
+def registrable_domain(host: str) -> str:
+    """example.com for a.b.example.com (example.co.uk for x.example.co.uk)."""
+    if not host or parse_ip(host) is not None:
+        return host
+    labels = host.split(".")
+    n = 3 if len(labels) >= 3 and ".".join(labels[-2:]) in _MULTI_LABEL_SUFFIXES else 2
+    return ".".join(labels[-n:])
+
+def load_domain_list(path: str | Path) -> List[str]:
+    """One domain per line; blank lines and # comments ignored."""
+    out: List[str] = []
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                out.append(line)
+    return out
+
+class UrlIndex:
+    """
+    Shortener / suspicious-TLD / blocklist lookups by URL host. Each set is a
+    core.netindex.DomainSet, so per-URL cost is independent of list size.
+    """
+
+    def __init__(self, shorteners: Iterable[str] = URL_SHORTENERS, tlds: Iterable[str] = SUSP_TLDS,
+                 blocklist: Iterable[str] = ()):
+        self.shorteners = DomainSet(shorteners)
+        self.tlds = DomainSet(t.lstrip(".") for t in tlds)
+        self.blocklist = DomainSet(blocklist)
+
+    def classify(self, url: str) -> Optional[str]:
+        """Reason the URL is risky ("blocklist", "shortener", "suspicious_tld") or None."""
+        host = url_host(url)
+        if not host:
+            return None
+        if self.blocklist.match(host):
+            return "blocklist"
+        if self.shorteners.match(host):
+            return "shortener"
+        if self.tlds.match(host):
+            return "suspicious_tld"
+        return None
+
+_DEFAULT_INDEX: Optional[UrlIndex] = None
+_LOADED: Dict[Tuple[str, int], UrlIndex] = {}
+
+def url_index(blocklist_path: str | Path | None = None) -> UrlIndex:
+    """Index with the built-in lists plus an optional blocklist file (reloaded when it changes)."""
+    global _DEFAULT_INDEX
+    if blocklist_path:
+        try:
+            key = (str(blocklist_path), os.stat(blocklist_path).st_mtime_ns)
+        except OSError:
+            key = None
+        if key is not None:
+            idx = _LOADED.get(key)
+            if idx is None:
+                _LOADED.clear()
+                idx = _LOADED[key] = UrlIndex(blocklist=load_domain_list(blocklist_path))
+            return idx
+    if _DEFAULT_INDEX is None:
+        _DEFAULT_INDEX = UrlIndex()
+    return _DEFAULT_INDEX
+
+def analyze_emails(emails: List[ImapEmail] | List[LocalEmail], index: UrlIndex | None = None) -> List[Dict[str, Any]]:
+    index = index or url_index()
     artifacts: List[Dict[str, Any]] = []
+    # each distinct URL is classified once per batch
+    verdicts: Dict[str, Optional[str]] = {}
     for m in emails:
-        urls = _extract_urls(m.body_text)
+        sender = sender_domain(m.from_addr)
         risky_urls = []
-        for u in urls:
-            lu = u.lower()
-            if any(dom in lu for dom in URL_SHORTENERS) or any(lu.endswith(tld) for tld in SUSP_TLDS):
+        for u in dict.fromkeys(_extract_urls(m.body_text)):
+            if u not in verdicts:
+                verdicts[u] = index.classify(u)
+            if verdicts[u]:
                 risky_urls.append(u)
         for u in risky_urls[:10]:
-            artifacts.append({"type":"email:url", "value": f"{m.from_addr} | {m.subject} | {u}"})
-
-        for (fname, ctype, _data) in m.attachments[:10]:
-            low = (fname or "").lower()
+            host = url_host(u)
+            artifacts.append({"type":"email:url", "value": f"{m.from_addr} | {m.subject} | {u}", "reason": verdicts[u],
+                              "host": host, "domain": registrable_domain(host), "sender_domain": sender})
+        for att in m.attachments[:10]:
+            low = (att.filename or "").lower()
             for ext in RISKY_EXTS:
                 if low.endswith(ext):
-                    artifacts.append({"type":"email:attachment", "value": f"{m.from_addr} | {m.subject} | {fname} ({ctype})"})
+                    art = {"type":"email:attachment", "value": f"{m.from_addr} | {m.subject} | {att.filename} ({att.content_type})",
+                           "sender_domain": sender}
+                    if att.sha256:
+                        art["sha256"] = att.sha256
+                    artifacts.append(art)
                     break
     return artifacts
\ No newline at end of file
@@ -2,6 +2,7 @@ from typing import List, Dict
 import os
 
 from ..collectors.persistence import PersistItem
+from ..core import matcher
 
 RISKY_EXTS = {".exe",".scr",".ps1",".js",".jse",".vbs",".vbe",".wsf",".hta",".lnk",".bat",".cmd",".dll",".jar"}
 RISKY_PATH_HINTS = [
@@ -15,18 +16,21 @@ SUSP_CMDS = [
     "powershell -enc", "frombase64string", "invoke-webrequest", "bitsadmin",
     "regsvr32 /i:", "rundll32 http", "mshta http", "wscript ", "cscript "
 ]
+_PATH_HINTS_ID = matcher.register("persistence.path_hints", RISKY_PATH_HINTS)
+_CMDS_ID = matcher.register("persistence.cmds", SUSP_CMDS)
 
 def _low(s: str) -> str:
     return (s or "").lower()
 
 def _suspicious_path(path: str) -> bool:
     lp = _low(path)
-    if any(h in lp for h in RISKY_PATH_HINTS):
+    hit = matcher.scan(lp)
+    if _PATH_HINTS_ID in hit:
         return True
     _, ext = os.path.splitext(lp)
     if ext in RISKY_EXTS:
         return True
-    if any(k in lp for k in SUSP_CMDS):
+    if _CMDS_ID in hit:
         return True
     return False
 
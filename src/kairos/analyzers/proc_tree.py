@@ -0,0 +1,53 @@
+from typing import Dict, Iterator, List, Optional, Sequence, Set
+from ..collectors.processes import ProcInfo
+
+class ProcTree:
+    """
+    Parent index over one process snapshot. Built once per scan in O(n);
+    ancestor walks are O(depth) and never revisit a pid (pid reuse can make
+    ppid links loop, so walks stop at the first repeat).
+    """
+
+    def __init__(self, procs: Sequence[ProcInfo]):
+        self.by_pid: Dict[int, ProcInfo] = {p.pid: p for p in procs}
+
+    def parent(self, pid: int) -> Optional[ProcInfo]:
+        p = self.by_pid.get(pid)
+        if p is None or p.ppid is None or p.ppid == pid:
+            return None
+        return self.by_pid.get(p.ppid)
+
+    def ancestors(self, pid: int, max_depth: int = 64) -> Iterator[ProcInfo]:
+        """Yield parent, grandparent, ... of pid (nearest first)."""
+        seen = {pid}
+        cur = self.parent(pid)
+        while cur is not None and cur.pid not in seen and len(seen) <= max_depth:
+            yield cur
+            seen.add(cur.pid)
+            cur = self.parent(cur.pid)
+
+    def chain(self, pid: int, length: int) -> List[ProcInfo]:
+        """Return up to `length` processes ending at pid, oldest first."""
+        me = self.by_pid.get(pid)
+        if me is None:
+            return []
+        out = [me]
+        for anc in self.ancestors(pid, max_depth=max(0, length - 1)):
+            out.append(anc)
+        out.reverse()
+        return out
+
+    def match_ancestry(self, pid: int, pattern: Sequence[Set[str]]) -> Optional[List[ProcInfo]]:
+        """
+        Match a name pattern (oldest first, last element = pid itself) against
+        the contiguous ancestor chain of pid. Returns the matched chain or None.
+        """
+        if not pattern:
+            return None
+        chain = self.chain(pid, len(pattern))
+        if len(chain) != len(pattern):
+            return None
+        for proc, names in zip(chain, pattern):
+            if proc.name not in names:
+                return None
+        return chain
@@ -25,9 +25,11 @@ def incident_from_signals(proc_hits: List[ProcInfo], net_hits: List[NetConnInfo]
     for h in proc_hits:
         artifacts.append({"type":"process", "value": f"{h.pid} {h.name} :: {h.cmdline}"})
     for n in net_hits:
-        artifacts.append({"type":"network", "value": f"pid={n.pid} {n.proc_name} {n.laddr}:{n.lport} -> {n.raddr}:{n.rport} [{n.status}] {n.cmdline}"})
+        artifacts.append({"type":"network", "value": f"pid={n.pid} {n.proc_name} {n.laddr}:{n.lport} -> {n.raddr}:{n.rport} [{n.status}] {n.cmdline}",
+                          "raddr": n.raddr, "rport": n.rport})
     for f in file_hits:
-        artifacts.append({"type":"file", "value": f"{f.path} ({f.ext}, {f.size} bytes, sha256={f.sha256 or 'n/a'})"})
+        artifacts.append({"type":"file", "value": f"{f.path} ({f.ext}, {f.size} bytes, sha256={f.sha256 or 'n/a'})",
+                          "sha256": f.sha256, "sha1": f.sha1, "md5": f.md5})
 
     sev = _sev_from_signals(len(proc_hits), len(net_hits), len(file_hits))
 
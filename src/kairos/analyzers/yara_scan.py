@@ -1,6 +1,11 @@
 from __future__ import annotations
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from pathlib import Path
+import hashlib
+import heapq
+import os
+import threading
+import time
 
 # Optional import — we won't crash if missing
 try:
@@ -9,45 +14,257 @@ except Exception:
     yara = None
 
 from ..collectors.filesystem import FileHit
+from ..collectors.filepipe import run_pipeline
 
-def _load_rules(rules_dir: Path):
-    if yara is None:
-        return None
+# compiled rulesets kept in-process (long-running server / watch mode)
+_MEMO: Dict[str, object] = {}
+_MEMO_MAX = 4
+# how many compiled rulesets to keep on disk
+_DISK_KEEP = 8
+
+def _rule_sources(rules_dir: Path) -> Dict[str, str]:
     if not rules_dir.exists():
-        return None
-    rule_files = [str(p) for p in rules_dir.glob("*.yar")] + [str(p) for p in rules_dir.glob("*.yara")]
-    if not rule_files:
-        return None
-    # compile all rules in dir as a single namespace
-    sources = {Path(p).name: Path(p).read_text(encoding="utf-8", errors="ignore") for p in rule_files}
-    return yara.compile(sources=sources)  # type: ignore
+        return {}
+    rule_files = sorted(list(rules_dir.glob("*.yar")) + list(rules_dir.glob("*.yara")))
+    return {p.name: p.read_text(encoding="utf-8", errors="ignore") for p in rule_files}
+
+def ruleset_hash(sources: Dict[str, str]) -> str:
+    """Key for a compiled ruleset: every rule source plus the yara-python version."""
+    h = hashlib.sha256()
+    h.update(str(getattr(yara, "__version__", "")).encode())
+    for name in sorted(sources):
+        h.update(b"\0" + name.encode("utf-8") + b"\0" + sources[name].encode("utf-8"))
+    return h.hexdigest()
 
-def scan_files_with_yara(file_hits: List[FileHit], *, rules_dir: Path, max_size_bytes: int = 10 * 1024 * 1024) -> List[Dict]:
+def _compile(sources: Dict[str, str]):
+    # compile all rules in dir as a single compile call (one namespace per file)
+    try:
+        return yara.compile(sources=sources)  # type: ignore
+    except yara.SyntaxError:  # type: ignore
+        # one broken file shouldn't disable YARA entirely: keep the files that compile
+        good = {}
+        for name, src in sources.items():
+            try:
+                yara.compile(source=src)  # type: ignore
+                good[name] = src
+            except Exception:
+                continue
+        if not good:
+            return None
+        return yara.compile(sources=good)  # type: ignore
+
+def _prune(cache_dir: Path) -> None:
+    files = sorted(cache_dir.glob("*.yarc"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in files[_DISK_KEEP:]:
+        try:
+            old.unlink()
+        except OSError:
+            pass
+
+def _load_rules(rules_dir: Path, cache_dir: Path | None = None):
+    """
+    Compiled rules for rules_dir. Reuses, in order: the in-process memo, a
+    compiled file saved under cache_dir (yara.load), and only then compiles.
+    Any change to a rule file (or yara-python upgrade) changes the key.
+    """
+    if yara is None:
+        return None, None
+    sources = _rule_sources(rules_dir)
+    if not sources:
+        return None, None
+    key = ruleset_hash(sources)
+    rules = _MEMO.get(key)
+    if rules is not None:
+        return rules, key
+
+    compiled_path = cache_dir / f"{key}.yarc" if cache_dir else None
+    if compiled_path is not None and compiled_path.exists():
+        try:
+            rules = yara.load(str(compiled_path))  # type: ignore
+        except Exception:
+            rules = None
+    if rules is None:
+        rules = _compile(sources)
+        if rules is None:
+            return None, None
+        if compiled_path is not None:
+            try:
+                cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp = compiled_path.with_suffix(".tmp")
+                rules.save(str(tmp))
+                os.replace(tmp, compiled_path)
+                _prune(cache_dir)
+            except Exception:
+                pass  # cache is an optimization only
+
+    if len(_MEMO) >= _MEMO_MAX:
+        _MEMO.pop(next(iter(_MEMO)))
+    _MEMO[key] = rules
+    return rules, key
+
+class _Unfinished(list):
+    """Matches from a scan that timed out or failed: reported, never cached as clean."""
+
+class YaraScanner:
+    """
+    Content scanner for collectors.filepipe: matches a shared buffer or a path.
+    Safe to call from the pipeline's worker threads (yara-python releases the
+    GIL while matching). At most `workers` matches run at once, however many
+    threads call in. Each match gets `timeout` seconds; once `deadline`
+    (time.monotonic()) passes, remaining files are skipped. Timing and timeout
+    counts are collected for stats().
+    """
+
+    def __init__(self, rules, ruleset_hash: str = "", *, timeout: int = 10, fast: bool = True,
+                 deadline: float | None = None, workers: int = 4, verdicts=None):
+        self.rules = rules
+        self.ruleset_hash = ruleset_hash
+        self.verdicts = verdicts  # core.verdicts.VerdictCache for this ruleset, optional
+        self.timeout = int(timeout)
+        self.fast = bool(fast)
+        self.deadline = deadline
+        self.workers = int(workers)
+        self._slots = threading.BoundedSemaphore(max(1, self.workers))
+        self._lock = threading.Lock()
+        self._scanned = 0
+        self._matched = 0
+        self._timeouts = 0
+        self._errors = 0
+        self._skipped = 0
+        self._total_ms = 0.0
+        self._slowest: List[Tuple[float, str]] = []  # min-heap of (ms, path)
+        self._timed_out: List[str] = []
+
+    @staticmethod
+    def _names(matches) -> List[Tuple[str, str]]:
+        return [(getattr(m, "rule", str(m)), getattr(m, "namespace", "default")) for m in matches]
+
+    def _match(self, path: str, **target) -> List[Tuple[str, str]] | None:
+        with self._slots:
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                with self._lock:
+                    self._skipped += 1
+                return None  # not scanned
+            t0 = time.perf_counter()
+            out: List[Tuple[str, str]] = []
+            timed_out = failed = False
+            try:
+                out = self._names(self.rules.match(timeout=self.timeout, fast=self.fast, **target))
+            except yara.TimeoutError:  # type: ignore
+                timed_out = True
+            except Exception:
+                failed = True
+            ms = (time.perf_counter() - t0) * 1000.0
+        with self._lock:
+            self._scanned += 1
+            self._total_ms += ms
+            self._matched += bool(out)
+            self._timeouts += timed_out
+            if timed_out and len(self._timed_out) < 20:
+                self._timed_out.append(path)
+            self._errors += failed
+            if len(self._slowest) < 5:
+                heapq.heappush(self._slowest, (ms, path))
+            else:
+                heapq.heappushpop(self._slowest, (ms, path))
+        return _Unfinished(out) if timed_out or failed else out
+
+    def match_buffer(self, buf, path: str) -> List[Tuple[str, str]] | None:
+        return self._match(path, data=buf)
+
+    def match_path(self, path: str) -> List[Tuple[str, str]] | None:
+        return self._match(path, filepath=path)
+
+    def lookup(self, sha256: str | None) -> List[Tuple[str, str]] | None:
+        if self.verdicts is None:
+            return None
+        return self.verdicts.get(sha256)
+
+    def remember(self, path: str, sha256: str | None, matches: List[Tuple[str, str]]) -> None:
+        if self.verdicts is None or isinstance(matches, _Unfinished):
+            return
+        self.verdicts.put(sha256, matches)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "scanned": self._scanned,
+                "cached": self.verdicts.hits if self.verdicts is not None else 0,
+                "matched": self._matched,
+                "timeouts": self._timeouts,
+                "errors": self._errors,
+                "skipped_deadline": self._skipped,
+                "total_ms": round(self._total_ms, 2),
+                "avg_ms": round(self._total_ms / self._scanned, 2) if self._scanned else 0.0,
+                "timed_out": list(self._timed_out),
+                "slowest": [{"path": p, "ms": round(ms, 2)} for ms, p in sorted(self._slowest, reverse=True)],
+            }
+
+def load_scanner(rules_dir: Path, cache_dir: Path | None = None, **opts) -> YaraScanner | None:
+    """opts: timeout, fast, deadline, workers (see YaraScanner)."""
+    rules, key = _load_rules(rules_dir, cache_dir)
+    return YaraScanner(rules, key, **opts) if rules is not None else None
+
+def scan_files_with_yara(file_hits: List[FileHit], *, rules_dir: Path, max_size_bytes: int = 10 * 1024 * 1024,
+                         scanner: YaraScanner | None = None) -> List[Dict]:
     """
     Run YARA on FileHit paths, return artifacts like:
     {"type":"yara:match","value":"<path> :: <rule> (<ns>)"}
+    Hits the sweep already offered to the scanner (read-once pipeline) are not
+    queued again, including those it skipped (deadline, size cap).
     """
     arts: List[Dict] = []
     if yara is None:
         return arts
-    rules = _load_rules(rules_dir)
-    if rules is None:
+    scanner = scanner or load_scanner(rules_dir)
+    if scanner is None:
         return arts
 
+    pending = []
     for f in file_hits:
-        p = Path(f.path)
+        if f.yara_matches is None and not f.yara_attempted:
+            f.yara_matches = scanner.lookup(f.sha256)
+            if f.yara_matches is None:
+                pending.append(f)
+    items = []
+    for f in pending:
         try:
-            if not p.exists():
-                continue
-            if p.stat().st_size > max_size_bytes:
-                continue
-            # read bytes and match
-            data = p.read_bytes()
-            matches = rules.match(data=data)
-            for m in matches:
-                ns = getattr(m, "namespace", "default")
-                rule = getattr(m, "rule", str(m))
-                arts.append({"type": "yara:match", "value": f"{f.path} :: {rule} ({ns})"})
-        except Exception:
+            items.append((f.path, os.stat(f.path)))
+        except OSError:
             continue
-    return arts
\ No newline at end of file
+    by_path = {f.path: f for f in pending}
+    for (path, _st), res in zip(items, run_pipeline(items, workers=scanner.workers, digest=False, scanner=scanner,
+                                                        max_scan_bytes=max_size_bytes)):
+        f = by_path[path]
+        f.yara_matches = res.matches
+        f.yara_attempted = True
+        if res.matches is not None:
+            scanner.remember(path, f.sha256, res.matches)
+
+    for f in file_hits:
+        for rule, ns in (f.yara_matches or []):
+            arts.append({"type": "yara:match", "value": f"{f.path} :: {rule} ({ns})"})
+    return arts
+
+def scan_attachments_with_yara(emails, scanner: YaraScanner | None) -> List[Dict]:
+    """
+    YARA over email attachments spilled to disk by the streaming parser.
+    Verdicts are looked up by the attachment's SHA-256 first.
+    """
+    arts: List[Dict] = []
+    if scanner is None:
+        return arts
+    for m in emails:
+        for att in m.attachments:
+            if not att.spill_path:
+                continue
+            matches = scanner.lookup(att.sha256)
+            if matches is None:
+                matches = scanner.match_path(att.spill_path)
+                if matches is None:
+                    continue
+                scanner.remember(att.spill_path, att.sha256, matches)
+            for rule, ns in matches:
+                arts.append({"type": "yara:match", "sha256": att.sha256,
+                             "value": f"{m.from_addr} | {m.subject} | {att.filename} :: {rule} ({ns})"})
+    return arts
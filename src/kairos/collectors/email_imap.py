@@ -1,17 +1,32 @@
 from dataclasses import dataclass
-from typing import List, Optional
+from functools import partial
+from typing import TYPE_CHECKING, Callable, List, Optional
+from pathlib import Path
 import os
-from imapclient import IMAPClient
-import email
+import base64
+import json
+import quopri
+import io
+import threading
+import time
 from email.header import decode_header, make_header
-from email.message import Message
+
+from .mimestream import AttachmentMeta, parse_stream
+
+if TYPE_CHECKING:
+    from imapclient import IMAPClient
+
+def _imap_errors() -> tuple:
+    # imapclient is only imported once IMAP is actually used
+    from imapclient.exceptions import IMAPClientError
+    return (OSError, IMAPClientError)
 
 @dataclass
 class RawEmail:
     subject: str
     from_addr: str
     body_text: str
-    attachments: list[tuple[str, str, bytes]]  # (filename, content_type, data)
+    attachments: List[AttachmentMeta]
 
 def _decode(s: Optional[str]) -> str:
     if not s:
@@ -21,56 +36,318 @@ def _decode(s: Optional[str]) -> str:
     except Exception:
         return s
 
-def _walk_message(msg: Message) -> tuple[str, list[tuple[str,str,bytes]]]:
-    text = []
-    atts: list[tuple[str,str,bytes]] = []
-    for part in msg.walk():
-        ctype = part.get_content_type() or ""
-        disp  = (part.get("Content-Disposition") or "").lower()
-        if part.is_multipart():
+# UIDs per FETCH command; keeps command lines and responses bounded
+FETCH_BATCH = 200
+# cap on the text/plain bytes pulled per section (partial fetch)
+MAX_TEXT_BYTES = 256 * 1024
+
+def _s(v) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, bytes):
+        return v.decode("utf-8", "ignore")
+    return str(v)
+
+def _params(raw) -> dict:
+    """BODYSTRUCTURE parameter list (k1, v1, k2, v2, ...) -> {k.lower(): v}."""
+    out = {}
+    if isinstance(raw, (tuple, list)):
+        for i in range(0, len(raw) - 1, 2):
+            out[_s(raw[i]).lower()] = _s(raw[i + 1])
+    return out
+
+def _disposition(part) -> tuple[str, dict]:
+    # extension fields sit at different offsets per body type; find the
+    # ("ATTACHMENT"|"INLINE", (params)) pair instead of hard-coding an index
+    for field in part[7:]:
+        if (isinstance(field, tuple) and len(field) == 2 and isinstance(field[0], bytes)
+                and field[0].upper() in (b"ATTACHMENT", b"INLINE")):
+            return _s(field[0]).lower(), _params(field[1])
+    return "", {}
+
+def _walk_structure(bs, prefix: str = "") -> tuple[list[tuple[str, str, str]], list[AttachmentMeta]]:
+    """
+    Walk a BODYSTRUCTURE. Returns text/plain sections as (section, encoding,
+    charset) and attachment metadata, without fetching any attachment.
+    """
+    texts: list[tuple[str, str, str]] = []
+    atts: list[AttachmentMeta] = []
+    if bs.is_multipart:
+        for i, child in enumerate(bs[0], start=1):
+            t, a = _walk_structure(child, f"{prefix}{i}.")
+            texts.extend(t)
+            atts.extend(a)
+        return texts, atts
+
+    section = prefix.rstrip(".") or "1"
+    ctype = f"{_s(bs[0]).lower()}/{_s(bs[1]).lower()}"
+    params = _params(bs[2])
+    encoding = _s(bs[5]).lower()
+    disp, dparams = _disposition(bs)
+    fname = next((v for k, v in dparams.items() if k.startswith("filename")), "") or params.get("name", "")
+    if disp == "attachment" or (fname and not ctype.startswith("text/")):
+        try:
+            size = int(bs[6])
+        except (TypeError, ValueError, IndexError):
+            size = 0
+        if encoding == "base64":
+            size = size * 3 // 4  # server reports encoded octets; approximate
+        # content is never downloaded here, so there is no digest
+        atts.append(AttachmentMeta(filename=_decode(fname or "attachment.bin"), content_type=ctype,
+                                   size=size, sha256=""))
+    elif ctype == "text/plain":
+        texts.append((section, encoding, params.get("charset", "utf-8")))
+    return texts, atts
+
+def _decode_section(data: bytes, encoding: str, charset: str) -> str:
+    try:
+        if encoding == "base64":
+            clean = b"".join(data.split())
+            data = base64.b64decode(clean[: len(clean) - len(clean) % 4])
+        elif encoding == "quoted-printable":
+            data = quopri.decodestring(data)
+        return data.decode(charset or "utf-8", errors="ignore")
+    except Exception:
+        return ""
+
+def _envelope_from(env) -> str:
+    try:
+        addr = env.from_[0]
+        mailbox = f"{_s(addr.mailbox)}@{_s(addr.host)}"
+        name = _decode(_s(addr.name))
+        return f"{name} <{mailbox}>" if name else mailbox
+    except Exception:
+        return ""
+
+def _section_data(resp: dict, section: str) -> bytes:
+    # the key echoes the partial range, e.g. b"BODY[1.1]<0>"
+    want = f"BODY[{section}]".encode()
+    for k, v in resp.items():
+        if isinstance(k, bytes) and k.startswith(want):
+            return v or b""
+    return b""
+
+def _fetch_batch(client: "IMAPClient", uids: List[int]) -> List[RawEmail]:
+    """
+    Two-pass fetch for one batch: ENVELOPE+BODYSTRUCTURE for every UID in one
+    command, then only the text/plain sections, grouped so each distinct
+    section number is one bulk command. Attachments are described from the
+    BODYSTRUCTURE and never downloaded.
+    """
+    meta = client.fetch(uids, ["ENVELOPE", "BODYSTRUCTURE"])
+    plans: dict[int, tuple[str, str, list, list]] = {}
+    fallback: List[int] = []
+    for uid in uids:
+        resp = meta.get(uid) or {}
+        try:
+            env = resp[b"ENVELOPE"]
+            texts, atts = _walk_structure(resp[b"BODYSTRUCTURE"])
+        except Exception:
+            fallback.append(uid)
             continue
+        plans[uid] = (_decode(_s(env.subject)), _envelope_from(env), texts, atts)
+
+    by_section: dict[str, List[int]] = {}
+    for uid, (_subj, _from, texts, _atts) in plans.items():
+        for sec, _enc, _cs in texts:
+            by_section.setdefault(sec, []).append(uid)
+    bodies: dict[int, dict[str, bytes]] = {}
+    for sec, sec_uids in by_section.items():
+        resp = client.fetch(sec_uids, [f"BODY.PEEK[{sec}]<0.{MAX_TEXT_BYTES}>"])
+        for uid in sec_uids:
+            bodies.setdefault(uid, {})[sec] = _section_data(resp.get(uid) or {}, sec)
+
+    out: List[RawEmail] = []
+    for uid in uids:
+        if uid not in plans:
+            continue
+        subj, from_, texts, atts = plans[uid]
+        body = "\n".join(_decode_section(bodies.get(uid, {}).get(sec, b""), enc, cs) for sec, enc, cs in texts)
+        out.append(RawEmail(subject=subj, from_addr=from_, body_text=body.strip(), attachments=atts))
+
+    if fallback:
+        # server gave us something we couldn't parse: whole messages, still batched
+        raw = client.fetch(fallback, ["BODY.PEEK[]"])
+        for uid in fallback:
+            data = (raw.get(uid) or {}).get(b"BODY[]")
+            if not data:
+                continue
+            m = parse_stream(io.BytesIO(data))
+            out.append(RawEmail(subject=m.subject, from_addr=m.from_addr, body_text=m.body_text,
+                                attachments=m.attachments))
+    return out
+
+def _state_path(cfg: dict) -> Path:
+    logs = (cfg.get("paths", {}) or {}).get("logs", "logs")
+    return Path(logs) / "cache" / "imap_state.json"
+
+class UidWatermarks:
+    """
+    Last processed UID per (host, folder), persisted as JSON. A mark is only
+    valid for the UIDVALIDITY it was recorded under; when the server reports
+    a different one, UIDs were renumbered and the mark starts over.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        try:
+            self._data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            self._data = {}
+
+    @staticmethod
+    def _key(host: str, folder: str) -> str:
+        return f"{host}|{folder}"
+
+    def last_uid(self, host: str, folder: str, uidvalidity: int) -> int:
+        mark = self._data.get(self._key(host, folder)) or {}
+        if int(mark.get("uidvalidity", -1)) != int(uidvalidity):
+            return 0
+        return int(mark.get("last_uid", 0))
+
+    def update(self, host: str, folder: str, uidvalidity: int, last_uid: int) -> None:
+        if last_uid <= self.last_uid(host, folder, uidvalidity):
+            return  # deferred commits may land out of order: never move back
+        self._data[self._key(host, folder)] = {"uidvalidity": int(uidvalidity), "last_uid": int(last_uid)}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._data, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+class ImapSession:
+    """
+    One authenticated IMAP connection, reused across polls (web server / watch
+    mode). Reconnects once if the server dropped the connection. Each poll
+    fetches the oldest `max_messages` unread messages above the stored UID
+    watermark; any remainder is picked up by the next poll. IMAPClient is not
+    thread-safe, so every use of the connection holds the session lock.
+    """
+
+    def __init__(self, cfg: dict):
+        ecfg = cfg.get("email", {}) or {}
+        self.host = ecfg.get("imap_host", "")
+        self.port = int(ecfg.get("imap_port", 993))
+        self.ssl = bool(ecfg.get("imap_ssl", True))
+        self.folder = ecfg.get("folder", "INBOX")
+        self.limit = int(ecfg.get("max_messages", 10))
+        self.user = os.environ.get("KAIROS_IMAP_USER", "")
+        self.pwd = os.environ.get("KAIROS_IMAP_PASS", "")
+        self.marks = UidWatermarks(_state_path(cfg))
+        self._client: Optional["IMAPClient"] = None
+        self._uidvalidity = 0
+        self._lock = threading.RLock()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.host and self.user and self.pwd)
+
+    def _connect(self) -> "IMAPClient":
+        if self._client is None:
+            from imapclient import IMAPClient
+            client = IMAPClient(self.host, port=self.port, ssl=self.ssl)
+            try:
+                client.login(self.user, self.pwd)
+                info = client.select_folder(self.folder, readonly=True)
+            except Exception:
+                client.shutdown()
+                raise
+            self._uidvalidity = int(info.get(b"UIDVALIDITY", 0))
+            self._client = client
+        return self._client
+
+    def _poll_once(self, commits: Optional[List[Callable[[], None]]]) -> List[RawEmail]:
+        client = self._connect()
+        # re-select: refreshes UIDVALIDITY and the message list on a reused connection
+        info = client.select_folder(self.folder, readonly=True)
+        self._uidvalidity = int(info.get(b"UIDVALIDITY", self._uidvalidity))
+        last = self.marks.last_uid(self.host, self.folder, self._uidvalidity)
+        criteria = ["UNSEEN"] + (["UID", f"{last + 1}:*"] if last else [])
+        # "n:*" always includes the highest UID, even when it is below n
+        uids = sorted(u for u in client.search(criteria) if u > last)
+        # oldest first: the mark only moves past messages that were fetched
+        uids = uids[:self.limit]
+        out: List[RawEmail] = []
+        for i in range(0, len(uids), FETCH_BATCH):
+            batch = uids[i:i + FETCH_BATCH]
+            out.extend(_fetch_batch(client, batch))
+            mark = partial(self.marks.update, self.host, self.folder, self._uidvalidity, batch[-1])
+            if commits is None:
+                mark()
+            else:
+                commits.append(mark)
+        return out
+
+    def poll(self, commits: Optional[List[Callable[[], None]]] = None) -> List[RawEmail]:
+        """
+        New messages. With a `commits` list the watermark moves only when the
+        caller runs its callables, after the messages were analyzed;
+        until then the same messages are fetched again.
+        """
+        if not self.configured:
+            return []
+        with self._lock:
+            try:
+                return self._poll_once(commits)
+            except _imap_errors():
+                # stale connection (timeout, server restart): one fresh attempt
+                self.close()
+                return self._poll_once(commits)
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Block up to `timeout` seconds for new mail. Uses IDLE when the server
+        supports it (True if it pushed something); otherwise just sleeps.
+        """
+        if not self.configured:
+            time.sleep(timeout)
+            return False
+        with self._lock:
+            try:
+                client = self._connect()
+                idle = client.has_capability("IDLE")
+                if idle:
+                    client.idle()
+                    try:
+                        responses = client.idle_check(timeout=timeout)
+                    finally:
+                        client.idle_done()
+                    return bool(responses)
+            except _imap_errors():
+                self.close()
+                return False
+        time.sleep(timeout)
+        return False
+
+    def close(self) -> None:
+        with self._lock:
+            client, self._client = self._client, None
+        if client is None:
+            return
         try:
-            payload = part.get_payload(decode=True) or b""
+            client.logout()
         except Exception:
-            payload = b""
-        if "attachment" in disp:
-            fname = _decode(part.get_filename() or "attachment.bin")
-            atts.append((fname, ctype, payload))
-        else:
-            if ctype.startswith("text/plain"):
-                try:
-                    text.append(payload.decode(part.get_content_charset() or "utf-8", errors="ignore"))
-                except Exception:
-                    pass
-    return ("\n".join(text)).strip(), atts
-
-def fetch_recent_unread(cfg: dict) -> List[RawEmail]:
+            try:
+                client.shutdown()
+            except Exception:
+                pass
+
+    def __enter__(self) -> "ImapSession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def fetch_recent_unread(cfg: dict, session: Optional[ImapSession] = None,
+                        commits: Optional[List[Callable[[], None]]] = None) -> List[RawEmail]:
+    """
+    New unread messages since the last scan. Pass a long-lived ImapSession to
+    reuse its connection; otherwise one is opened and closed for this call.
+    `commits`: see ImapSession.poll.
+    """
     if not (cfg.get("email", {}).get("enabled", False)):
         return []
-    host = cfg.get("email", {}).get("imap_host", "")
-    port = int(cfg.get("email", {}).get("imap_port", 993))
-    folder = cfg.get("email", {}).get("folder", "INBOX")
-    limit = int(cfg.get("email", {}).get("max_messages", 10))
-
-    user = os.environ.get("KAIROS_IMAP_USER", "")
-    pwd  = os.environ.get("KAIROS_IMAP_PASS", "")
-    if not host or not user or not pwd:
-        # Not configured; silently do nothing
-        return []
-
-    out: List[RawEmail] = []
-    with IMAPClient(host, port=port, ssl=True) as client:
-        client.login(user, pwd)
-        client.select_folder(folder, readonly=True)
-        # recent unread first
-        uids = client.search(["UNSEEN"])
-        # newest last; slice last N
-        uids = uids[-limit:]
-        for uid in uids:
-            raw_bytes = client.fetch([uid], ["RFC822"])[uid][b"RFC822"]
-            msg = email.message_from_bytes(raw_bytes)
-            subj = _decode(msg.get("Subject", ""))
-            from_ = _decode(msg.get("From", ""))
-            body, atts = _walk_message(msg)
-            out.append(RawEmail(subject=subj, from_addr=from_, body_text=body, attachments=atts))
-    return out
\ No newline at end of file
+    if session is not None:
+        return session.poll(commits)
+    with ImapSession(cfg) as s:
+        # Not configured -> poll() silently returns nothing
+        return s.poll(commits)
@@ -1,59 +1,95 @@
 from dataclasses import dataclass
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, List, Optional, Tuple
 from pathlib import Path
-import email
-from email.header import decode_header, make_header
-from email.message import Message
+import os
+import time
+
+from .mimestream import AttachmentMeta, parse_stream
 
 @dataclass
 class RawEmail:
     subject: str
     from_addr: str
     body_text: str
-    attachments: list[tuple[str, str, bytes]]
+    attachments: List[AttachmentMeta]
 
-def _decode(s: str) -> str:
+def _parse_file(path: str, spill_dir: Optional[str] = None) -> Optional[RawEmail]:
+    # module-level so it can run in a worker process
     try:
-        return str(make_header(decode_header(s)))
+        with open(path, "rb") as fp:
+            m = parse_stream(fp, spill_dir=Path(spill_dir) if spill_dir else None)
+        return RawEmail(subject=m.subject, from_addr=m.from_addr, body_text=m.body_text, attachments=m.attachments)
     except Exception:
-        return s
+        return None
 
-def _walk_message(msg: Message):
-    text = []
-    atts = []
-    for part in msg.walk():
-        ctype = part.get_content_type() or ""
-        disp  = (part.get("Content-Disposition") or "").lower()
-        if part.is_multipart():
-            continue
-        try:
-            payload = part.get_payload(decode=True) or b""
-        except Exception:
-            payload = b""
-        if "attachment" in disp:
-            fname = _decode(part.get_filename() or "attachment.bin")
-            atts.append((fname, ctype, payload))
-        else:
-            if ctype.startswith("text/plain"):
-                try:
-                    text.append(payload.decode(part.get_content_charset() or "utf-8", errors="ignore"))
-                except Exception:
-                    pass
-    return ("\n".join(text)).strip(), atts
+def _list_eml(root: Path, settle_seconds: float) -> List[Tuple[str, int, int]]:
+    cutoff = time.time_ns() - int(settle_seconds * 1e9)
+    out: List[Tuple[str, int, int]] = []
+    with os.scandir(root) as it:
+        for entry in it:
+            if not entry.name.lower().endswith(".eml"):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            # still being written by the gateway: pick it up next scan
+            if st.st_mtime_ns > cutoff:
+                continue
+            out.append((entry.name, st.st_size, st.st_mtime_ns))
+    out.sort()
+    return out
 
-def load_eml_dir(eml_dir: str) -> List[RawEmail]:
+def load_eml_dir(
+    eml_dir: str,
+    *,
+    index=None,
+    workers: Optional[int] = None,
+    parallel_threshold: int = 64,
+    settle_seconds: float = 2.0,
+    spill_dir: Optional[Path] = None,
+    commits: Optional[List[Callable[[], None]]] = None,
+) -> List[RawEmail]:
+    """
+    Parse the .eml files in eml_dir. With a core.mailindex.MailboxIndex only
+    files that are new (or changed) since the last scan are parsed, and they
+    are recorded as processed afterwards. Batches of at least
+    `parallel_threshold` files are parsed on a process pool. Attachments are
+    hashed while streaming; with spill_dir a decoded copy is kept for YARA.
+    Pass a `commits` list to defer recording them: the caller runs its
+    callables once the messages have actually been analyzed (a scan stage
+    that times out must not mark mail it never reported).
+    """
     root = Path(eml_dir)
     if not root.exists():
         return []
-    out: List[RawEmail] = []
-    for p in sorted(root.glob("*.eml"))[-20:]:
+    entries = _list_eml(root, settle_seconds)
+    todo = entries
+    if index is not None:
+        index.forget_missing(name for name, _size, _mtime in entries)
+        todo = index.new_files(entries)
+    paths = [str(root / name) for name, _size, _mtime in todo]
+    parse = partial(_parse_file, spill_dir=str(spill_dir) if spill_dir else None)
+
+    if len(paths) >= parallel_threshold and (workers is None or workers > 1):
         try:
-            raw = p.read_bytes()
-            msg = email.message_from_bytes(raw)
-            subj = _decode(msg.get("Subject", ""))
-            from_ = _decode(msg.get("From", ""))
-            body, atts = _walk_message(msg)
-            out.append(RawEmail(subject=subj, from_addr=from_, body_text=body, attachments=atts))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parsed = list(pool.map(parse, paths, chunksize=16))
         except Exception:
-            continue
-    return out
\ No newline at end of file
+            # no usable process pool (restricted host, frozen build quirks)
+            parsed = [parse(p) for p in paths]
+    else:
+        parsed = [parse(p) for p in paths]
+
+    if index is not None:
+        # unparseable files are marked too: they are retried only if they change
+        mark = partial(index.mark, todo)
+        if commits is None:
+            mark()
+        else:
+            commits.append(mark)
+    return [m for m in parsed if m is not None]
@@ -0,0 +1,131 @@
+"""
+Read-once file content stage shared by hashing and YARA.
+
+Each candidate is opened once: small files are read into one buffer, larger
+ones are memory-mapped, and the same buffer is fed to the hashers and to the
+YARA scanner. When the digests are already cached nothing is read in Python;
+YARA matches by file path instead.
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Protocol, Sequence, Tuple
+import mmap
+import os
+
+from .hashing import HASH_NAMES, hash_buffer
+
+# below this a plain read() is cheaper than setting up a mapping
+MMAP_THRESHOLD = 256 * 1024
+
+class ContentScanner(Protocol):
+    def match_buffer(self, buf, path: str) -> Optional[List[Tuple[str, str]]]: ...
+    def match_path(self, path: str) -> Optional[List[Tuple[str, str]]]: ...
+    # verdict cache by content hash (skip files already scanned with these rules)
+    def lookup(self, sha256: Optional[str]) -> Optional[List[Tuple[str, str]]]: ...
+    def remember(self, path: str, sha256: Optional[str], matches: List[Tuple[str, str]]) -> None: ...
+
+@dataclass
+class ContentResult:
+    digests: Optional[Dict[str, str]] = None
+    matches: Optional[List[Tuple[str, str]]] = None  # (rule, namespace); None = not scanned
+
+@contextmanager
+def open_content(path: str) -> Iterator[memoryview]:
+    """Yield a read-only view of the whole file (mmap for large files)."""
+    with open(path, "rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < MMAP_THRESHOLD:
+            yield memoryview(f.read())
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm)
+        try:
+            yield view
+        finally:
+            view.release()
+            mm.close()
+
+def process_file(
+    path: str,
+    size: int,
+    *,
+    digest: bool = True,
+    scanner: Optional[ContentScanner] = None,
+    max_hash_bytes: int = 10 * 1024 * 1024,
+    max_scan_bytes: int = 10 * 1024 * 1024,
+) -> ContentResult:
+    res = ContentResult()
+    want_hash = digest and size <= max_hash_bytes
+    want_scan = scanner is not None and size <= max_scan_bytes
+    try:
+        if want_hash:
+            with open_content(path) as buf:
+                res.digests = hash_buffer(buf)
+                if want_scan:
+                    res.matches = scanner.match_buffer(buf, path)
+        elif want_scan:
+            res.matches = scanner.match_path(path)
+    except (OSError, ValueError):
+        pass  # unreadable / vanished / locked file
+    return res
+
+def run_pipeline(
+    items: Sequence[Tuple[str, os.stat_result]],
+    *,
+    workers: int = 4,
+    cache=None,
+    digest: bool = True,
+    scanner: Optional[ContentScanner] = None,
+    max_hash_bytes: int = 10 * 1024 * 1024,
+    max_scan_bytes: int = 10 * 1024 * 1024,
+) -> List[ContentResult]:
+    """
+    Run (path, stat) pairs through the content stage on a bounded thread pool;
+    `workers` caps how many files are read at once (1 = inline on the calling
+    thread). Unchanged files are answered from the HashCache when one is given.
+    """
+    out: List[ContentResult] = [ContentResult() for _ in items]
+    todo: List[Tuple[int, bool, bool]] = []
+    for i, (path, st) in enumerate(items):
+        need_hash = digest and st.st_size <= max_hash_bytes
+        if need_hash and cache is not None:
+            hit = cache.get(path, st)
+            if hit is not None and all(hit.get(n) for n in HASH_NAMES):
+                out[i].digests = hit
+                need_hash = False
+        need_scan = scanner is not None
+        if need_scan and out[i].digests:
+            cached = scanner.lookup(out[i].digests.get("sha256"))
+            if cached is not None:
+                out[i].matches = cached
+                need_scan = False
+        if need_hash or need_scan:
+            todo.append((i, need_hash, need_scan))
+    if not todo:
+        return out
+
+    def work(job: Tuple[int, bool, bool]) -> ContentResult:
+        i, need_hash, need_scan = job
+        path, st = items[i]
+        return process_file(path, st.st_size, digest=need_hash, scanner=scanner if need_scan else None,
+                            max_hash_bytes=max_hash_bytes, max_scan_bytes=max_scan_bytes)
+
+    def collect(results: Iterable[ContentResult]) -> None:
+        for (i, need_hash, need_scan), res in zip(todo, results):
+            if need_hash:
+                out[i].digests = res.digests
+                if res.digests is not None and cache is not None:
+                    cache.put(items[i][0], items[i][1], res.digests)
+            if need_scan:
+                out[i].matches = res.matches
+                if res.matches is not None and out[i].digests:
+                    scanner.remember(items[i][0], out[i].digests.get("sha256"), res.matches)
+
+    if workers <= 1:
+        collect(map(work, todo))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            collect(pool.map(work, todo))
+    return out
@@ -1,7 +1,10 @@
 from dataclasses import dataclass
 from typing import List, Iterable, Tuple
 from pathlib import Path
-import os, time, hashlib
+from concurrent.futures import ThreadPoolExecutor
+import os, re, time, fnmatch
+
+from .filepipe import run_pipeline
 
 @dataclass
 class FileHit:
@@ -10,6 +13,12 @@ class FileHit:
     size: int
     mtime: float
     sha256: str | None
+    sha1: str | None = None
+    md5: str | None = None
+    yara_matches: List[Tuple[str, str]] | None = None  # set when a scanner ran in the sweep
+    # offered to the scanner in the sweep; matches stay None if it was skipped
+    # (deadline, over max_scan_bytes), timed out on the size cap or unreadable
+    yara_attempted: bool = False
 
 # extensions that often show up in initial access / lolbins / droppers
 SUSPICIOUS_EXTS = {
@@ -17,19 +26,6 @@ SUSPICIOUS_EXTS = {
     ".lnk", ".dll", ".exe", ".scr"
 }
 
-def _sha256_if_small(p: Path, max_bytes: int = 10 * 1024 * 1024) -> str | None:
-    try:
-        sz = p.stat().st_size
-        if sz > max_bytes:
-            return None
-        h = hashlib.sha256()
-        with p.open("rb") as f:
-            for chunk in iter(lambda: f.read(8192), b""):
-                h.update(chunk)
-        return h.hexdigest()
-    except Exception:
-        return None
-
 def _default_roots() -> List[Path]:
     roots: List[Path] = []
     user = os.environ.get("USERPROFILE")
@@ -41,41 +37,112 @@ def _default_roots() -> List[Path]:
     roots.append(Path(os.environ.get("ProgramData", r"C:\ProgramData")) / "Microsoft" / "Windows" / "Start Menu" / "Programs" / "StartUp")
     return roots
 
-def sweep_recent_files(roots: Iterable[Path] | None = None, minutes: int = 1440) -> List[FileHit]:
+def _compile_excludes(globs: Iterable[str] | None):
+    """One case-insensitive regex for all exclude globs (matched on name and full path)."""
+    pats = [fnmatch.translate(g.lower()) for g in (globs or []) if g]
+    if not pats:
+        return None
+    return re.compile("|".join(f"(?:{p})" for p in pats))
+
+def _walk_root(root: Path, cutoff: float, exclude, max_depth: int | None) -> List[Tuple[FileHit, os.stat_result]]:
     """
-    Sweep for recently written suspicious files (default: last 24h).
-    Returns a list of FileHit.
+    Iterative os.scandir walk of one root. Extension and exclude filters run on
+    the DirEntry name before any stat; the stat itself comes from DirEntry
+    (cached by the OS listing on Windows, one call elsewhere).
     """
-    roots = list(roots or _default_roots())
-    cutoff = time.time() - (minutes * 60)
-    hits: List[FileHit] = []
-
-    for root in roots:
+    hits: List[Tuple[FileHit, os.stat_result]] = []
+    stack: List[Tuple[str, int]] = [(str(root), 0)]
+    while stack:
+        d, depth = stack.pop()
         try:
-            if not root.exists():
-                continue
-            for p in root.rglob("*"):
+            it = os.scandir(d)
+        except OSError:
+            # root/dir not accessible
+            continue
+        with it:
+            for e in it:
                 try:
-                    if not p.is_file():
+                    if e.is_dir(follow_symlinks=False):
+                        if max_depth is not None and depth >= max_depth:
+                            continue
+                        if exclude and (exclude.match(e.name.lower()) or exclude.match(e.path.lower())):
+                            continue
+                        stack.append((e.path, depth + 1))
                         continue
-                    ext = p.suffix.lower()
+                    ext = os.path.splitext(e.name)[1].lower()
                     if ext not in SUSPICIOUS_EXTS:
                         continue
-                    st = p.stat()
+                    if exclude and (exclude.match(e.name.lower()) or exclude.match(e.path.lower())):
+                        continue
+                    if not e.is_file():
+                        continue
+                    st = e.stat()
                     if st.st_mtime < cutoff:
                         continue
-                    digest = _sha256_if_small(p)
-                    hits.append(FileHit(
-                        path=str(p),
+                    if not st.st_ino:
+                        # DirEntry stats on Windows leave st_ino 0; the digest
+                        # cache keys on the file id, so fetch it for candidates
+                        st = os.stat(e.path)
+                    hits.append((FileHit(
+                        path=e.path,
                         ext=ext,
                         size=st.st_size,
                         mtime=st.st_mtime,
-                        sha256=digest
-                    ))
-                except Exception:
+                        sha256=None
+                    ), st))
+                except OSError:
                     # skip unreadable / transient files
                     continue
-        except Exception:
-            # root not accessible
-            continue
-    return hits
\ No newline at end of file
+    return hits
+
+def sweep_recent_files(
+    roots: Iterable[Path] | None = None,
+    minutes: int = 1440,
+    *,
+    exclude_globs: Iterable[str] | None = None,
+    max_depth: int | None = None,
+    workers: int = 4,
+    hash_cache=None,
+    hash_workers: int = 4,
+    max_hash_bytes: int = 10 * 1024 * 1024,
+    scanner=None,
+    max_scan_bytes: int = 10 * 1024 * 1024,
+) -> List[FileHit]:
+    """
+    Sweep for recently written suspicious files (default: last 24h).
+    Roots are walked in parallel threads, then matches go through the
+    read-once content stage (collectors.filepipe) on `hash_workers` threads
+    (1 = everything on the calling thread, e.g. under a profiler):
+    SHA-256/SHA-1/MD5 and, if a scanner (YARA) is given, rule matches from the
+    same buffer. Pass a core.hashcache.HashCache to skip rehashing unchanged
+    files. Returns a list of FileHit.
+    """
+    roots = list(roots or _default_roots())
+    cutoff = time.time() - (minutes * 60)
+    exclude = _compile_excludes(exclude_globs)
+    found: List[Tuple[FileHit, os.stat_result]] = []
+
+    if not roots:
+        return []
+
+    def walk(root) -> List[Tuple[FileHit, os.stat_result]]:
+        return _walk_root(Path(root), cutoff, exclude, max_depth)
+
+    if min(workers, len(roots)) <= 1:
+        for r in roots:
+            found.extend(walk(r))
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(roots))) as pool:
+            for part in pool.map(walk, roots):
+                found.extend(part)
+
+    results = run_pipeline([(h.path, st) for h, st in found],
+                           workers=hash_workers, cache=hash_cache, scanner=scanner,
+                           max_hash_bytes=max_hash_bytes, max_scan_bytes=max_scan_bytes)
+    for (h, _st), res in zip(found, results):
+        d = res.digests
+        if d:
+            h.sha256, h.sha1, h.md5 = d.get("sha256"), d.get("sha1"), d.get("md5")
+        h.yara_matches = res.matches
+        h.yara_attempted = scanner is not None
+    return [h for h, _st in found]
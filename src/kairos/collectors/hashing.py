@@ -0,0 +1,26 @@
+from __future__ import annotations
+from typing import Dict
+import hashlib
+
+HASH_NAMES = ("sha256", "sha1", "md5")
+
+# hashing is driven from collectors.filepipe (one read shared with YARA);
+# large slices keep hashlib releasing the GIL, so files hash in parallel
+READ_BUFFER = 1024 * 1024
+
+def _new_hashers() -> Dict[str, "hashlib._Hash"]:
+    return {
+        "sha256": hashlib.sha256(),
+        "sha1": hashlib.sha1(usedforsecurity=False),
+        "md5": hashlib.md5(usedforsecurity=False),
+    }
+
+def hash_buffer(buf) -> Dict[str, str]:
+    """All digests of an in-memory/mapped buffer, fed in READ_BUFFER slices."""
+    view = memoryview(buf)
+    hashers = _new_hashers()
+    for off in range(0, len(view), READ_BUFFER):
+        chunk = view[off:off + READ_BUFFER]
+        for h in hashers.values():
+            h.update(chunk)
+    return {name: h.hexdigest() for name, h in hashers.items()}
@@ -0,0 +1,285 @@
+"""
+Streaming MIME parser for the email collectors.
+
+Headers of each part go through email.parser.BytesFeedParser; bodies are read
+line by line and decoded incrementally (base64 / quoted-printable) straight
+into a hasher, so an attachment is never held in memory. Only metadata is kept
+(name, type, size, SHA-256), plus an optional spill file for content scanning.
+Text parts are kept up to a size cap.
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from email.header import decode_header, make_header
+from email.message import Message
+from email.parser import BytesFeedParser
+from email.policy import compat32
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Tuple
+import binascii
+import hashlib
+import os
+import tempfile
+
+# longest physical line read at once; longer lines are handled in pieces
+LINE_LIMIT = 64 * 1024
+MAX_TEXT_BYTES = 256 * 1024
+
+@dataclass
+class AttachmentMeta:
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+    spill_path: Optional[str] = None  # decoded copy on disk (only when spilling)
+
+@dataclass
+class ParsedEmail:
+    subject: str
+    from_addr: str
+    body_text: str
+    attachments: List[AttachmentMeta] = field(default_factory=list)
+
+def decode_header_value(s: str) -> str:
+    try:
+        return str(make_header(decode_header(s)))
+    except Exception:
+        return s
+
+class _Base64:
+    def __init__(self):
+        self._rest = b""
+
+    def feed(self, data: bytes) -> bytes:
+        data = self._rest + b"".join(data.split())
+        cut = len(data) - len(data) % 4
+        self._rest = data[cut:]
+        try:
+            return binascii.a2b_base64(data[:cut])
+        except binascii.Error:
+            return b""
+
+    def close(self) -> bytes:
+        rest, self._rest = self._rest, b""
+        if not rest:
+            return b""
+        try:
+            return binascii.a2b_base64(rest + b"=" * (-len(rest) % 4))
+        except binascii.Error:
+            return b""
+
+class _QuotedPrintable:
+    # decode whole lines only so "=XX" / soft breaks are never split
+    def __init__(self):
+        self._rest = b""
+
+    def feed(self, data: bytes) -> bytes:
+        data = self._rest + data
+        cut = max(data.rfind(b"\n"), data.rfind(b"\r")) + 1
+        self._rest = data[cut:]
+        return binascii.a2b_qp(data[:cut])
+
+    def close(self) -> bytes:
+        rest, self._rest = self._rest, b""
+        return binascii.a2b_qp(rest)
+
+class _Identity:
+    def feed(self, data: bytes) -> bytes:
+        return data
+
+    def close(self) -> bytes:
+        return b""
+
+def _decoder(headers: Message):
+    cte = (headers.get("Content-Transfer-Encoding") or "").strip().lower()
+    if cte == "base64":
+        return _Base64()
+    if cte == "quoted-printable":
+        return _QuotedPrintable()
+    return _Identity()
+
+class _TextSink:
+    def __init__(self, charset: str, limit: int):
+        self.charset = charset
+        self.limit = limit
+        self.buf = bytearray()
+
+    def write(self, data: bytes) -> None:
+        room = self.limit - len(self.buf)
+        if room > 0:
+            self.buf += data[:room]
+
+    def text(self) -> str:
+        try:
+            return bytes(self.buf).decode(self.charset, errors="ignore")
+        except LookupError:
+            return bytes(self.buf).decode("utf-8", errors="ignore")
+
+class _AttachmentSink:
+    def __init__(self, filename: str, ctype: str, spill_dir: Optional[Path], max_spill: int):
+        self.meta = AttachmentMeta(filename=filename, content_type=ctype, size=0, sha256="")
+        self._h = hashlib.sha256()
+        self._spill = None
+        self._max_spill = max_spill
+        if spill_dir is not None:
+            spill_dir.mkdir(parents=True, exist_ok=True)
+            self._spill = tempfile.NamedTemporaryFile(dir=spill_dir, suffix=".part", delete=False)
+
+    def write(self, data: bytes) -> None:
+        self._h.update(data)
+        self.meta.size += len(data)
+        if self._spill is not None:
+            if self.meta.size > self._max_spill:
+                self._drop_spill()
+            else:
+                self._spill.write(data)
+
+    def _drop_spill(self) -> None:
+        self._spill.close()
+        try:
+            os.unlink(self._spill.name)
+        except OSError:
+            pass
+        self._spill = None
+
+    def finish(self) -> AttachmentMeta:
+        self.meta.sha256 = self._h.hexdigest()
+        if self._spill is not None:
+            self._spill.close()
+            # content-addressed: identical attachments share one spill file
+            final = Path(self._spill.name).with_name(self.meta.sha256)
+            try:
+                os.replace(self._spill.name, final)
+                self.meta.spill_path = str(final)
+            except OSError:
+                try:
+                    os.unlink(self._spill.name)
+                except OSError:
+                    pass
+        return self.meta
+
+class _Parser:
+    def __init__(self, fp: BinaryIO, spill_dir: Optional[Path], max_spill: int, max_text: int):
+        self.fp = fp
+        self.spill_dir = spill_dir
+        self.max_spill = max_spill
+        self.max_text = max_text
+        self.texts: List[_TextSink] = []
+        self.attachments: List[AttachmentMeta] = []
+
+    def _readline(self) -> bytes:
+        return self.fp.readline(LINE_LIMIT)
+
+    def read_headers(self) -> Message:
+        p = BytesFeedParser(policy=compat32)
+        while True:
+            line = self._readline()
+            if not line:
+                break
+            p.feed(line)
+            if line in (b"\r\n", b"\n"):
+                break
+        return p.close()
+
+    @staticmethod
+    def _boundary(line: bytes, boundaries: List[bytes]) -> Optional[Tuple[bytes, bool]]:
+        """(boundary, is_close) if line is a delimiter for any open multipart."""
+        if not line.startswith(b"--"):
+            return None
+        s = line.rstrip()
+        for b in reversed(boundaries):
+            if s == b"--" + b:
+                return b, False
+            if s == b"--" + b + b"--":
+                return b, True
+        return None
+
+    def _skip_to_boundary(self, boundaries: List[bytes]) -> Optional[Tuple[bytes, bool]]:
+        while True:
+            line = self._readline()
+            if not line:
+                return None
+            hit = self._boundary(line, boundaries)
+            if hit:
+                return hit
+
+    def _sink(self, headers: Message):
+        ctype = headers.get_content_type() or ""
+        disp = (headers.get("Content-Disposition") or "").lower()
+        if "attachment" in disp:
+            fname = decode_header_value(headers.get_filename() or "attachment.bin")
+            return _AttachmentSink(fname, ctype, self.spill_dir, self.max_spill)
+        if ctype.startswith("text/plain"):
+            sink = _TextSink(headers.get_content_charset() or "utf-8", self.max_text)
+            self.texts.append(sink)
+            return sink
+        return None  # other inline parts (html, images) are skipped unread
+
+    def _leaf(self, headers: Message, boundaries: List[bytes]) -> Optional[Tuple[bytes, bool]]:
+        sink = self._sink(headers)
+        dec = _decoder(headers)
+        pending = b""
+        hit = None
+        while True:
+            line = self._readline()
+            if not line:
+                break
+            hit = self._boundary(line, boundaries)
+            if hit:
+                # the line break before a delimiter belongs to the delimiter
+                if pending.endswith(b"\r\n"):
+                    pending = pending[:-2]
+                elif pending.endswith(b"\n"):
+                    pending = pending[:-1]
+                break
+            if sink is not None and pending:
+                sink.write(dec.feed(pending))
+            pending = line
+        if sink is not None:
+            if pending:
+                sink.write(dec.feed(pending))
+            sink.write(dec.close())
+            if isinstance(sink, _AttachmentSink):
+                self.attachments.append(sink.finish())
+        return hit
+
+    def part(self, headers: Message, boundaries: List[bytes]) -> Optional[Tuple[bytes, bool]]:
+        """Consume one part's body; returns the delimiter that ended it (None at EOF)."""
+        if headers.get_content_maintype() == "multipart":
+            b = headers.get_param("boundary")
+            if not b:
+                return self._leaf(headers, boundaries)
+            b = str(b).encode("utf-8", "ignore")
+            inner = boundaries + [b]
+            hit = self._skip_to_boundary(inner)  # preamble
+            while hit and hit[0] == b and not hit[1]:
+                hit = self.part(self.read_headers(), inner)
+            if hit and hit[0] == b:
+                hit = self._skip_to_boundary(boundaries)  # epilogue
+            return hit
+        if headers.get_content_type() == "message/rfc822":
+            # attached/forwarded mail: its own parts count, as with Message.walk()
+            return self.part(self.read_headers(), boundaries)
+        return self._leaf(headers, boundaries)
+
+def parse_stream(
+    fp: BinaryIO,
+    *,
+    spill_dir: Optional[Path] = None,
+    max_spill_bytes: int = 10 * 1024 * 1024,
+    max_text_bytes: int = MAX_TEXT_BYTES,
+) -> ParsedEmail:
+    """
+    Parse one message from a binary stream with memory bounded by the text
+    cap, whatever the attachment sizes. With spill_dir, decoded attachments up
+    to max_spill_bytes are written there, named by SHA-256.
+    """
+    p = _Parser(fp, Path(spill_dir) if spill_dir else None, max_spill_bytes, max_text_bytes)
+    top = p.read_headers()
+    p.part(top, [])
+    body = "\n".join(s.text() for s in p.texts).strip()
+    return ParsedEmail(
+        subject=decode_header_value(top.get("Subject", "")),
+        from_addr=decode_header_value(top.get("From", "")),
+        body_text=body,
+        attachments=p.attachments,
+    )
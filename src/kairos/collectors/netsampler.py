@@ -0,0 +1,198 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import threading
+import time
+
+import psutil
+
+# Optional import — sampling is disabled if missing
+try:
+    import numpy as np  # type: ignore
+except Exception:
+    np = None
+
+from ..core.netindex import is_public_ip
+
+FlowKey = Tuple[int, str, int]          # (pid, remote ip, remote port)
+ConnKey = Tuple[int, str, int, int]     # flow + local port (one TCP connection)
+
+_LIVE_STATES = {"ESTABLISHED", "SYN_SENT"}
+
+@dataclass
+class FlowStats:
+    pid: int
+    raddr: str
+    rport: int
+    events: int           # connections opened in the buffer window
+    mean_interval: float  # seconds between connection opens
+    jitter: float         # stddev / mean of the intervals
+    mean_lifetime: float  # seconds a connection stayed open (closed ones only)
+
+def _live_conns() -> Iterable[ConnKey]:
+    for c in psutil.net_connections(kind="inet"):
+        if not c.raddr or (c.status or "").upper() not in _LIVE_STATES:
+            continue
+        rip = c.raddr.ip if hasattr(c.raddr, "ip") else c.raddr[0]
+        rport = c.raddr.port if hasattr(c.raddr, "port") else c.raddr[1]
+        lport = (c.laddr.port if hasattr(c.laddr, "port") else c.laddr[1]) if c.laddr else 0
+        yield (c.pid or 0, rip, int(rport), int(lport))
+
+class ConnSampler:
+    """
+    Polls live connections into a fixed-size ring buffer of connection-open
+    events (timestamp, flow id, lifetime). Memory is O(capacity) however long
+    it runs: old events are overwritten and the flow table is compacted to
+    the flows still present in the buffer.
+    """
+
+    def __init__(self, capacity: int = 65536, source: Optional[Callable[[], Iterable[ConnKey]]] = None):
+        if np is None:
+            raise RuntimeError("numpy is required for connection sampling")
+        self.capacity = int(capacity)
+        self._ts = np.zeros(self.capacity, dtype=np.float64)
+        self._flow = np.zeros(self.capacity, dtype=np.int64)
+        self._life = np.full(self.capacity, np.nan, dtype=np.float64)
+        self._written = 0  # total events ever written (head = written % capacity)
+        self._flow_ids: Dict[FlowKey, int] = {}
+        self._flow_keys: List[FlowKey] = []
+        # open connections -> (event sequence number, first seen, last seen)
+        self._open: Dict[ConnKey, Tuple[int, float, float]] = {}
+        self._source = source or _live_conns
+        self.polls = 0
+
+    def _flow_id(self, key: FlowKey) -> int:
+        fid = self._flow_ids.get(key)
+        if fid is None:
+            if len(self._flow_keys) >= self.capacity:
+                self._compact_flows()
+            fid = len(self._flow_keys)
+            self._flow_ids[key] = fid
+            self._flow_keys.append(key)
+        return fid
+
+    def _compact_flows(self) -> None:
+        n = min(self._written, self.capacity)
+        live = np.unique(self._flow[:n])
+        remap = np.full(len(self._flow_keys), -1, dtype=np.int64)
+        remap[live] = np.arange(len(live), dtype=np.int64)
+        self._flow[:n] = remap[self._flow[:n]]
+        self._flow_keys = [self._flow_keys[i] for i in live.tolist()]
+        self._flow_ids = {k: i for i, k in enumerate(self._flow_keys)}
+
+    def _close(self, seq: int, first: float, last: float) -> None:
+        if self._written - seq <= self.capacity:  # slot not overwritten yet
+            self._life[seq % self.capacity] = last - first
+
+    def poll(self, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        seen = set()
+        for ck in self._source():
+            seen.add(ck)
+            cur = self._open.get(ck)
+            if cur is not None:
+                self._open[ck] = (cur[0], cur[1], now)
+                continue
+            slot = self._written % self.capacity
+            self._ts[slot] = now
+            self._flow[slot] = self._flow_id(ck[:3])
+            self._life[slot] = np.nan
+            self._open[ck] = (self._written, now, now)
+            self._written += 1
+        for ck in [k for k in self._open if k not in seen]:
+            self._close(*self._open.pop(ck))
+        self.polls += 1
+
+    def run(self, seconds: float, interval: float = 1.0, stop: Optional[threading.Event] = None) -> None:
+        stop = stop or threading.Event()
+        end = time.monotonic() + seconds
+        while not stop.is_set():
+            self.poll()
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            stop.wait(min(interval, remaining))
+
+    def flow_stats(self) -> List[FlowStats]:
+        """Per-flow inter-arrival statistics, computed vectorized over the buffer."""
+        n = min(self._written, self.capacity)
+        if n == 0:
+            return []
+        ts, fl, life = self._ts[:n], self._flow[:n], self._life[:n]
+        nflows = len(self._flow_keys)
+
+        order = np.lexsort((ts, fl))
+        ts_s, fl_s = ts[order], fl[order]
+        same = fl_s[1:] == fl_s[:-1]
+        gaps = np.diff(ts_s)[same]
+        gflow = fl_s[1:][same]
+
+        events = np.bincount(fl, minlength=nflows)
+        cnt = np.bincount(gflow, minlength=nflows)
+        s1 = np.bincount(gflow, weights=gaps, minlength=nflows)
+        s2 = np.bincount(gflow, weights=gaps * gaps, minlength=nflows)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = s1 / cnt
+            std = np.sqrt(np.maximum(s2 / cnt - mean * mean, 0.0))
+            jitter = std / mean
+            closed = ~np.isnan(life)
+            lcnt = np.bincount(fl[closed], minlength=nflows)
+            lsum = np.bincount(fl[closed], weights=life[closed], minlength=nflows)
+            mlife = lsum / lcnt
+
+        out: List[FlowStats] = []
+        for fid in np.nonzero(events)[0].tolist():
+            pid, rip, rport = self._flow_keys[fid]
+            out.append(FlowStats(
+                pid=pid, raddr=rip, rport=rport,
+                events=int(events[fid]),
+                mean_interval=float(mean[fid]) if cnt[fid] else 0.0,
+                jitter=float(jitter[fid]) if cnt[fid] and mean[fid] > 0 else 0.0,
+                mean_lifetime=float(mlife[fid]) if lcnt[fid] else 0.0,
+            ))
+        return out
+
+    def beacons(self, *, min_events: int = 4, max_jitter: float = 0.2, min_interval: float = 2.0) -> List[FlowStats]:
+        """Flows to public IPs that reconnect on a regular period."""
+        return [
+            f for f in self.flow_stats()
+            if f.events >= min_events
+            and f.mean_interval >= min_interval
+            and f.jitter <= max_jitter
+            and is_public_ip(f.raddr)
+        ]
+
+def beacon_artifacts(flows: List[FlowStats], names: Optional[Dict[int, str]] = None) -> List[Dict]:
+    names = names or {}
+    arts: List[Dict] = []
+    for f in flows:
+        name = names.get(f.pid)
+        if name is None:
+            try:
+                name = (psutil.Process(f.pid).name() or "").lower()
+            except Exception:
+                name = "unknown"
+            names[f.pid] = name
+        arts.append({
+            "type": "network:beacon",
+            "value": (f"pid={f.pid} {name} -> {f.raddr}:{f.rport} every ~{f.mean_interval:.1f}s "
+                      f"(jitter {f.jitter:.0%}, n={f.events}, avg lifetime {f.mean_lifetime:.1f}s)"),
+            "raddr": f.raddr,
+            "rport": f.rport,
+        })
+    return arts
+
+def sample_beacons(cfg_net: Dict, seconds: Optional[float] = None, names: Optional[Dict[int, str]] = None) -> List[Dict]:
+    """One-shot sampling window for `kairos scan` (network.sample_seconds)."""
+    seconds = float(cfg_net.get("sample_seconds", 0) if seconds is None else seconds)
+    if seconds <= 0 or np is None:
+        return []
+    beacon = cfg_net.get("beacon", {}) or {}
+    sampler = ConnSampler(capacity=int(cfg_net.get("buffer_size", 65536)))
+    sampler.run(seconds, interval=float(cfg_net.get("sample_interval", 1.0)))
+    flows = sampler.beacons(
+        min_events=int(beacon.get("min_events", 4)),
+        max_jitter=float(beacon.get("max_jitter", 0.2)),
+        min_interval=float(beacon.get("min_interval", 2.0)),
+    )
+    return beacon_artifacts(flows, names)
@@ -1,7 +1,10 @@
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import psutil
-import ipaddress
+
+from ..core import matcher
+from ..core.netindex import is_public_ip
+from .processes import ProcInfo
 
 @dataclass
 class NetConnInfo:
@@ -16,6 +19,7 @@ class NetConnInfo:
 
 SUSPICIOUS_PROC_NAMES = {"powershell.exe","mshta.exe","wscript.exe","cscript.exe","rundll32.exe","cmd.exe"}
 SUSPICIOUS_KEYWORDS = [" -enc", " -e ", "downloadstring", "invoke-webrequest", "bitsadmin", "frombase64string"]
+_KEYWORDS_ID = matcher.register("network.keywords", SUSPICIOUS_KEYWORDS)
 
 def _safe_name(p: psutil.Process) -> str:
     try:
@@ -30,14 +34,34 @@ def _safe_cmd(p: psutil.Process) -> str:
         return ""
 
 def _is_public_ip(ip: str) -> bool:
+    return is_public_ip(ip)  # memoized; sockets repeat the same remotes a lot
+
+def _resolve_pid(pid: int, cache: Dict[int, Tuple[str, str]]) -> Tuple[str, str]:
+    """(name, cmdline) for pid, opening psutil.Process at most once per scan."""
+    hit = cache.get(pid)
+    if hit is not None:
+        return hit
+    name, cmd = "unknown", ""
     try:
-        obj = ipaddress.ip_address(ip)
-        return not (obj.is_private or obj.is_loopback or obj.is_link_local)
+        p = psutil.Process(pid)
+        name = _safe_name(p)
+        cmd = _safe_cmd(p)
     except Exception:
-        return False
+        pass
+    cache[pid] = (name, cmd)
+    return name, cmd
 
-def snapshot_netconns() -> List[NetConnInfo]:
+def snapshot_netconns(procs: Optional[Dict[int, ProcInfo]] = None) -> List[NetConnInfo]:
+    """
+    Snapshot inet sockets. Pass the pid->ProcInfo table from the process
+    snapshot so owners are looked up there; pids missing from it (short-lived
+    processes) are resolved once each and cached for the rest of the call.
+    """
     conns: List[NetConnInfo] = []
+    cache: Dict[int, Tuple[str, str]] = {}
+    if procs:
+        for pid, rec in procs.items():
+            cache[pid] = (rec.name, rec.cmdline)
     for c in psutil.net_connections(kind="inet"):
         pid = c.pid or 0
         laddr_ip, laddr_port = (None, None)
@@ -51,12 +75,7 @@ def snapshot_netconns() -> List[NetConnInfo]:
 
         name, cmd = "unknown", ""
         if pid:
-            try:
-                p = psutil.Process(pid)
-                name = _safe_name(p)
-                cmd = _safe_cmd(p)
-            except Exception:
-                pass
+            name, cmd = _resolve_pid(pid, cache)
 
         conns.append(NetConnInfo(
             pid=pid,
@@ -78,7 +97,7 @@ def find_suspicious_netconns(conns: List[NetConnInfo]) -> List[NetConnInfo]:
             continue
 
         low_port_sus = (n.rport in {80, 8080, 53})  # cleartext HTTP/DNS-ish
-        proc_sus = (n.proc_name in SUSPICIOUS_PROC_NAMES) or any(k in n.cmdline for k in SUSPICIOUS_KEYWORDS)
+        proc_sus = (n.proc_name in SUSPICIOUS_PROC_NAMES) or matcher.matches(n.cmdline, _KEYWORDS_ID)
         est = n.status.upper() in {"ESTABLISHED", "SYN_SENT"}
 
         if (proc_sus and est) or (proc_sus and low_port_sus):
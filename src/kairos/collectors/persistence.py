@@ -1,8 +1,15 @@
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
 import os, subprocess, shlex
+import csv
+import io
+import re
+import time
+import xml.etree.ElementTree as ET
 from pathlib import Path
 
+from ..core.stages import StageRunner
+
 try:
     import winreg  # type: ignore
 except Exception:
@@ -79,46 +86,138 @@ def collect_runkeys() -> List[PersistItem]:
 
 # ---- Scheduled Tasks (schtasks) ----
 
-def collect_tasks() -> List[PersistItem]:
-    items: List[PersistItem] = []
-    try:
-        # /fo LIST /v gives action lines; keep it light and robust
-        out = subprocess.check_output(
-            ["schtasks.exe", "/query", "/fo", "LIST", "/v"],
-            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
-            stderr=subprocess.STDOUT
-        ).decode("utf-8", "ignore").splitlines()
-    except Exception:
-        return items
+# (args, timeout) -> stdout bytes; swap in a stub to replay captured output
+CommandRunner = Callable[[List[str], Optional[float]], bytes]
 
-    current = {}
-    def flush_task():
-        if current.get("TaskName"):
-            action = current.get("Actions", "") or current.get("Task To Run", "")
-            items.append(PersistItem(
-                ptype="task",
-                name=current.get("TaskName","").strip(),
-                path=action.strip(),
-                details=current.get("Schedule","") or current.get("Run As User","")
-            ))
-
-    for line in out:
-        if line.strip() == "":
-            if current:
-                flush_task()
+def run_command(args: List[str], timeout: Optional[float] = None) -> bytes:
+    # subprocess.run kills the child when the timeout expires
+    return subprocess.run(
+        args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        timeout=timeout,
+        check=True,
+        creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+    ).stdout
+
+# ("Schedule" holds only a placeholder in /v output; "Schedule Type" is informative)
+_TASK_FIELDS = ("TaskName", "Actions", "Task To Run", "Schedule Type", "Run As User")
+
+def _task_item(fields: Dict[str, str]) -> Optional[PersistItem]:
+    name = (fields.get("TaskName") or "").strip()
+    if not name:
+        return None
+    action = fields.get("Actions", "") or fields.get("Task To Run", "")
+    return PersistItem(
+        ptype="task",
+        name=name,
+        path=action.strip(),
+        details=fields.get("Schedule Type", "") or fields.get("Run As User", ""),
+    )
+
+def parse_schtasks_list(text: str) -> List[PersistItem]:
+    """`schtasks /query /fo LIST /v`: blank-line separated "Key: value" blocks."""
+    items: List[PersistItem] = []
+    current: Dict[str, str] = {}
+    for line in text.splitlines():
+        k, sep, v = line.partition(":")
+        if not sep:
+            if not line.strip() and current:
+                item = _task_item(current)
+                if item:
+                    items.append(item)
                 current = {}
             continue
-        if ":" in line:
-            k, v = line.split(":", 1)
-            k = k.strip()
-            v = v.strip()
-            if k in ("TaskName","Actions","Task To Run","Schedule","Run As User"):
-                current[k] = v
+        k = k.strip()
+        if k in _TASK_FIELDS:
+            current[k] = v.strip()
     if current:
-        flush_task()
+        item = _task_item(current)
+        if item:
+            items.append(item)
+    return items
+
+# column positions of `schtasks /fo CSV /v` (used when headers are localized)
+_CSV_POS = {"TaskName": 1, "Task To Run": 8, "Run As User": 14, "Schedule Type": 18}
+
+def parse_schtasks_csv(text: str) -> List[PersistItem]:
+    """`schtasks /query /fo CSV /v`: the header row repeats for every task folder."""
+    items: List[PersistItem] = []
+    header: Optional[List[str]] = None
+    cols = dict(_CSV_POS)
+    for row in csv.reader(io.StringIO(text)):
+        if not row:
+            continue
+        if header is None or row == header:
+            if header is None:
+                header = row
+                if "TaskName" in row:
+                    cols = {k: row.index(k) for k in _CSV_POS if k in row}
+            continue
+        item = _task_item({k: row[i] for k, i in cols.items() if i < len(row)})
+        if item:
+            items.append(item)
+    return items
+
+_XML_TASK_RE = re.compile(r"<!--\s*(\\[^>]*?)\s*-->\s*(<\?xml[^>]*\?>\s*)?(<Task\b.*?</Task>)", re.S)
 
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+def parse_schtasks_xml(text: str) -> List[PersistItem]:
+    """`schtasks /query /xml`: one <Task> document per task, each preceded by a <!-- \\name --> comment."""
+    items: List[PersistItem] = []
+    for m in _XML_TASK_RE.finditer(text):
+        try:
+            root = ET.fromstring(m.group(3))
+        except ET.ParseError:
+            continue
+        actions: List[str] = []
+        triggers: List[str] = []
+        user = ""
+        for el in root.iter():
+            tag = _local(el.tag)
+            if tag == "Exec":
+                parts = {_local(c.tag): (c.text or "").strip() for c in el}
+                actions.append(" ".join(p for p in (parts.get("Command", ""), parts.get("Arguments", "")) if p))
+            elif tag.endswith("Trigger") and tag != "Triggers":
+                triggers.append(tag)
+            elif tag == "UserId" and not user:
+                user = (el.text or "").strip()
+        items.append(PersistItem(
+            ptype="task",
+            name=m.group(1).strip(),
+            path="; ".join(actions),
+            details=", ".join(triggers) or user,
+        ))
     return items
 
+def parse_schtasks(text: str, fmt: Optional[str] = None) -> List[PersistItem]:
+    """Parse schtasks output in LIST, CSV or XML form (sniffed when fmt is None)."""
+    if fmt is None:
+        head = text.lstrip()[:200]
+        fmt = "csv" if head.startswith('"') else "xml" if head.startswith("<") else "list"
+    parser = {"csv": parse_schtasks_csv, "xml": parse_schtasks_xml}.get(fmt.lower(), parse_schtasks_list)
+    items = parser(text)
+    # /v output repeats a task once per trigger
+    seen = set()
+    out: List[PersistItem] = []
+    for it in items:
+        key = (it.name, it.path)
+        if key not in seen:
+            seen.add(key)
+            out.append(it)
+    return out
+
+def collect_tasks(runner: Optional[CommandRunner] = None, *, fmt: str = "csv",
+                  timeout: Optional[float] = 60) -> List[PersistItem]:
+    args = ["schtasks.exe", "/query", "/xml"] if fmt == "xml" else ["schtasks.exe", "/query", "/fo", fmt.upper(), "/v"]
+    try:
+        out = (runner or run_command)(args, timeout).decode("utf-8", "ignore")
+    except Exception:
+        return []
+    return parse_schtasks(out, fmt)
+
 # ---- Services (psutil) ----
 
 def collect_services() -> List[PersistItem]:
@@ -144,18 +243,42 @@ def collect_services() -> List[PersistItem]:
         pass
     return items
 
-def collect_persistence() -> List[PersistItem]:
+def collect_persistence(*, timeout: Optional[float] = 60, tasks_format: str = "csv",
+                        runner: Optional[CommandRunner] = None, stats: Optional[Dict] = None,
+                        inline: bool = False) -> List[PersistItem]:
+    """
+    Run keys, scheduled tasks and services collected concurrently, each with
+    `timeout` seconds; a sub-collector that fails or overruns contributes
+    nothing. Per-collector status/timings go into `stats` when given.
+    inline=True runs them one after another on the calling thread (profiling);
+    only schtasks' own command timeout then applies.
+    """
+    if inline:
+        return _collect_inline(timeout, tasks_format, runner, stats)
+    stages = StageRunner()
+    stages.add("runkeys", collect_runkeys, timeout=timeout, default=[])
+    stages.add("tasks", lambda: collect_tasks(runner, fmt=tasks_format, timeout=timeout), timeout=timeout, default=[])
+    stages.add("services", collect_services, timeout=timeout, default=[])
+    stages.run()
+    if stats is not None:
+        stats.update(stages.stats())
     items: List[PersistItem] = []
-    try:
-        items.extend(collect_runkeys())
-    except Exception:
-        pass
-    try:
-        items.extend(collect_tasks())
-    except Exception:
-        pass
-    try:
-        items.extend(collect_services())
-    except Exception:
-        pass
-    return items
\ No newline at end of file
+    for name in ("runkeys", "tasks", "services"):
+        items.extend(stages.result(name))
+    return items
+
+def _collect_inline(timeout, tasks_format, runner, stats) -> List[PersistItem]:
+    items: List[PersistItem] = []
+    collectors = (("runkeys", collect_runkeys),
+                  ("tasks", lambda: collect_tasks(runner, fmt=tasks_format, timeout=timeout)),
+                  ("services", collect_services))
+    for name, fn in collectors:
+        t0 = time.monotonic()
+        try:
+            items.extend(fn())
+            st = {"status": "ok"}
+        except Exception as e:
+            st = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+        if stats is not None:
+            stats[name] = dict(st, ms=round((time.monotonic() - t0) * 1000.0, 2))
+    return items
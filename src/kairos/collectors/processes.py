@@ -1,7 +1,10 @@
-from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import time
 import psutil
 
+from ..core import matcher
+
 @dataclass
 class ProcInfo:
     pid: int
@@ -12,6 +15,20 @@ class ProcInfo:
     parent_name: Optional[str]
     parent_cmdline: Optional[str]
 
+@dataclass
+class ProcSnapshot:
+    procs: List[ProcInfo]
+    by_pid: Dict[int, ProcInfo] = field(default_factory=dict)
+    elapsed_ms: float = 0.0
+    access_denied: int = 0   # processes where at least one attribute was denied
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "count": len(self.procs),
+            "elapsed_ms": round(self.elapsed_ms, 2),
+            "access_denied": self.access_denied,
+        }
+
 SUSPECT_PATTERNS = [
     "powershell -enc",
     "powershell -e ",
@@ -23,55 +40,69 @@ SUSPECT_PATTERNS = [
     "cmd /c powershell",
     "cmd.exe /c powershell",
 ]
+_SUSPECT_ID = matcher.register("processes.suspect", SUSPECT_PATTERNS)
 
-def _safe_cmdline(p: psutil.Process) -> str:
-    try:
-        return " ".join(p.cmdline()).lower()
-    except Exception:
-        return ""
+# attributes prefetched by process_iter in a single pass per process
+_ATTRS = ["pid", "ppid", "name", "username", "cmdline"]
 
-def _safe_name(p: psutil.Process) -> str:
-    try:
-        return (p.name() or "").lower()
-    except Exception:
-        return "unknown"
+# placeholder psutil puts in info for attributes we were not allowed to read
+_DENIED = object()
 
-def _safe_user(p: psutil.Process) -> Optional[str]:
-    try:
-        return p.username()
-    except Exception:
-        return None
+def take_process_snapshot() -> ProcSnapshot:
+    """
+    Read every process exactly once (process_iter attribute prefetching),
+    index the records by pid and fill parent name/cmdline from that index.
+    """
+    t0 = time.perf_counter()
+    procs: List[ProcInfo] = []
+    by_pid: Dict[int, ProcInfo] = {}
+    denied = 0
+
+    for p in psutil.process_iter(attrs=_ATTRS, ad_value=_DENIED):
+        info = p.info
+        if any(info.get(a) is _DENIED for a in _ATTRS):
+            denied += 1
 
-def _parent_info(p: psutil.Process) -> Tuple[Optional[int], Optional[str], Optional[str]]:
-    try:
-        ppid = p.ppid()
-        if not ppid:
-            return None, None, None
-        try:
-            pp = psutil.Process(ppid)
-            return ppid, _safe_name(pp), _safe_cmdline(pp)
-        except Exception:
-            return ppid, None, None
-    except Exception:
-        return None, None, None
+        name = info.get("name")
+        name = (name or "").lower() if name is not _DENIED else "unknown"
+        user = info.get("username")
+        user = user if user is not _DENIED else None
+        cmd = info.get("cmdline")
+        cmd = " ".join(cmd).lower() if cmd and cmd is not _DENIED else ""
+        ppid = info.get("ppid")
+        ppid = ppid if ppid and ppid is not _DENIED else None
+
+        rec = ProcInfo(
+            pid=p.pid,
+            ppid=ppid,
+            name=name,
+            username=user,
+            cmdline=cmd,
+            parent_name=None,
+            parent_cmdline=None,
+        )
+        procs.append(rec)
+        by_pid[rec.pid] = rec
+
+    # second pass over the in-memory table only (no syscalls)
+    for rec in procs:
+        if rec.ppid is None:
+            continue
+        parent = by_pid.get(rec.ppid)
+        if parent is not None:
+            rec.parent_name = parent.name
+            rec.parent_cmdline = parent.cmdline
+
+    return ProcSnapshot(
+        procs=procs,
+        by_pid=by_pid,
+        elapsed_ms=(time.perf_counter() - t0) * 1000.0,
+        access_denied=denied,
+    )
 
 def snapshot_processes() -> List[ProcInfo]:
     """Return a lightweight snapshot of running processes (with parent info)."""
-    procs: List[ProcInfo] = []
-    for p in psutil.process_iter(attrs=[]):
-        ppid, pname, pcmd = _parent_info(p)
-        procs.append(
-            ProcInfo(
-                pid=p.pid,
-                ppid=ppid,
-                name=_safe_name(p),
-                username=_safe_user(p),
-                cmdline=_safe_cmdline(p),
-                parent_name=pname,
-                parent_cmdline=pcmd,
-            )
-        )
-    return procs
+    return take_process_snapshot().procs
 
 def find_suspicious_processes(procs: List[ProcInfo]) -> List[ProcInfo]:
     """Filter processes whose cmdlines match simple suspicious patterns."""
@@ -80,6 +111,6 @@ def find_suspicious_processes(procs: List[ProcInfo]) -> List[ProcInfo]:
         cl = proc.cmdline
         if not cl:
             continue
-        if any(pat in cl for pat in SUSPECT_PATTERNS):
+        if matcher.matches(cl, _SUSPECT_ID):
             hits.append(proc)
-    return hits
\ No newline at end of file
+    return hits
@@ -0,0 +1,82 @@
+"""
+Persistent file digest cache (SQLite under paths.logs).
+
+Entries are keyed on (path, size, mtime_ns, inode) so a file is only hashed
+again when it changes. Hits and new digests are buffered in memory and written
+in one transaction by flush(); the table is capped by evicting the least
+recently used rows.
+"""
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import os
+import time
+
+from .sqlitestore import SqliteStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_digests (
+    path      TEXT PRIMARY KEY,
+    size      INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    inode     INTEGER NOT NULL,
+    sha256    TEXT,
+    sha1      TEXT,
+    md5       TEXT,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS file_digests_lru ON file_digests(last_used);
+"""
+
+DIGEST_NAMES = ("sha256", "sha1", "md5")
+
+def _key(st: os.stat_result) -> Tuple[int, int, int]:
+    # st_ino is the NTFS file id on Windows (the sweep re-stats DirEntry results that lack it)
+    return (int(st.st_size), int(st.st_mtime_ns), int(getattr(st, "st_ino", 0) or 0))
+
+class HashCache(SqliteStore):
+    def __init__(self, db_path: Path, max_entries: int = 200_000):
+        super().__init__(db_path, _SCHEMA, table="file_digests", max_entries=max_entries)
+        self._touched: List[str] = []
+        self._pending: Dict[str, tuple] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, st: os.stat_result) -> Optional[Dict[str, str]]:
+        """Cached digests for path if size/mtime/inode still match, else None."""
+        size, mtime_ns, inode = _key(st)
+        with self._lock:
+            row = self._pending.get(path)
+            if row is None:
+                row = self._db.execute(
+                    "SELECT size, mtime_ns, inode, sha256, sha1, md5 FROM file_digests WHERE path = ?",
+                    (path,),
+                ).fetchone()
+            if row is None or tuple(row[:3]) != (size, mtime_ns, inode):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched.append(path)
+        return {n: d for n, d in zip(DIGEST_NAMES, row[3:6]) if d}
+
+    def put(self, path: str, st: os.stat_result, digests: Dict[str, Optional[str]]) -> None:
+        size, mtime_ns, inode = _key(st)
+        with self._lock:
+            self._pending[path] = (size, mtime_ns, inode) + tuple(digests.get(n) for n in DIGEST_NAMES)
+
+    def flush(self) -> None:
+        now = time.time()
+        with self._lock:
+            with self._db:
+                if self._pending:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO file_digests VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        [(p,) + row + (now,) for p, row in self._pending.items()],
+                    )
+                if self._touched:
+                    self._db.executemany(
+                        "UPDATE file_digests SET last_used = ? WHERE path = ?",
+                        [(now, p) for p in self._touched],
+                    )
+                self._evict()
+            self._pending.clear()
+            self._touched.clear()
@@ -0,0 +1,46 @@
+"""
+Processed-file index for the local mailbox directory (SQLite under paths.logs).
+
+A file counts as processed while its (name, size, mtime_ns) is unchanged, so
+each scan only parses files that are new or were rewritten since. Rows for
+files that have left the directory are dropped to keep the table bounded.
+"""
+from pathlib import Path
+from typing import Iterable, List, Tuple
+import time
+
+from .sqlitestore import SqliteStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mailbox_seen (
+    name      TEXT PRIMARY KEY,
+    size      INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    seen_at   REAL NOT NULL
+);
+"""
+
+class MailboxIndex(SqliteStore):
+    def __init__(self, db_path: Path):
+        super().__init__(db_path, _SCHEMA, table="mailbox_seen")
+
+    def new_files(self, entries: Iterable[Tuple[str, int, int]]) -> List[Tuple[str, int, int]]:
+        """(name, size, mtime_ns) entries not yet processed in that exact state."""
+        with self._lock:
+            seen = {name: (size, mtime) for name, size, mtime in
+                    self._db.execute("SELECT name, size, mtime_ns FROM mailbox_seen")}
+        return [e for e in entries if seen.get(e[0]) != (e[1], e[2])]
+
+    def mark(self, entries: Iterable[Tuple[str, int, int]]) -> None:
+        now = time.time()
+        rows = [(name, size, mtime, now) for name, size, mtime in entries]
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO mailbox_seen VALUES (?, ?, ?, ?)", rows)
+
+    def forget_missing(self, present: Iterable[str]) -> None:
+        keep = set(present)
+        with self._lock:
+            gone = [(n,) for (n,) in self._db.execute("SELECT name FROM mailbox_seen") if n not in keep]
+            if gone:
+                with self._db:
+                    self._db.executemany("DELETE FROM mailbox_seen WHERE name = ?", gone)
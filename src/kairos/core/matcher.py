@@ -0,0 +1,112 @@
+"""
+Shared multi-pattern keyword matcher.
+
+Every keyword list (collector patterns, analyzer keywords, policy deny lists)
+is registered under an id and compiled into ONE regex. A string is scanned a
+single time and the result (the set of list ids that matched) is memoized, so
+the same cmdline checked by processes, chains and policy costs one scan.
+"""
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+import re
+import threading
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """
+    Build a prefix-factored regex from literal words ("ab", "abc", "ax" ->
+    "a(?:b(?:c)?|x)"). Branches at each node start with distinct characters,
+    so matching costs O(keyword length) per position instead of O(#keywords),
+    and greedy optionals always yield the longest keyword at a position.
+    """
+    trie: Dict = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def emit(node: Dict) -> str:
+        terminal = "" in node
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            body = body + "?" if len(branches) == 1 and len(body) == 1 else "(?:" + body + ")?"
+        return body
+
+    return emit(trie)
+
+class KeywordMatcher:
+    def __init__(self, cache_size: int = 8192):
+        self._lists: Dict[str, Tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+        self._compiled: Optional[Tuple["re.Pattern[str]", Dict[str, FrozenSet[str]]]] = None
+        self._scan = lru_cache(maxsize=cache_size)(self._scan_uncached)
+
+    def register(self, list_id: str, keywords: Iterable[str]) -> str:
+        """Add or replace a keyword list (matched case-sensitively; callers pass lowercase)."""
+        kws = tuple(k for k in keywords if k)
+        with self._lock:
+            if self._lists.get(list_id) == kws:
+                return list_id
+            self._lists[list_id] = kws
+            self._compiled = None
+            self._scan.cache_clear()
+        return list_id
+
+    def _compile(self) -> Tuple["re.Pattern[str]", Dict[str, FrozenSet[str]]]:
+        with self._lock:
+            if self._compiled is not None:
+                return self._compiled
+            owners: Dict[str, set] = {}
+            for lid, kws in self._lists.items():
+                for k in kws:
+                    owners.setdefault(k, set()).add(lid)
+            words = sorted(owners, key=len, reverse=True)
+            # The lookahead reports the longest keyword at every position; all
+            # other keywords matching at that position are prefixes of it, so
+            # fold their owners in up front.
+            ids_for: Dict[str, FrozenSet[str]] = {}
+            for w in words:
+                ids = set(owners[w])
+                for i in range(1, len(w)):
+                    ids |= owners.get(w[:i], set())
+                ids_for[w] = frozenset(ids)
+            if words:
+                regex = re.compile(f"(?=({_trie_regex(words)}))", re.DOTALL)
+            else:
+                regex = re.compile(r"(?!)")
+            self._compiled = (regex, ids_for)
+            return self._compiled
+
+    def _scan_uncached(self, text: str) -> FrozenSet[str]:
+        regex, ids_for = self._compiled or self._compile()
+        found: set = set()
+        for m in regex.finditer(text):
+            found |= ids_for[m.group(1)]
+        return frozenset(found)
+
+    def scan(self, text: str) -> FrozenSet[str]:
+        """Return the ids of every registered list with a keyword in text."""
+        if not text:
+            return frozenset()
+        return self._scan(text)
+
+    def matches(self, text: str, list_id: str) -> bool:
+        return list_id in self.scan(text)
+
+    def keywords(self, list_id: str) -> List[str]:
+        return list(self._lists.get(list_id, ()))
+
+# process-wide instance every module registers into
+DEFAULT = KeywordMatcher()
+
+def register(list_id: str, keywords: Iterable[str]) -> str:
+    return DEFAULT.register(list_id, keywords)
+
+def scan(text: str) -> FrozenSet[str]:
+    return DEFAULT.scan(text)
+
+def matches(text: str, list_id: str) -> bool:
+    return DEFAULT.matches(text, list_id)
@@ -0,0 +1,77 @@
+"""
+Per-stage scan metrics: wall time, CPU time, item counts and (opt-in) peak
+traced memory, collected into the incident's `metrics` block.
+
+CPU time is that of the thread running the step (scan stages each own a
+thread); work a step hands to pools is not included. tracemalloc peaks are
+process-wide, so memory is only traced when stages run one at a time.
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional
+import threading
+import time
+import tracemalloc
+
+@dataclass
+class StepMetric:
+    wall_ms: float = 0.0
+    cpu_ms: float = 0.0
+    items: Optional[int] = None
+    peak_kb: Optional[float] = None
+
+    def count(self, n: int) -> None:
+        self.items = (self.items or 0) + int(n)
+
+    def as_dict(self) -> Dict:
+        out = {"wall_ms": round(self.wall_ms, 2), "cpu_ms": round(self.cpu_ms, 2)}
+        if self.items is not None:
+            out["items"] = self.items
+        if self.peak_kb is not None:
+            out["peak_kb"] = round(self.peak_kb, 1)
+        return out
+
+class ScanMetrics:
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self._lock = threading.Lock()
+        self._steps: Dict[str, StepMetric] = {}
+        self._t0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        self._started_tracing = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[StepMetric]:
+        rec = StepMetric()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        t0, c0 = time.perf_counter(), time.thread_time()
+        try:
+            yield rec
+        finally:
+            rec.wall_ms = (time.perf_counter() - t0) * 1000.0
+            rec.cpu_ms = (time.thread_time() - c0) * 1000.0
+            if self.trace_memory:
+                rec.peak_kb = max(0, tracemalloc.get_traced_memory()[1] - base) / 1024.0
+            with self._lock:
+                self._steps[name] = rec
+
+    def close(self) -> None:
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            steps = {name: rec.as_dict() for name, rec in self._steps.items()}
+        return {
+            "total_wall_ms": round((time.perf_counter() - self._t0) * 1000.0, 2),
+            "total_cpu_ms": round((time.process_time() - self._cpu0) * 1000.0, 2),
+            "trace_memory": self.trace_memory,
+            "steps": steps,
+        }
@@ -0,0 +1,131 @@
+"""
+Network classification helpers: memoized address parsing, sorted-range
+indexes for IP/CIDR allow and deny lists (bisect lookup, O(log n)) and domain
+suffix sets (one hash probe per host label).
+"""
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+import ipaddress
+
+IPAddr = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+@lru_cache(maxsize=65536)
+def parse_ip(value: Optional[str]) -> Optional[IPAddr]:
+    if not value:
+        return None
+    try:
+        ip = ipaddress.ip_address(value.strip().strip("[]"))
+    except ValueError:
+        return None
+    # ::ffff:1.2.3.4 should behave like 1.2.3.4
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        return ip.ipv4_mapped
+    return ip
+
+@lru_cache(maxsize=65536)
+def is_public_ip(value: Optional[str]) -> bool:
+    ip = parse_ip(value)
+    if ip is None:
+        return False
+    return not (ip.is_private or ip.is_loopback or ip.is_link_local)
+
+def _parse_network(entry: str) -> Optional[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]]:
+    try:
+        return ipaddress.ip_network(entry.strip(), strict=False)
+    except ValueError:
+        return None
+
+class CidrIndex:
+    """Merged, sorted [start, end] integer ranges per IP version."""
+
+    def __init__(self, entries: Iterable[str] = ()):
+        raw: Dict[int, List[Tuple[int, int]]] = {4: [], 6: []}
+        for e in entries:
+            net = _parse_network(e) if e else None
+            if net is not None:
+                raw[net.version].append((int(net.network_address), int(net.broadcast_address)))
+        self._starts: Dict[int, List[int]] = {}
+        self._ends: Dict[int, List[int]] = {}
+        for ver, ranges in raw.items():
+            ranges.sort()
+            merged: List[Tuple[int, int]] = []
+            for lo, hi in ranges:
+                if merged and lo <= merged[-1][1] + 1:
+                    if hi > merged[-1][1]:
+                        merged[-1] = (merged[-1][0], hi)
+                else:
+                    merged.append((lo, hi))
+            self._starts[ver] = [lo for lo, _ in merged]
+            self._ends[ver] = [hi for _, hi in merged]
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._starts.values())
+
+    def contains(self, value: Union[str, IPAddr, None]) -> bool:
+        ip = parse_ip(value) if isinstance(value, str) or value is None else value
+        if ip is None:
+            return False
+        starts = self._starts.get(ip.version)
+        if not starts:
+            return False
+        n = int(ip)
+        i = bisect_right(starts, n) - 1
+        return i >= 0 and n <= self._ends[ip.version][i]
+
+class DomainSet:
+    """
+    Domain suffix set. A lookup walks the host's labels ("a.b.example.com",
+    "b.example.com", ...) with one hash probe each, so its cost depends on the
+    host, not on how many domains are loaded.
+    """
+
+    def __init__(self, entries: Iterable[str] = ()):
+        self.domains: Set[str] = set()
+        for e in entries:
+            e = (e or "").strip().lower().lstrip("*.").rstrip(".")
+            if e:
+                self.domains.add(e)
+
+    def __len__(self) -> int:
+        return len(self.domains)
+
+    def match(self, host: Optional[str]) -> Optional[str]:
+        """The listed domain that host equals or falls under, else None."""
+        if not host or not self.domains:
+            return None
+        host = host.lower().rstrip(".")
+        while True:
+            if host in self.domains:
+                return host
+            dot = host.find(".")
+            if dot < 0:
+                return None
+            host = host[dot + 1:]
+
+class NetIndex:
+    """
+    Splits a mixed allow/deny list ("1.2.3.4", "10.0.0.0/8", "contoso.com")
+    into a CIDR range index and a domain suffix set.
+    """
+
+    def __init__(self, entries: Iterable[str] = ()):
+        cidrs: List[str] = []
+        names: List[str] = []
+        for e in entries:
+            e = (e or "").strip().lower()
+            if not e:
+                continue
+            if _parse_network(e) is not None:
+                cidrs.append(e)
+            else:
+                names.append(e)
+        self.cidrs = CidrIndex(cidrs)
+        self.domains = DomainSet(names)
+
+    def match_ip(self, value: Union[str, IPAddr, None]) -> bool:
+        return self.cidrs.contains(value)
+
+    def match_host(self, host: Optional[str]) -> bool:
+        """Exact or parent-domain match: "a.b.contoso.com" matches "contoso.com"."""
+        return self.domains.match(host) is not None
@@ -1,5 +1,11 @@
 from dataclasses import dataclass, field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import re
+
+from .matcher import KeywordMatcher
+from .netindex import NetIndex
+
+_DENY_CMDLINE_ID = "policy.deny_cmdline"
 
 @dataclass
 class Policy:
@@ -14,6 +20,18 @@ class Policy:
 
     deny_cmdline_keywords: List[str] = field(default_factory=list)
     deny_file_exts: List[str] = field(default_factory=list)
+    deny_ips_or_cidrs: List[str] = field(default_factory=list)
+
+    # compiled indexes for network / cmdline matching (built from the lists above)
+    allow_net: NetIndex = field(init=False, repr=False)
+    deny_net: NetIndex = field(init=False, repr=False)
+    deny_cmdline: KeywordMatcher = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.allow_net = NetIndex(self.allow_ips_or_domains)
+        self.deny_net = NetIndex(self.deny_ips_or_cidrs)
+        self.deny_cmdline = KeywordMatcher()
+        self.deny_cmdline.register(_DENY_CMDLINE_ID, self.deny_cmdline_keywords)
 
 def load_policy(cfg_alerts: Dict[str, Any], cfg_root: Dict[str, Any]) -> Policy:
     """
@@ -36,8 +54,32 @@ def load_policy(cfg_alerts: Dict[str, Any], cfg_root: Dict[str, Any]) -> Policy:
 
         deny_cmdline_keywords = [x.lower() for x in deny.get("process_cmdline_keywords", [])],
         deny_file_exts = [x.lower() for x in deny.get("file_exts", [])],
+        deny_ips_or_cidrs = [x.lower() for x in deny.get("ips_or_cidrs", [])],
     )
 
+# fallback for incidents written before network artifacts carried "raddr"
+_RADDR_RE = re.compile(r"-> (\S+):[^:\s]+ \[")
+
+def _remote_ip(art: Dict[str, Any]) -> Optional[str]:
+    ip = art.get("raddr")
+    if ip:
+        return str(ip)
+    m = _RADDR_RE.search(art.get("value") or "")
+    return m.group(1) if m else None
+
+# fallbacks for incidents written before email artifacts carried "host" / "sender_domain"
+_EMAIL_SENDER_RE = re.compile(r"@([\w.-]+)")
+_EMAIL_URL_HOST_RE = re.compile(r"https?://(?:[^@/\s]*@)?(\[[^\]]+\]|[^/\s:?#]+)", re.I)
+
+def _email_hosts(art: Dict[str, Any]) -> List[str]:
+    """URL host and sender domain of an email artifact."""
+    hosts = [art.get("host"), art.get("sender_domain")]
+    if not any(hosts):
+        v = art.get("value") or ""
+        sender, url = _EMAIL_SENDER_RE.search(v.split(" | ", 1)[0]), _EMAIL_URL_HOST_RE.search(v)
+        hosts = [url.group(1) if url else None, sender.group(1) if sender else None]
+    return [str(h).lower().strip("[]") for h in hosts if h]
+
 def _artifact_allowed(art: Dict[str, Any], policy: Policy) -> bool:
     t = (art.get("type") or "").lower()
     v = (art.get("value") or "").lower()
@@ -53,14 +95,16 @@ def _artifact_allowed(art: Dict[str, Any], policy: Policy) -> bool:
             if p and p in v:
                 return True
 
-    if t == "network":
-        for host in policy.allow_ips_or_domains:
-            if host and host in v:
-                return True
+    if t.startswith("network"):
+        # structured remote IP against the CIDR index (no substring matching:
+        # "1.2.3.4" must not allow "11.2.3.45")
+        if policy.allow_net.match_ip(_remote_ip(art)):
+            return True
 	
     if t.startswith("email"):
-        for host in policy.allow_ips_or_domains:
-            if host and host in v:
+        # domain suffix or IP/CIDR match on hosts ("example.com" must not allow "notexample.com")
+        for host in _email_hosts(art):
+            if policy.allow_net.match_host(host) or policy.allow_net.match_ip(host):
                 return True
 
     return False
@@ -70,9 +114,12 @@ def _artifact_denied(art: Dict[str, Any], policy: Policy) -> bool:
     v = (art.get("value") or "").lower()
 
     if t == "process":
-        for kw in policy.deny_cmdline_keywords:
-            if kw and kw in v:
-                return True
+        if policy.deny_cmdline.matches(v, _DENY_CMDLINE_ID):
+            return True
+
+    if t.startswith("network"):
+        if policy.deny_net.match_ip(_remote_ip(art)):
+            return True
 
     if t == "file":
         # deny by extension (very simple suffix check inside value)
@@ -90,7 +137,9 @@ def _count_types(arts: List[Dict[str, Any]]) -> int:
             kinds.add("email")
         elif t.startswith("yara"):
             kinds.add("yara")
-        elif t in {"process","network","file","persistence"}:
+        elif t.startswith("network"):
+            kinds.add("network")
+        elif t in {"process","file","persistence"}:
             kinds.add(t)
     return len(kinds)
 
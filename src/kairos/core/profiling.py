@@ -0,0 +1,178 @@
+"""
+`kairos profile scan`: run the normal scan pipeline under a profiler.
+
+Stages run one at a time, each on its own thread with its own profiler, and
+the per-stage profiles are merged (cProfile / pyinstrument only see the thread
+they were started on). Worker pools are bypassed while profiling so each
+stage's walking, hashing, YARA and parsing run on the profiled thread. A stage
+that times out is recorded as truncated: its profiler is stopped before the
+next stage starts. With --stage only that stage is profiled. Output goes to
+reports/: a .prof file (pstats format, cProfile) or a .pyisession file
+(pyinstrument), plus a plain-text hot function summary.
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import cProfile
+import io
+import pstats
+import threading
+import time
+
+from .config import AppConfig
+from .scaffold import SCAN_STAGES, run_process_scan_and_write_incident
+
+def _have_pyinstrument() -> bool:
+    try:
+        import pyinstrument  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+def resolve_engine(engine: str = "auto") -> str:
+    """auto picks the sampling profiler (pyinstrument) when installed, else cProfile."""
+    if engine == "auto":
+        return "pyinstrument" if _have_pyinstrument() else "cprofile"
+    if engine == "pyinstrument" and not _have_pyinstrument():
+        raise RuntimeError("pyinstrument is not installed (pip install pyinstrument) — use --engine cprofile")
+    return engine
+
+class _Collector:
+    """Builds the stage wrapper and keeps one profile per profiled stage."""
+
+    def __init__(self, engine: str, only: Optional[str]):
+        self.engine = engine
+        self.only = only
+        self._lock = threading.Lock()
+        self.profiles: List[Any] = []
+        self.stages: List[str] = []
+        self.active: Dict[str, Any] = {}  # stage -> profiler still running
+        self.truncated: List[str] = []
+
+    def _start(self):
+        if self.engine == "pyinstrument":
+            from pyinstrument import Profiler
+            prof = Profiler()
+            prof.start()
+            return prof
+        prof = cProfile.Profile()
+        prof.enable()
+        return prof
+
+    def _stop(self, prof):
+        if self.engine == "pyinstrument":
+            return prof.stop()  # Session
+        prof.disable()
+        return prof
+
+    def _finish(self, name: str, prof, truncated: bool = False) -> None:
+        with self._lock:
+            if self.active.pop(name, None) is None:
+                return  # already stopped as abandoned
+            if truncated:
+                self.truncated.append(name)
+        try:
+            result = self._stop(prof)
+        except Exception:
+            return  # e.g. pyinstrument refuses a stop from another thread
+        with self._lock:
+            self.profiles.append(result)
+            self.stages.append(name)
+
+    def stop_abandoned(self) -> None:
+        """
+        Stages run one at a time, so a profiler still active when the next one
+        starts belongs to a stage that timed out; stop it (the profile so far
+        is kept). Otherwise, on 3.12+, the next enable() finds it still active.
+        """
+        with self._lock:
+            left = list(self.active.items())
+        for name, prof in left:
+            self._finish(name, prof, truncated=True)
+
+    def wrap(self, name: str, fn: Callable[[], Any]) -> Callable[[], Any]:
+        if self.only is not None and name != self.only:
+            return fn
+
+        def profiled():
+            self.stop_abandoned()
+            try:
+                prof = self._start()
+            except (ValueError, RuntimeError):
+                # another profiler is still active on an abandoned thread
+                with self._lock:
+                    self.truncated.append(name)
+                return fn()
+            with self._lock:
+                self.active[name] = prof
+            try:
+                return fn()
+            finally:
+                self._finish(name, prof)
+
+        return profiled
+
+def _write_cprofile(profiles: List[cProfile.Profile], base: Path, top: int, header: str) -> Dict[str, Path]:
+    stats = pstats.Stats(profiles[0])
+    for p in profiles[1:]:
+        stats.add(p)
+    prof_path = base.with_suffix(".prof")
+    stats.dump_stats(str(prof_path))
+
+    buf = io.StringIO()
+    buf.write(header)
+    for key, title in (("cumulative", "by cumulative time"), ("tottime", "by own time")):
+        buf.write(f"\n=== Top {top} functions {title} ===\n")
+        pstats.Stats(str(prof_path), stream=buf).strip_dirs().sort_stats(key).print_stats(top)
+    txt_path = base.with_suffix(".txt")
+    txt_path.write_text(buf.getvalue(), encoding="utf-8")
+    return {"profile": prof_path, "summary": txt_path}
+
+def _write_pyinstrument(sessions: List[Any], base: Path, header: str) -> Dict[str, Path]:
+    from pyinstrument.renderers import ConsoleRenderer
+    from pyinstrument.session import Session
+    session = sessions[0]
+    for s in sessions[1:]:
+        session = Session.combine(session, s)
+    sess_path = base.with_suffix(".pyisession")
+    session.save(str(sess_path))
+    text = ConsoleRenderer(unicode=False, color=False).render(session)
+    txt_path = base.with_suffix(".txt")
+    txt_path.write_text(header + "\n" + text, encoding="utf-8")
+    return {"profile": sess_path, "summary": txt_path}
+
+def profile_scan(cfg: AppConfig, *, stage: Optional[str] = None, top: int = 30, engine: str = "auto",
+                 out_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Profile one dry-run scan (no notifications). Returns the written files
+    (profile, summary, incident) and the names of truncated stages. Raises
+    ValueError for an unknown stage.
+    """
+    if stage is not None and stage not in SCAN_STAGES:
+        raise ValueError(f"unknown stage {stage!r}; expected one of: {', '.join(SCAN_STAGES)}")
+    engine = resolve_engine(engine)
+    out_dir = Path(out_dir or cfg.paths.get("reports", "reports"))
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    coll = _Collector(engine, stage)
+    t0 = time.perf_counter()
+    incident = run_process_scan_and_write_incident(cfg, dry=True, serial=True, stage_wrap=coll.wrap,
+                                                   inline_workers=True)
+    wall = time.perf_counter() - t0
+    coll.stop_abandoned()
+    if not coll.profiles:
+        raise RuntimeError(f"stage {stage!r} did not run (disabled in config?)")
+
+    ts = int(time.time())
+    base = out_dir / f"profile_scan{'_' + stage if stage else ''}_{ts}"
+    header = (f"kairos profile scan — engine={engine} stage={stage or 'all'} "
+              f"wall={wall:.2f}s stages={', '.join(coll.stages)}\nincident: {incident}\n")
+    if coll.truncated:
+        header += f"truncated (timed out, partial or no profile): {', '.join(coll.truncated)}\n"
+    if engine == "pyinstrument":
+        out = _write_pyinstrument(coll.profiles, base, header)
+    else:
+        out = _write_cprofile(coll.profiles, base, top, header)
+    out["incident"] = incident
+    out["truncated"] = coll.truncated
+    return out
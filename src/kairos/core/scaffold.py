@@ -1,20 +1,29 @@
 import json, time
+from contextlib import nullcontext
 from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import yaml
 from .config import AppConfig, DEFAULT_CFG
+from .hashcache import HashCache
+from .verdicts import VerdictCache
+from .mailindex import MailboxIndex
+from .stages import Lease, StageRunner
+from .metrics import ScanMetrics, StepMetric
 
-from ..collectors.processes import snapshot_processes, find_suspicious_processes
+from ..collectors.processes import take_process_snapshot, find_suspicious_processes
 from ..collectors.network import snapshot_netconns, find_suspicious_netconns
+from ..collectors.netsampler import sample_beacons
 from ..collectors.filesystem import sweep_recent_files
 from ..collectors.email_imap import fetch_recent_unread
 from ..collectors.email_local import load_eml_dir
 from ..collectors.persistence import collect_persistence
 
 from ..analyzers.rules import incident_from_signals
-from ..analyzers.email_rules import analyze_emails
+from ..analyzers.email_rules import analyze_emails, url_index
 from ..analyzers.chain_rules import find_suspicious_proc_chains
+from ..analyzers.proc_tree import ProcTree
 from ..analyzers.persistence_rules import analyze_persistence
-from ..analyzers.yara_scan import scan_files_with_yara
+from ..analyzers.yara_scan import scan_files_with_yara, scan_attachments_with_yara, load_scanner
 
 from ..notifiers.formatting import summarize_incident
 from ..notifiers.sms_twilio import build_from_env_and_config
@@ -29,7 +38,235 @@ def _load_cfg_dict() -> dict:
         return {}
 
 
-def run_process_scan_and_write_incident(cfg: AppConfig, *, dry: bool = True) -> Path:
+def notify_incident(cfg: AppConfig, inc_dict: dict, logs_dir: Path, *, dry: bool = True) -> None:
+    """SMS for P1 incidents when enabled (dry: write what would be sent to logs/dryrun.txt)."""
+    try:
+        alerts = cfg.alerts or {}
+        if alerts.get("sms_enabled", False) and inc_dict.get("sev") == "P1":
+            subject, body = summarize_incident(inc_dict)
+            if dry:
+                (logs_dir / "dryrun.txt").write_text(f"Would SMS:\n{subject}\n{body}\n", encoding="utf-8")
+            else:
+                twilio = build_from_env_and_config(alerts)
+                twilio.notify(subject, body)
+    except Exception as e:
+        (logs_dir / "notify_error.txt").write_text(str(e), encoding="utf-8")
+
+
+class ScanStages:
+    """
+    Collector steps shared by `kairos scan` (one pass under a StageRunner) and
+    `kairos watch` (each collector on its own cadence). The config sections,
+    policy, YARA scanner with its verdict cache, digest cache, mailbox index,
+    IMAP session and URL blocklist are set up once here; callers decide how
+    long they live and which thread runs each step.
+    """
+
+    def __init__(self, cfg: AppConfig, cfg_dict: dict, logs_dir: Path, *, metrics: Optional[ScanMetrics] = None,
+                 imap_session=None, inline_workers: bool = False):
+        self.cfg_dict = cfg_dict
+        self.metrics = metrics
+        self.imap = imap_session
+        self.inline_workers = inline_workers
+        cache_dir = Path(logs_dir) / "cache"
+        self.fs_cfg = self._section("filesystem")
+        self.email_cfg = self._section("email")
+        self.persist_cfg = self._section("persistence")
+        self.yr_cfg = self._section("yara")
+        cache_cfg = self._section("cache")
+        self.policy = load_policy(cfg.alerts, cfg_dict)
+
+        # ---- Optional YARA rules (scanned inside the sweep's read-once content stage) ----
+        self.scanner = None
+        self.yara_max_bytes = int(self.yr_cfg.get("max_size_bytes", 10 * 1024 * 1024))
+        if self.yr_cfg.get("enabled", False):
+            try:
+                self.scanner = load_scanner(
+                    Path(self.yr_cfg.get("rules_dir", "rules")),
+                    cache_dir=cache_dir / "yara",
+                    timeout=int(self.yr_cfg.get("timeout_seconds", 10)),
+                    fast=bool(self.yr_cfg.get("fast", True)),
+                    workers=1 if inline_workers else int(self.yr_cfg.get("workers", 4)),
+                )
+                if self.scanner is not None:
+                    self.scanner.verdicts = VerdictCache(
+                        cache_dir / "yara_verdicts.sqlite3",
+                        ruleset=self.scanner.ruleset_hash,
+                        max_entries=int(cache_cfg.get("verdict_max_entries", 100_000)),
+                    )
+            except Exception:
+                # don't let YARA issues break the scan
+                self.scanner = None
+
+        self.hash_cache = None
+        try:
+            self.hash_cache = HashCache(cache_dir / "hashes.sqlite3",
+                                        max_entries=int(cache_cfg.get("hash_max_entries", 200_000)))
+        except Exception:
+            pass  # no cache → hash everything, as before
+        self.mail_index = None
+        try:
+            self.mail_index = MailboxIndex(cache_dir / "mailbox.sqlite3")
+        except Exception:
+            pass
+        self.urls = url_index(self.email_cfg.get("url_blocklist") or None)
+        # attachments are only kept on disk when YARA will look at them
+        self.spill_dir = (cache_dir / "attachments"
+                          if self.scanner and self.email_cfg.get("spill_attachments") else None)
+
+    def _section(self, name: str) -> dict:
+        return (self.cfg_dict.get(name, {}) or {})
+
+    def _step(self, name: str):
+        return self.metrics.step(name) if self.metrics is not None else nullcontext(StepMetric())
+
+    def _workers(self, cfg: dict, key: str, default: int) -> int:
+        return 1 if self.inline_workers else int(cfg.get(key, default))
+
+    def arm_yara_deadline(self, cap: Optional[float] = None) -> None:
+        """Start the yara.deadline_seconds budget now (never past `cap`)."""
+        if self.scanner is None:
+            return
+        deadline_s = float(self.yr_cfg.get("deadline_seconds", 300))
+        deadline = time.monotonic() + deadline_s if deadline_s > 0 else None
+        if cap is not None:
+            deadline = cap if deadline is None else min(deadline, cap)
+        self.scanner.deadline = deadline
+
+    # ---- Collectors ----
+
+    def processes(self) -> dict:
+        with self._step("processes") as m:
+            snap = take_process_snapshot()
+            m.count(len(snap.procs))
+        with self._step("process_rules") as m:
+            hits = find_suspicious_processes(snap.procs)
+            m.count(len(hits))
+        with self._step("chains") as m:
+            tree = ProcTree(snap.procs)  # built once, shared by chain rules
+            chains = find_suspicious_proc_chains(snap.procs, tree)  # extra process artifacts
+            m.count(len(chains))
+        return {"snap": snap, "hits": hits, "chains": chains}
+
+    def network(self, snap) -> Tuple[List[Any], List[Dict]]:
+        """(connections, hits); `snap` is the process snapshot to reuse, if any."""
+        with self._step("network") as m:
+            netconns = snapshot_netconns(snap.by_pid if snap else None)
+            m.count(len(netconns))
+        with self._step("network_rules") as m:
+            hits = find_suspicious_netconns(netconns)
+            m.count(len(hits))
+        return netconns, hits
+
+    def filesystem(self) -> List[Any]:
+        with self._step("filesystem") as m:
+            hits = sweep_recent_files(
+                [Path(r) for r in self.fs_cfg.get("roots", [])] or None,
+                minutes=int(self.fs_cfg.get("minutes", 24 * 60)),
+                exclude_globs=self.fs_cfg.get("exclude_globs", []),
+                max_depth=self.fs_cfg.get("max_depth"),
+                workers=self._workers(self.fs_cfg, "workers", 4),
+                hash_cache=self.hash_cache,
+                # YARA matches on these threads are capped by the scanner's own workers
+                hash_workers=self._workers(self.fs_cfg, "hash_workers", 4),
+                scanner=self.scanner,
+                max_scan_bytes=self.yara_max_bytes,
+            )
+            m.count(len(hits))
+        return hits
+
+    def local_mail(self, commits: Optional[List[Callable[[], None]]] = None) -> List[Any]:
+        """New messages in email.local_eml_dir (`commits`: see load_eml_dir)."""
+        if self.mail_index is None:
+            return []
+        return load_eml_dir(
+            self.email_cfg.get("local_eml_dir", "mailbox"),
+            index=self.mail_index,
+            workers=1 if self.inline_workers else self.email_cfg.get("local_workers"),
+            parallel_threshold=int(self.email_cfg.get("local_parallel_threshold", 64)),
+            spill_dir=self.spill_dir,
+            commits=commits,
+        )
+
+    def imap_mail(self, commits: Optional[List[Callable[[], None]]] = None) -> List[Any]:
+        return fetch_recent_unread(self.cfg_dict, session=self.imap, commits=commits)
+
+    def email_rules(self, emails: List[Any]) -> List[Dict]:
+        with self._step("email_rules") as m:
+            arts = analyze_emails(emails, self.urls)
+            m.count(len(arts))
+        return arts
+
+    def yara(self, hits: List[Any], emails: List[Any]) -> List[Dict]:
+        """YARA artifacts for swept files (matched during the sweep) and mail attachments."""
+        if self.scanner is None:
+            return []
+        with self._step("yara") as m:
+            arts = scan_files_with_yara(hits, rules_dir=Path(self.yr_cfg.get("rules_dir", "rules")),
+                                        max_size_bytes=self.yara_max_bytes, scanner=self.scanner)
+            arts.extend(scan_attachments_with_yara(emails, self.scanner))
+            m.count(len(arts))
+        return arts
+
+    def persistence(self, stats: Optional[dict] = None) -> List[Dict]:
+        with self._step("persistence") as m:
+            items = collect_persistence(
+                timeout=self.persist_cfg.get("timeout_seconds", 60),
+                tasks_format=self.persist_cfg.get("schtasks_format", "csv"),
+                stats=stats,
+                inline=self.inline_workers,
+            )
+            m.count(len(items))
+        with self._step("persistence_rules") as m:
+            arts = analyze_persistence(items)
+            m.count(len(arts))
+        return arts
+
+    # ---- Caches ----
+
+    @property
+    def verdicts(self):
+        return self.scanner.verdicts if self.scanner is not None else None
+
+    def flush(self) -> None:
+        for cache in (self.hash_cache, self.verdicts):
+            if cache is not None:
+                try:
+                    cache.flush()
+                except Exception:
+                    pass
+
+    def compose(self, procs: dict, net_hits: List[Dict], fs_hits: List[Any], extra: List[Dict],
+                incomplete: List[str], ts: int) -> Dict:
+        """Incident from core signals plus extra artifacts; policy not yet applied."""
+        inc_dict = incident_from_signals(procs["hits"], net_hits, fs_hits, ts).__dict__
+        inc_dict["artifacts"].extend(procs["chains"])
+        inc_dict["artifacts"].extend(extra)
+        inc_dict["incomplete_stages"] = incomplete
+        return inc_dict
+
+
+def _closer(res):
+    def close():
+        if res is not None:
+            try:
+                res.close()
+            except Exception:
+                pass
+    return close
+
+
+# stage names, in the order they are added to the runner
+SCAN_STAGES = ("processes", "network", "beacons", "filesystem", "email", "persistence", "yara")
+
+def run_process_scan_and_write_incident(cfg: AppConfig, *, dry: bool = True, net_sample_seconds: float | None = None,
+                                        imap_session=None, trace_memory: bool | None = None,
+                                        serial: bool = False, stage_wrap=None, inline_workers: bool = False) -> Path:
+    """
+    inline_workers=True keeps each stage's work on the stage thread (no
+    walker/hash/YARA/parse pools, persistence sub-collectors in sequence), so
+    a per-thread profiler wrapped around the stage sees all of it.
+    """
     logs_dir = Path(cfg.paths.get("logs", "logs"))
     logs_dir.mkdir(exist_ok=True)
     incidents_dir = logs_dir / "incidents"
@@ -37,82 +274,148 @@ def run_process_scan_and_write_incident(cfg: AppConfig, *, dry: bool = True) ->
 
     ts = int(time.time())
 
+    # ---- Config dict (shared) ----
+    cfg_dict = _load_cfg_dict()
+    scan_cfg = (cfg_dict.get("scan", {}) or {})
+    timeouts = (scan_cfg.get("timeouts", {}) or {})
+    metrics_cfg = (cfg_dict.get("metrics", {}) or {})
+    if trace_memory is None:
+        trace_memory = bool(metrics_cfg.get("trace_memory", False))
+    metrics = ScanMetrics(trace_memory=trace_memory)
+    # tracemalloc peaks are process-wide: trace one stage at a time
+    runner = StageRunner(scan_cfg.get("deadline_seconds"), serial=serial or trace_memory, wrap=stage_wrap)
+    stages = ScanStages(cfg, cfg_dict, logs_dir, metrics=metrics, imap_session=imap_session,
+                        inline_workers=inline_workers)
+    stages.arm_yara_deadline(runner.deadline)
+
+    # stages past their timeout may still be running: each resource is closed
+    # once the scan and every stage still using it are done
+    verdicts_lease = Lease(_closer(stages.verdicts))
+    hash_lease = Lease(_closer(stages.hash_cache))
+    mail_lease = Lease(_closer(stages.mail_index))
+
     # ---- Processes (with parent/child chain heuristics) ----
-    procs = snapshot_processes()
-    proc_hits = find_suspicious_processes(procs)
-    chain_arts = find_suspicious_proc_chains(procs)  # extra process artifacts
+    runner.add("processes", stages.processes, timeout=timeouts.get("processes"),
+               default={"snap": None, "hits": [], "chains": []})
 
-    # ---- Network ----
-    netconns = snapshot_netconns()
-    net_hits = find_suspicious_netconns(netconns)
+    # ---- Network (waits for processes to reuse the process table) ----
+    def network_stage():
+        return stages.network(runner.result("processes")["snap"])[1]
 
-    # ---- Filesystem (last 24h) ----
-    file_hits = sweep_recent_files(minutes=24 * 60)
+    runner.add("network", network_stage, timeout=timeouts.get("network"), after=("processes",), default=[])
 
-    # ---- Config dict (shared) ----
-    cfg_dict = _load_cfg_dict()
+    # ---- Network sampling window (beaconing; off unless configured) ----
+    net_cfg = (cfg_dict.get("network", {}) or {})
+    sample_s = float(net_sample_seconds if net_sample_seconds is not None else net_cfg.get("sample_seconds", 0) or 0)
+    if sample_s > 0:
+        def beacons_stage():
+            snap = runner.result("processes")["snap"]
+            names = {pid: p.name for pid, p in snap.by_pid.items()} if snap else {}
+            with metrics.step("beacons") as m:
+                arts = sample_beacons(net_cfg, net_sample_seconds, names)
+                m.count(len(arts))
+            return arts
+
+        beacon_timeout = timeouts.get("beacons")
+        runner.add("beacons", beacons_stage, timeout=beacon_timeout or sample_s + 30, after=("processes",), default=[])
+
+    # ---- Filesystem (last 24h by default) ----
+    def filesystem_stage():
+        with verdicts_lease.use(), hash_lease.use():
+            return stages.filesystem()
+
+    runner.add("filesystem", filesystem_stage, timeout=timeouts.get("filesystem"), default=[])
 
     # ---- Email (local .eml + optional IMAP) ----
-    emails = []
-    try:
-        eml_dir = (cfg_dict.get("email", {}) or {}).get("local_eml_dir", "mailbox")
-        emails.extend(load_eml_dir(eml_dir))
-    except Exception:
-        pass
-    try:
-        emails.extend(fetch_recent_unread(cfg_dict))
-    except Exception:
-        (logs_dir / "imap_error.txt").write_text("IMAP fetch failed (check config/env).", encoding="utf-8")
-    email_arts = analyze_emails(emails)
+    spilled: list = []
+
+    def remove_spilled():
+        for path in spilled:
+            Path(path).unlink(missing_ok=True)
+
+    # spilled attachments are deleted once both the email and yara stages are done with them
+    spill_lease = Lease(remove_spilled)
+
+    def email_stage():
+        # mailbox marks and IMAP watermarks are committed only if this stage's
+        # result is used: mail from a stage that timed out is fetched again
+        commits: list = []
+        with spill_lease.use(), mail_lease.use():
+            emails = []
+            with metrics.step("email") as m:
+                try:
+                    emails.extend(stages.local_mail(commits))
+                except Exception:
+                    pass
+                try:
+                    emails.extend(stages.imap_mail(commits))
+                except Exception:
+                    (logs_dir / "imap_error.txt").write_text("IMAP fetch failed (check config/env).", encoding="utf-8")
+                spilled.extend(att.spill_path for msg in emails for att in msg.attachments if att.spill_path)
+                m.count(len(emails))
+            return {"emails": emails, "arts": stages.email_rules(emails), "commits": commits}
+
+    runner.add("email", email_stage, timeout=timeouts.get("email"),
+               default={"emails": [], "arts": [], "commits": []})
 
     # ---- Persistence (Run keys, Tasks, Services) ----
-    try:
-        persist_items = collect_persistence()
-    except Exception:
-        persist_items = []
-    persist_arts = analyze_persistence(persist_items)
+    persist_stats: dict = {}
+    runner.add("persistence", lambda: stages.persistence(persist_stats),
+               timeout=timeouts.get("persistence"), default=[])
 
-    # ---- Optional YARA over suspicious files ----
-    yara_arts = []  # << initialize so it's always defined
-    try:
-        yr_cfg = (cfg_dict.get("yara", {}) or {})
-        if yr_cfg.get("enabled", False):
-            rules_dir = Path(yr_cfg.get("rules_dir", "rules"))
-            max_bytes = int(yr_cfg.get("max_size_bytes", 10 * 1024 * 1024))
-            yara_arts = scan_files_with_yara(file_hits, rules_dir=rules_dir, max_size_bytes=max_bytes)
-    except Exception:
-        # don't let YARA issues break the scan
-        pass
+    # ---- Optional YARA over suspicious files (matches already collected in the sweep) ----
+    if stages.scanner is not None:
+        def yara_stage():
+            with verdicts_lease.use(), spill_lease.use():
+                return stages.yara(runner.result("filesystem"), runner.result("email")["emails"])
 
-    # ---- Build initial incident from core signals ----
-    inc = incident_from_signals(proc_hits, net_hits, file_hits, ts)
-    inc_dict = inc.__dict__
+        runner.add("yara", yara_stage, timeout=timeouts.get("yara"), after=("filesystem", "email"), default=[])
 
-    # ---- Append additional artifacts (chain/email/persistence/yara) ----
-    inc_dict["artifacts"].extend(chain_arts)
-    inc_dict["artifacts"].extend(email_arts)
-    inc_dict["artifacts"].extend(persist_arts)
-    inc_dict["artifacts"].extend(yara_arts)
+    runner.run()
+    for commit in runner.result("email")["commits"]:
+        try:
+            commit()
+        except Exception:
+            pass
+    verdicts_lease.close()
+    hash_lease.close()
+    spill_lease.close()
+    mail_lease.close()
+
+    # ---- Build incident from core signals + chain/beacon/email/persistence/yara artifacts ----
+    procs = runner.result("processes")
+    extra: list = []
+    if sample_s > 0:
+        extra.extend(runner.result("beacons"))
+    extra.extend(runner.result("email")["arts"])
+    extra.extend(runner.result("persistence"))
+    if stages.scanner is not None:
+        extra.extend(runner.result("yara"))
+    # stages that failed or ran out of time make this a partial incident
+    inc_dict = stages.compose(procs, runner.result("network"), runner.result("filesystem"), extra,
+                              runner.incomplete, ts)
 
     # ---- Policy apply (allow/deny + severity recompute) ----
-    policy = load_policy(cfg.alerts, cfg_dict)
-    inc_dict = apply_policy(inc_dict, policy)
+    with metrics.step("policy") as m:
+        inc_dict = apply_policy(inc_dict, stages.policy)
+        m.count(len(inc_dict.get("artifacts", [])))
+
+    # ---- Metrics (step timings, stage status, collector counters) ----
+    collectors = {}
+    if procs["snap"] is not None:
+        collectors["processes"] = procs["snap"].stats()
+    if persist_stats:
+        collectors["persistence"] = persist_stats
+    if stages.scanner is not None:
+        collectors["yara"] = stages.scanner.stats()
+    metrics.close()
+    inc_dict["metrics"] = dict(metrics.as_dict(), stages=runner.stats(), collectors=collectors)
 
     # ---- Write incident JSON ----
     out = incidents_dir / f"incident_{ts}.json"
     out.write_text(json.dumps(inc_dict, indent=2), encoding="utf-8")
 
     # ---- Notify if P1 and enabled ----
-    try:
-        alerts = cfg.alerts or {}
-        if alerts.get("sms_enabled", False) and inc_dict.get("sev") == "P1":
-            subject, body = summarize_incident(inc_dict)
-            if dry:
-                (logs_dir / "dryrun.txt").write_text(f"Would SMS:\n{subject}\n{body}\n", encoding="utf-8")
-            else:
-                twilio = build_from_env_and_config(alerts)
-                twilio.notify(subject, body)
-    except Exception as e:
-        (logs_dir / "notify_error.txt").write_text(str(e), encoding="utf-8")
+    notify_incident(cfg, inc_dict, logs_dir, dry=dry)
 
-    return out
\ No newline at end of file
+    return out
@@ -0,0 +1,51 @@
+"""
+Base for the small SQLite caches under paths.logs (file digests, YARA
+verdicts, processed mailbox files).
+
+Opens the database (creating its directory and schema), shares one
+connection between threads behind a lock, caps tables that carry a
+`last_used` column by evicting the least recently used rows, and flushes
+buffered writes on close().
+"""
+from pathlib import Path
+from typing import Optional
+import sqlite3
+import threading
+
+class SqliteStore:
+    def __init__(self, db_path: Path, schema: str, *, table: str, max_entries: Optional[int] = None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.table = table
+        self.max_entries = None if max_entries is None else int(max_entries)
+        self._lock = threading.Lock()
+        # scan stages and watch collectors use the store from their own threads
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.executescript(schema)
+
+    def _evict(self) -> None:
+        """Drop the least recently used rows beyond max_entries (call inside a transaction)."""
+        if self.max_entries is None:
+            return
+        (count,) = self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        if count > self.max_entries:
+            self._db.execute(
+                f"DELETE FROM {self.table} WHERE rowid IN "
+                f"(SELECT rowid FROM {self.table} ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def flush(self) -> None:
+        """Write buffered rows (stores that buffer override this)."""
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
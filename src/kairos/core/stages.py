@@ -0,0 +1,160 @@
+"""
+Concurrent scan stages with per-stage timeouts and a global deadline.
+
+Each stage runs on its own daemon thread, so a collector stuck in a blocking
+call (schtasks.exe, an IMAP login) never holds up the others or process exit.
+A stage that overruns is marked incomplete and its late result is discarded.
+Stages may wait on others (`after=`); a dependency that fails or times out
+still releases its dependents, which then see its default value.
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+import threading
+import time
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[], Any]
+    timeout: Optional[float] = None
+    after: Sequence[str] = ()
+    default: Any = None
+    status: str = "pending"  # pending | running | ok | error | timeout
+    started: Optional[float] = None
+    elapsed_ms: float = 0.0
+    error: str = ""
+    result: Any = None
+    settled: threading.Event = field(default_factory=threading.Event)
+
+class StageRunner:
+    """
+    serial=True runs stages one after another in the order added (profiling,
+    memory tracing). wrap(name, fn) -> fn, if given, decorates every stage
+    function, e.g. to run it under a profiler on its own thread.
+    """
+
+    def __init__(self, deadline_seconds: Optional[float] = None, *, serial: bool = False,
+                 wrap: Optional[Callable[[str, Callable[[], Any]], Callable[[], Any]]] = None):
+        self.deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+        self.serial = serial
+        self.wrap = wrap
+        self._stages: Dict[str, Stage] = {}
+        self._cond = threading.Condition()
+
+    def add(self, name: str, fn: Callable[[], Any], *, timeout: Optional[float] = None,
+            after: Sequence[str] = (), default: Any = None) -> None:
+        after = tuple(after)
+        if self.wrap is not None:
+            fn = self.wrap(name, fn)
+        if self.serial and self._stages:
+            after += (next(reversed(self._stages)),)
+        self._stages[name] = Stage(name, fn, timeout if timeout and timeout > 0 else None, after, default)
+
+    def result(self, name: str) -> Any:
+        """Result of a finished stage, or its default if it failed / timed out."""
+        st = self._stages[name]
+        return st.result if st.status == "ok" else st.default
+
+    def _run_stage(self, st: Stage) -> None:
+        for dep in st.after:
+            remaining = None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+            self._stages[dep].settled.wait(remaining)
+        with self._cond:
+            if st.status != "pending":
+                return  # deadline passed while waiting on dependencies
+            st.status = "running"
+            st.started = time.monotonic()
+            self._cond.notify_all()
+        try:
+            out, status, err = st.fn(), "ok", ""
+        except Exception as e:
+            out, status, err = None, "error", f"{type(e).__name__}: {e}"
+        with self._cond:
+            if st.status != "running":
+                return  # already given up on; drop the late result
+            st.result, st.status, st.error = out, status, err
+            st.elapsed_ms = (time.monotonic() - st.started) * 1000.0
+            st.settled.set()
+            self._cond.notify_all()
+
+    def _expire(self, st: Stage, now: float) -> None:
+        st.status = "timeout"
+        if st.started is not None:
+            st.elapsed_ms = (now - st.started) * 1000.0
+        st.settled.set()
+
+    def run(self) -> "StageRunner":
+        for st in self._stages.values():
+            threading.Thread(target=self._run_stage, args=(st,), name=f"kairos-{st.name}", daemon=True).start()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wake: List[float] = []
+                for st in self._stages.values():
+                    if st.status in ("ok", "error", "timeout"):
+                        continue
+                    limit = self.deadline
+                    if st.status == "running" and st.timeout is not None:
+                        own = st.started + st.timeout
+                        limit = own if limit is None else min(limit, own)
+                    if limit is not None and now >= limit:
+                        self._expire(st, now)
+                        continue
+                    wake.append(limit if limit is not None else now + 1.0)
+                if not wake:
+                    return self
+                self._cond.wait(max(0.0, min(wake) - now))
+
+    @property
+    def incomplete(self) -> List[str]:
+        return [name for name, st in self._stages.items() if st.status != "ok"]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for name, st in self._stages.items():
+            out[name] = {"status": st.status, "ms": round(st.elapsed_ms, 2)}
+            if st.error:
+                out[name]["error"] = st.error
+        return out
+
+class Lease:
+    """
+    Releases a resource shared by stage functions (a cache, spilled files)
+    once the scan is done with it and no stage using it is still running:
+    a stage that timed out keeps running on its thread after run() returns.
+    """
+
+    def __init__(self, release: Callable[[], None]):
+        self._release = release
+        self._lock = threading.Lock()
+        self._users = 0
+        self._closed = False
+        self._released = False
+
+    @contextmanager
+    def use(self) -> Iterator[None]:
+        with self._lock:
+            self._users += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._users -= 1
+            self._maybe_release()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        self._maybe_release()
+
+    def _maybe_release(self) -> None:
+        with self._lock:
+            if not self._closed or self._users or self._released:
+                return
+            self._released = True
+        try:
+            self._release()
+        except Exception:
+            pass
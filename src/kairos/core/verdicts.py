@@ -0,0 +1,79 @@
+"""
+Persistent YARA verdict cache (SQLite under paths.logs).
+
+Rows are keyed on (file sha256, ruleset hash), so any rule change misses
+automatically; rows for other rulesets are dropped when the cache is opened
+and the table is capped by evicting the least recently used verdicts.
+"""
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import json
+import time
+
+from .sqlitestore import SqliteStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS yara_verdicts (
+    sha256    TEXT NOT NULL,
+    ruleset   TEXT NOT NULL,
+    matches   TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (sha256, ruleset)
+);
+CREATE INDEX IF NOT EXISTS yara_verdicts_lru ON yara_verdicts(last_used);
+"""
+
+class VerdictCache(SqliteStore):
+    def __init__(self, db_path: Path, ruleset: str, max_entries: int = 100_000):
+        super().__init__(db_path, _SCHEMA, table="yara_verdicts", max_entries=max_entries)
+        self.ruleset = ruleset
+        with self._db:
+            # verdicts from older rulesets can never be hit again
+            self._db.execute("DELETE FROM yara_verdicts WHERE ruleset != ?", (ruleset,))
+        self._touched: List[str] = []
+        self._pending: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sha256: Optional[str]) -> Optional[List[Tuple[str, str]]]:
+        """Cached (rule, namespace) matches for this file content, or None."""
+        if not sha256:
+            return None
+        with self._lock:
+            raw = self._pending.get(sha256)
+            if raw is None:
+                row = self._db.execute(
+                    "SELECT matches FROM yara_verdicts WHERE sha256 = ? AND ruleset = ?",
+                    (sha256, self.ruleset),
+                ).fetchone()
+                raw = row[0] if row else None
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched.append(sha256)
+        return [tuple(m) for m in json.loads(raw)]
+
+    def put(self, sha256: Optional[str], matches: List[Tuple[str, str]]) -> None:
+        if not sha256:
+            return
+        with self._lock:
+            self._pending[sha256] = json.dumps([list(m) for m in matches])
+
+    def flush(self) -> None:
+        now = time.time()
+        with self._lock:
+            with self._db:
+                if self._pending:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO yara_verdicts VALUES (?, ?, ?, ?)",
+                        [(sha, self.ruleset, m, now) for sha, m in self._pending.items()],
+                    )
+                if self._touched:
+                    self._db.executemany(
+                        "UPDATE yara_verdicts SET last_used = ? WHERE sha256 = ? AND ruleset = ?",
+                        [(now, sha, self.ruleset) for sha in self._touched],
+                    )
+                self._evict()
+            self._pending.clear()
+            self._touched.clear()
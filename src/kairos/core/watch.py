@@ -0,0 +1,348 @@
+"""
+`kairos watch`: long-running monitor that keeps scan state in memory.
+
+Each collector runs on its own cadence (watch.cadence_seconds) on its own
+thread, so a slow or stuck collector only delays itself: it is not started
+again until it returns, and past its scan.timeouts entry it is reported as
+incomplete. The collector steps, YARA scanner, digest / verdict / mailbox
+caches, IMAP connection, URL index and policy are those of `kairos scan`
+(scaffold.ScanStages), built once and reused. IMAP mail is picked up by a
+listener thread that blocks in IDLE (when the server supports it) instead of
+polling. After every tick the incident is recomposed from the latest result
+of each collector; it is written (and notified) only when its artifact set
+differs from the last one written. Between ticks the main thread sleeps on an
+Event until a collector is due or has returned, so an idle watcher uses no CPU.
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+import json
+import threading
+import time
+
+from .config import AppConfig
+from .policy import apply_policy
+from .scaffold import ScanStages, _load_cfg_dict, notify_incident
+
+from ..collectors.netsampler import ConnSampler, beacon_artifacts
+from ..collectors.email_imap import ImapSession
+
+# seconds between runs; 0 / null disables a collector
+DEFAULT_CADENCES: Dict[str, float] = {
+    "processes": 10,
+    "network": 5,
+    "filesystem": 300,
+    "email": 60,
+    "persistence": 3600,
+}
+
+ArtifactKey = Tuple[str, str]
+
+def artifact_key(a: Dict) -> ArtifactKey:
+    """Identity of an artifact for change detection (network: the remote endpoint)."""
+    if a.get("raddr"):
+        return (a.get("type", ""), f"{a['raddr']}:{a.get('rport', '')}")
+    return (a.get("type", ""), a.get("value", ""))
+
+class Watcher:
+    def __init__(self, cfg: AppConfig, *, dry: bool = True, cadences: Optional[Dict[str, float]] = None,
+                 cfg_dict: Optional[dict] = None):
+        self.cfg = cfg
+        self.dry = dry
+        self.cfg_dict = _load_cfg_dict() if cfg_dict is None else cfg_dict
+        self.logs_dir = Path(cfg.paths.get("logs", "logs"))
+        self.incidents_dir = self.logs_dir / "incidents"
+        self.incidents_dir.mkdir(parents=True, exist_ok=True)
+
+        watch_cfg = (self.cfg_dict.get("watch", {}) or {})
+        merged = {**DEFAULT_CADENCES, **(watch_cfg.get("cadence_seconds", {}) or {}), **(cadences or {})}
+        self.cadences = {name: float(s) for name, s in merged.items() if name in DEFAULT_CADENCES and s}
+        self.timeouts = ((self.cfg_dict.get("scan", {}) or {}).get("timeouts", {}) or {})
+        self.email_keep = int(watch_cfg.get("email_artifacts", 200))
+        self.close_grace = float(watch_cfg.get("close_grace_seconds", 30))
+        self.stop_event = threading.Event()
+        self._wake = threading.Event()
+
+        email_cfg = (self.cfg_dict.get("email", {}) or {})
+        imap = ImapSession(self.cfg_dict) if email_cfg.get("enabled", False) else None
+        # ---- Collector steps with their long-lived scanner, caches and IMAP session ----
+        self.stages = ScanStages(cfg, self.cfg_dict, self.logs_dir, imap_session=imap)
+        self.imap = self.stages.imap
+        self._imap_thread: Optional[threading.Thread] = None
+
+        # ---- Beaconing: fed from the network collector's snapshots ----
+        net_cfg = (self.cfg_dict.get("network", {}) or {})
+        self.beacon_cfg = (net_cfg.get("beacon", {}) or {})
+        self._conn_keys: List[Tuple[int, str, int, int]] = []
+        self.sampler = None
+        if watch_cfg.get("beacons", False) and "network" in self.cadences:
+            try:
+                self.sampler = ConnSampler(capacity=int(net_cfg.get("buffer_size", 65536)),
+                                           source=lambda: self._conn_keys)
+            except RuntimeError:
+                pass  # numpy missing
+
+        # ---- Latest result per collector ----
+        self.snap = None
+        self.state: Dict[str, Any] = {
+            "processes": {"hits": [], "chains": []},
+            "network": {"hits": [], "beacons": []},
+            "filesystem": {"hits": [], "yara": []},
+            "email": [],  # sticky: IMAP / mailbox polls only return new messages
+            "persistence": [],
+        }
+        self.status: Dict[str, Dict[str, Any]] = {}
+        self.next_due = {name: 0.0 for name in self.cadences}
+        self._running: Dict[str, float] = {}  # name -> start (monotonic)
+        self._cond = threading.Condition()
+        self._changed = False
+        self._last_key: Optional[FrozenSet[ArtifactKey]] = None
+        self.written: List[Path] = []
+
+    # ---- Collectors (each returns the new state for its name) ----
+
+    def _processes(self) -> Dict:
+        procs = self.stages.processes()
+        self.snap = procs.pop("snap")
+        return procs
+
+    def _network(self) -> Dict:
+        snap = self.snap
+        netconns, hits = self.stages.network(snap)
+        beacons: List[Dict] = []
+        if self.sampler is not None:
+            self._conn_keys = [(c.pid or 0, c.raddr, int(c.rport), int(c.lport or 0)) for c in netconns
+                               if c.raddr and (c.status or "").upper() in ("ESTABLISHED", "SYN_SENT")]
+            self.sampler.poll()
+            flows = self.sampler.beacons(
+                min_events=int(self.beacon_cfg.get("min_events", 4)),
+                max_jitter=float(self.beacon_cfg.get("max_jitter", 0.2)),
+                min_interval=float(self.beacon_cfg.get("min_interval", 2.0)),
+            )
+            names = {pid: p.name for pid, p in snap.by_pid.items()} if snap else {}
+            beacons = beacon_artifacts(flows, names)
+        return {"hits": hits, "beacons": beacons}
+
+    def _filesystem(self) -> Dict:
+        self.stages.arm_yara_deadline()
+        try:
+            hits = self.stages.filesystem()
+            return {"hits": hits, "yara": self.stages.yara(hits, [])}
+        finally:
+            self.stages.flush()
+
+    def _email(self) -> List[Dict]:
+        """Local mailbox directory; IMAP has its own listener (_imap_loop)."""
+        emails = []
+        try:
+            emails.extend(self.stages.local_mail())
+        except Exception:
+            pass
+        return self._analyze_emails(emails)
+
+    def _analyze_emails(self, emails: List[Any]) -> List[Dict]:
+        try:
+            arts = self.stages.email_rules(emails)
+            arts.extend(self.stages.yara([], emails))
+        finally:
+            for m in emails:
+                for att in m.attachments:
+                    if att.spill_path:
+                        Path(att.spill_path).unlink(missing_ok=True)
+            self.stages.flush()
+        return arts  # merged into the sticky email state by _store
+
+    def _persistence(self) -> List[Dict]:
+        return self.stages.persistence()
+
+    def _imap_loop(self) -> None:
+        """Poll once, then block until the server pushes new mail (or the email cadence passes)."""
+        interval = self.cadences.get("email", DEFAULT_CADENCES["email"])
+        while not self.stop_event.is_set():
+            t0 = time.monotonic()
+            status = {"status": "ok"}
+            try:
+                arts = self._analyze_emails(self.stages.imap_mail())
+            except Exception as e:
+                arts, status = [], {"status": "error", "error": f"{type(e).__name__}: {e}"}
+                (self.logs_dir / "imap_error.txt").write_text("IMAP fetch failed (check config/env).", encoding="utf-8")
+            with self._cond:
+                self.status["imap"] = dict(status, ms=round((time.monotonic() - t0) * 1000.0, 2), at=int(time.time()))
+                if arts:
+                    self._merge_email(arts)
+                    self._changed = True
+            if arts:
+                self._wake.set()
+            if self.stop_event.is_set():
+                break
+            self.imap.wait(interval)
+
+    # ---- Scheduling ----
+
+    def _store(self, name: str, result: Any) -> None:
+        if name == "email":
+            self._merge_email(result)
+        else:
+            self.state[name] = result
+
+    def _merge_email(self, arts: List[Dict]) -> None:
+        """Email findings stay until pushed out by newer ones (polls only see new mail)."""
+        merged = {artifact_key(a): a for a in self.state["email"]}
+        for a in arts:
+            merged.pop(artifact_key(a), None)
+            merged[artifact_key(a)] = a
+        self.state["email"] = list(merged.values())[-self.email_keep:]
+
+    def _launch(self, name: str, now: float) -> None:
+        """Run one collector on its own thread; its result is merged when it returns."""
+        fn = getattr(self, f"_{name}")
+        self._running[name] = now
+
+        def run():
+            t0 = time.monotonic()
+            try:
+                out, status, err = fn(), "ok", ""
+            except Exception as e:
+                out, status, err = None, "error", f"{type(e).__name__}: {e}"
+            with self._cond:
+                if status == "ok":
+                    self._store(name, out)
+                    self._changed = True
+                self.status[name] = {"status": status, "ms": round((time.monotonic() - t0) * 1000.0, 2),
+                                     "at": int(time.time())}
+                if err:
+                    self.status[name]["error"] = err
+                del self._running[name]
+                self._cond.notify_all()
+            self._wake.set()
+
+        threading.Thread(target=run, name=f"kairos-watch-{name}", daemon=True).start()
+
+    def tick(self, now: Optional[float] = None) -> Optional[Path]:
+        """
+        Start the collectors that are due (never one that is still running) and
+        write an incident if results that came in since the last tick changed
+        the artifact set. Does not wait for the collectors it starts.
+        """
+        now = time.monotonic() if now is None else now
+        with self._cond:
+            for name, due in self.next_due.items():
+                if due > now or name in self._running:
+                    continue
+                # next slot from the previous one, not from now, so cadences don't drift
+                nxt = due + self.cadences[name] if due else now + self.cadences[name]
+                self.next_due[name] = nxt if nxt > now else now + self.cadences[name]
+                self._launch(name, now)
+            # overran scan.timeouts: reported as incomplete until it returns
+            for name, started in self._running.items():
+                timeout = self.timeouts.get(name)
+                if timeout and now - started >= timeout:
+                    self.status[name] = {"status": "timeout", "ms": round((now - started) * 1000.0, 2),
+                                         "at": int(time.time())}
+            # hold the first incident until every collector has reported once
+            if not self._changed or any(name not in self.status for name in self.cadences):
+                return None
+            self._changed = False
+        return self._maybe_write()
+
+    def _next_wake(self, now: float) -> float:
+        with self._cond:
+            times = [t for name, t in self.next_due.items() if name not in self._running]
+            for name, started in self._running.items():
+                timeout = self.timeouts.get(name)
+                if timeout and now - started < timeout:
+                    times.append(started + timeout)
+        return min(times, default=now + 60.0)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait for running collectors to return; False if some are still running."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._running, timeout)
+
+    def compose(self, ts: Optional[int] = None) -> Dict:
+        ts = ts or int(time.time())
+        with self._cond:
+            return self._compose(ts)
+
+    def _compose(self, ts: int) -> Dict:
+        procs, net, fs = self.state["processes"], self.state["network"], self.state["filesystem"]
+        inc_dict = self.stages.compose(
+            procs, net["hits"], fs["hits"], net["beacons"] + self.state["email"] + self.state["persistence"] + fs["yara"],
+            [n for n, st in self.status.items() if st.get("status") != "ok"], ts)
+        inc_dict = apply_policy(inc_dict, self.stages.policy)
+        inc_dict["watch"] = {"collectors": dict(self.status)}
+        return inc_dict
+
+    def _maybe_write(self) -> Optional[Path]:
+        inc_dict = self.compose()
+        key = frozenset(artifact_key(a) for a in inc_dict.get("artifacts", []))
+        if key == self._last_key:
+            return None
+        self._last_key = key
+        out = self.incidents_dir / f"incident_{inc_dict['id'].rsplit('-', 1)[-1]}.json"
+        out.write_text(json.dumps(inc_dict, indent=2), encoding="utf-8")
+        notify_incident(self.cfg, inc_dict, self.logs_dir, dry=self.dry)
+        self.written.append(out)
+        return out
+
+    def run(self, duration: Optional[float] = None, on_write: Optional[Callable[[Path], None]] = None) -> None:
+        """Loop until stop() (or `duration` seconds); sleeps until a collector is due or returns."""
+        end = time.monotonic() + duration if duration else None
+        if self.imap is not None and self.imap.configured and self._imap_thread is None:
+            self._imap_thread = threading.Thread(target=self._imap_loop, name="kairos-watch-imap", daemon=True)
+            self._imap_thread.start()
+        while not self.stop_event.is_set():
+            self._wake.clear()
+            out = self.tick()
+            if out is not None and on_write is not None:
+                on_write(out)
+            now = time.monotonic()
+            if end is not None and now >= end:
+                break
+            wake = self._next_wake(now)
+            if end is not None:
+                wake = min(wake, end)
+            self._wake.wait(max(0.0, wake - now))
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self._wake.set()
+
+    def close(self, grace: Optional[float] = None) -> None:
+        """
+        Stop, give running collectors `grace` seconds (watch.close_grace_seconds)
+        to return, then close the caches and sessions no collector still holds.
+        """
+        self.stop()
+        grace = self.close_grace if grace is None else grace
+        t0 = time.monotonic()
+        self.drain(grace)
+        with self._cond:
+            running = set(self._running)
+        if self._imap_thread is not None:
+            # an IDLE in progress returns within the email cadence
+            self._imap_thread.join(max(0.0, grace - (time.monotonic() - t0)))
+            if self._imap_thread.is_alive():
+                running.add("imap")
+        verdicts, hash_cache, mail_index = self.stages.verdicts, self.stages.hash_cache, self.stages.mail_index
+        in_use: List[Any] = []
+        if running & {"filesystem", "email"}:
+            in_use.append(verdicts)
+        if "filesystem" in running:
+            in_use.append(hash_cache)
+        if "email" in running:
+            in_use.append(mail_index)
+        if "imap" in running:
+            in_use.extend((verdicts, self.imap))
+        for res in (verdicts, hash_cache, mail_index, self.imap):
+            if res is not None and not any(res is r for r in in_use):
+                try:
+                    res.close()
+                except Exception:
+                    pass
+
+    def __enter__(self) -> "Watcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,16 +1,44 @@
 import argparse
 import webbrowser
 from pathlib import Path
-from rich.console import Console
 
-from .core.config import ensure_default_config, load_config
-from .core.scaffold import run_process_scan_and_write_incident
-from .reports.html import render_report
-from .reports.pdf import render_pdf_from_incident
-from .reports.playbook import render_playbook_md, render_ticket_text
-from .reports.bundle import bundle_latest
-
-console = Console()
+# Subcommands import what they use inside their branch: the scan pipeline
+# (psutil, yara, imapclient, twilio), reportlab, jinja2 and rich are only
+# loaded by the commands that need them, which keeps `--help`, `report` and
+# `playbook` (and the frozen exe) quick to start.
+
+_CONSOLE = None
+
+def _console():
+    global _CONSOLE
+    if _CONSOLE is None:
+        from rich.console import Console
+        _CONSOLE = Console()
+    return _CONSOLE
+
+def _print_timings(incident_path: Path) -> None:
+    import json
+    from rich.table import Table
+    m = json.loads(Path(incident_path).read_text(encoding="utf-8")).get("metrics", {}) or {}
+    stages = m.get("stages", {}) or {}
+    table = Table(title="Scan timings")
+    table.add_column("Step")
+    table.add_column("Wall ms", justify="right")
+    table.add_column("CPU ms", justify="right")
+    table.add_column("Items", justify="right")
+    if m.get("trace_memory"):
+        table.add_column("Peak KiB", justify="right")
+    for name, st in (m.get("steps", {}) or {}).items():
+        row = [name, f"{st.get('wall_ms', 0):.1f}", f"{st.get('cpu_ms', 0):.1f}", str(st.get("items", ""))]
+        if m.get("trace_memory"):
+            row.append(f"{st.get('peak_kb', 0):.0f}")
+        table.add_row(*row)
+    table.add_section()
+    table.add_row("total", f"{m.get('total_wall_ms', 0):.1f}", f"{m.get('total_cpu_ms', 0):.1f}", "")
+    _console().print(table)
+    bad = {k: v.get("status") for k, v in stages.items() if v.get("status") != "ok"}
+    if bad:
+        _console().print("[red]Incomplete stages:[/red] " + ", ".join(f"{k} ({v})" for k, v in bad.items()))
 
 def main():
     parser = argparse.ArgumentParser(prog="kairos", description="Kairos A.I. — SOC Sidekick")
@@ -21,6 +49,21 @@ def main():
     scan = sub.add_parser("scan", help="Run a heuristic scan")
     scan.add_argument("--dry", action="store_true", help="Dry run: no outbound notifications")
     scan.add_argument("--enable-sms", action="store_true", help="Enable SMS for this run (overrides config to true)")
+    scan.add_argument("--timings", action="store_true", help="Print per-step timing/CPU/item metrics after the scan")
+    scan.add_argument("--trace-memory", action="store_true", help="Record peak memory per step (tracemalloc; runs stages one at a time)")
+    scan.add_argument("--sample-net", type=float, default=None, metavar="SECONDS", help="Sample connections for SECONDS to detect beaconing (overrides network.sample_seconds)")
+
+    # watch (daemon)
+    watch = sub.add_parser("watch", help="Monitor continuously; write an incident when findings change")
+    watch.add_argument("--dry", action="store_true", help="Dry run: no outbound notifications")
+    watch.add_argument("--duration", type=float, default=None, metavar="SECONDS", help="Stop after SECONDS (default: until Ctrl+C)")
+
+    # profile
+    prof = sub.add_parser("profile", help="Profile a command (cProfile, or pyinstrument if installed)")
+    prof.add_argument("target", choices=["scan"], help="What to profile")
+    prof.add_argument("--stage", default=None, help="Profile only this stage (processes, network, beacons, filesystem, email, persistence, yara)")
+    prof.add_argument("--top", type=int, default=30, help="Hot functions listed in the summary")
+    prof.add_argument("--engine", choices=["auto", "cprofile", "pyinstrument"], default="auto")
 
     # report (HTML)
     rep = sub.add_parser("report", help="Render latest HTML report")
@@ -45,24 +88,61 @@ def main():
     args = parser.parse_args()
 
     if args.init:
+        from .core.config import ensure_default_config
         cfg_path = ensure_default_config()
-        console.print(f"[bold green]Config ready:[/bold green] {cfg_path}")
+        _console().print(f"[bold green]Config ready:[/bold green] {cfg_path}")
 
     if args.cmd == "scan":
+        from .core.config import load_config
+        from .core.scaffold import run_process_scan_and_write_incident
         cfg = load_config()
         if getattr(args, "enable_sms", False):
             cfg.alerts["sms_enabled"] = True
-        out = run_process_scan_and_write_incident(cfg, dry=getattr(args, "dry", False))
-        console.print(f"[bold yellow]Scan complete[/bold yellow] → {out}")
+        out = run_process_scan_and_write_incident(cfg, dry=getattr(args, "dry", False), net_sample_seconds=getattr(args, "sample_net", None),
+                                                  trace_memory=True if getattr(args, "trace_memory", False) else None)
+        _console().print(f"[bold yellow]Scan complete[/bold yellow] → {out}")
+        if getattr(args, "timings", False):
+            _print_timings(out)
+
+    elif args.cmd == "watch":
+        from .core.config import load_config
+        from .core.watch import Watcher
+        cfg = load_config()
+        with Watcher(cfg, dry=getattr(args, "dry", False)) as watcher:
+            cadences = ", ".join(f"{k} {v:g}s" for k, v in watcher.cadences.items())
+            _console().print(f"[bold yellow]Watching[/bold yellow] ({cadences}) — Ctrl+C to stop")
+            try:
+                watcher.run(args.duration, on_write=lambda out: _console().print(f"[bold yellow]Incident[/bold yellow] → {out}"))
+            except KeyboardInterrupt:
+                pass
+        _console().print(f"[bold yellow]Watch stopped[/bold yellow] ({len(watcher.written)} incident(s) written)")
+
+    elif args.cmd == "profile":
+        from .core.config import load_config
+        from .core.profiling import profile_scan
+        cfg = load_config()
+        try:
+            out = profile_scan(cfg, stage=args.stage, top=args.top, engine=args.engine)
+        except (ValueError, RuntimeError) as e:
+            _console().print(f"[red]{e}[/red]")
+            return
+        _console().print(f"[bold cyan]Profile written[/bold cyan] → {out['profile']}")
+        _console().print(f"[bold cyan]Hot functions[/bold cyan] → {out['summary']}")
+        if out["truncated"]:
+            _console().print("[red]Timed out (partial profile):[/red] " + ", ".join(out["truncated"]))
 
     elif args.cmd == "report":
+        from .core.config import load_config
+        from .reports.html import render_report
         cfg = load_config()
         out = render_report(cfg)
-        console.print(f"[bold cyan]Report rendered[/bold cyan] → {out}")
+        _console().print(f"[bold cyan]Report rendered[/bold cyan] → {out}")
         if getattr(args, "open", False):
             webbrowser.open(Path(out).resolve().as_uri())
 
     elif args.cmd == "pdf":
+        from .core.config import load_config
+        from .reports.pdf import render_pdf_from_incident
         cfg = load_config()
         logs_dir = Path(cfg.paths.get("logs", "logs"))
         inc_dir = logs_dir / "incidents"
@@ -70,12 +150,14 @@ def main():
         for p in sorted(inc_dir.glob("incident_*.json")):
             latest = p
         if not latest:
-            console.print("[red]No incidents found. Run 'kairos scan' first.[/red]")
+            _console().print("[red]No incidents found. Run 'kairos scan' first.[/red]")
             return
         out = render_pdf_from_incident(latest, Path(cfg.paths.get("reports", "reports")))
-        console.print(f"[bold magenta]PDF written[/bold magenta] → {out}")
+        _console().print(f"[bold magenta]PDF written[/bold magenta] → {out}")
 
     elif args.cmd == "playbook":
+        from .core.config import load_config
+        from .reports.playbook import render_playbook_md, render_ticket_text
         cfg = load_config()
         logs_dir = Path(cfg.paths.get("logs", "logs"))
         inc_dir = logs_dir / "incidents"
@@ -83,26 +165,28 @@ def main():
         for p in sorted(inc_dir.glob("incident_*.json")):
             latest = p
         if not latest:
-            console.print("[red]No incidents found. Run 'kairos scan' first.[/red]")
+            _console().print("[red]No incidents found. Run 'kairos scan' first.[/red]")
             return
         reports_dir = Path(cfg.paths.get("reports", "reports"))
         md_path = render_playbook_md(latest, reports_dir)
         txt_path = render_ticket_text(latest, reports_dir)
-        console.print(f"[bold magenta]Playbook written[/bold magenta] → {md_path}")
-        console.print(f"[bold magenta]Ticket text written[/bold magenta] → {txt_path}")
+        _console().print(f"[bold magenta]Playbook written[/bold magenta] → {md_path}")
+        _console().print(f"[bold magenta]Ticket text written[/bold magenta] → {txt_path}")
         if getattr(args, "open", False):
             webbrowser.open(md_path.resolve().as_uri())
 
     elif args.cmd == "bundle":
+        from .core.config import load_config
+        from .reports.bundle import bundle_latest
         cfg = load_config()
         logs_dir = Path(cfg.paths.get("logs", "logs"))
         inc_dir = logs_dir / "incidents"
         reports_dir = Path(cfg.paths.get("reports", "reports"))
         try:
             zip_path = bundle_latest(reports_dir, inc_dir)
-            console.print(f"[bold green]Bundle created[/bold green] → {zip_path}")
+            _console().print(f"[bold green]Bundle created[/bold green] → {zip_path}")
         except FileNotFoundError:
-            console.print("[red]No incidents found. Run 'kairos scan' first.[/red]")
+            _console().print("[red]No incidents found. Run 'kairos scan' first.[/red]")
 
     elif args.cmd == "serve":
         host = getattr(args, "host", "127.0.0.1")
@@ -1,6 +1,5 @@
 import os
 from typing import Sequence
-from twilio.rest import Client
 from .base import Notifier, comma_list
 
 class TwilioSMS(Notifier):
@@ -13,6 +12,7 @@ class TwilioSMS(Notifier):
         if not self.sid or not self.token:
             raise RuntimeError("Twilio credentials not set in environment variables: TWILIO_ACCOUNT_SID / TWILIO_AUTH_TOKEN")
 
+        from twilio.rest import Client  # imported on first use: the SDK is slow to load
         self.client = Client(self.sid, self.token)
 
     def notify(self, subject: str, body: str) -> None:
@@ -25,6 +25,9 @@ pre { background: #111; color: #eee; padding: 1rem; border-radius: 8px; overflow
   <div class="card">
     <div><span class="badge">{{ incident.sev }}</span> <b>{{ incident.id }}</b></div>
     <p>{{ incident.summary }}</p>
+    {% if incident.incomplete_stages %}
+    <p><b>Partial scan:</b> {{ incident.incomplete_stages | join(", ") }} did not finish.</p>
+    {% endif %}
     <h3>Artifacts</h3>
     <ul>
       {% for a in incident.artifacts %}
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+import threading
 from pathlib import Path
 
 from fastapi import FastAPI, Request
@@ -56,10 +57,29 @@ def home(request: Request):
     tpl = ENV.get_template("home.html")
     return tpl.render(**context)
 
+# one IMAP login for the life of the server instead of one per scan
+# (the session serializes its own use; this lock only guards creating it)
+_IMAP_SESSION = None
+_IMAP_LOCK = threading.Lock()
+
+def _imap_session():
+    global _IMAP_SESSION
+    with _IMAP_LOCK:
+        if _IMAP_SESSION is None:
+            from ..core.scaffold import _load_cfg_dict
+            from ..collectors.email_imap import ImapSession
+            _IMAP_SESSION = ImapSession(_load_cfg_dict())
+        return _IMAP_SESSION
+
+@app.on_event("shutdown")
+def _close_imap():
+    if _IMAP_SESSION is not None:
+        _IMAP_SESSION.close()
+
 @app.post("/scan")
 def scan():
     cfg = load_config()
-    run_process_scan_and_write_incident(cfg, dry=True)  # safe default
+    run_process_scan_and_write_incident(cfg, dry=True, imap_session=_imap_session())  # safe default
     return RedirectResponse(url="/report", status_code=303)
 
 @app.get("/report", response_class=HTMLResponse)
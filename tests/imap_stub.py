@@ -0,0 +1,78 @@
+"""Minimal IMAP4rev1 server for ImapSession tests: plain-text messages, UID SEARCH/FETCH, IDLE."""
+import re
+import socketserver
+import threading
+
+class Mailbox:
+    def __init__(self):
+        self.uids = set()
+        self.uidvalidity = 1
+        self.fail_fetch = set()  # UIDs whose FETCH answers NO
+        self.fetches = []        # UID lists of each FETCH command
+        self.lock = threading.Lock()
+
+    def add(self, *uids):
+        with self.lock:
+            self.uids.update(uids)
+
+class _Handler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True
+    def _w(self, s):
+        self.wfile.write(s if isinstance(s, bytes) else s.encode())
+
+    def handle(self):
+        box = self.server.box
+        self._w("* OK [CAPABILITY IMAP4rev1 IDLE] stub ready\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            text = line.decode().strip()
+            tag, cmd, *rest = text.split(" ")
+            cmd = cmd.upper()
+            if cmd == "CAPABILITY":
+                self._w("* CAPABILITY IMAP4rev1 IDLE\r\n")
+            elif cmd in ("SELECT", "EXAMINE"):
+                self._w(f"* {len(box.uids)} EXISTS\r\n* OK [UIDVALIDITY {box.uidvalidity}] ok\r\n")
+            elif cmd == "IDLE":
+                self._w("+ idling\r\n")
+                self.rfile.readline()  # DONE
+            elif cmd == "UID" and rest[0].upper() == "SEARCH":
+                m = re.search(r"UID (\d+):\*", text)
+                lo = int(m.group(1)) if m else 1
+                with box.lock:
+                    # like a real server, "n:*" always matches the highest UID
+                    uids = sorted(u for u in box.uids if u >= lo) or ([max(box.uids)] if box.uids else [])
+                self._w("* SEARCH " + " ".join(map(str, uids)) + "\r\n")
+            elif cmd == "UID" and rest[0].upper() == "FETCH":
+                uids = [int(x) for x in rest[1].split(",")]
+                if box.fail_fetch & set(uids):
+                    self._w(f"{tag} NO fetch failed\r\n")
+                    continue
+                box.fetches.append(uids)
+                for i, u in enumerate(uids, 1):
+                    if "BODYSTRUCTURE" in text:
+                        self._w(f'* {i} FETCH (UID {u} ENVELOPE (NIL "m{u}" (("A" NIL "a" "example.com")) NIL NIL '
+                                f'NIL NIL NIL NIL NIL) BODYSTRUCTURE ("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL '
+                                f'"7BIT" 20 1 NIL NIL NIL NIL))\r\n')
+                    else:
+                        body = f"hello {u}".encode()
+                        self._w(f"* {i} FETCH (UID {u} BODY[1]<0> {{{len(body)}}}\r\n".encode() + body + b")\r\n")
+            elif cmd == "LOGOUT":
+                self._w("* BYE\r\n")
+                self._w(f"{tag} OK done\r\n")
+                return
+            self._w(f"{tag} OK done\r\n")
+
+class StubServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.box = Mailbox()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+from kairos.core.hashcache import HashCache
+from kairos.core.mailindex import MailboxIndex
+from kairos.core.verdicts import VerdictCache
+
+def test_hash_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = iter(range(100, 200))
+    monkeypatch.setattr("kairos.core.hashcache.time.time", lambda: next(clock))
+    f = tmp_path / "f"
+    f.write_text("x")
+    st = os.stat(f)
+    with HashCache(tmp_path / "h.sqlite3", max_entries=2) as cache:
+        for p in ("a", "b"):
+            cache.put(p, st, {"sha256": p})
+        cache.flush()
+        assert cache.get("a", st) == {"sha256": "a"}  # a is now the most recently used
+        cache.put("c", st, {"sha256": "c"})
+        cache.flush()
+    with HashCache(tmp_path / "h.sqlite3", max_entries=2) as cache:
+        assert [p for p in "abc" if cache.get(p, st)] == ["a", "c"]
+
+def test_verdict_cache_drops_other_rulesets_and_caps(tmp_path):
+    with VerdictCache(tmp_path / "v.sqlite3", ruleset="r1", max_entries=10) as cache:
+        cache.put("s1", [("rule", "ns")])
+    with VerdictCache(tmp_path / "v.sqlite3", ruleset="r1", max_entries=1) as cache:
+        assert cache.get("s1") == [("rule", "ns")]
+        cache.put("s2", [])
+    with VerdictCache(tmp_path / "v.sqlite3", ruleset="r2") as cache:
+        assert cache.get("s1") is None and cache.get("s2") is None
+
+def test_mailbox_index_marks_and_forgets(tmp_path):
+    with MailboxIndex(tmp_path / "m.sqlite3") as index:
+        index.mark([("a.eml", 1, 10), ("b.eml", 2, 20)])
+        assert index.new_files([("a.eml", 1, 10), ("b.eml", 2, 21), ("c.eml", 3, 30)]) == [
+            ("b.eml", 2, 21), ("c.eml", 3, 30)]
+        index.forget_missing(["b.eml"])
+        assert index.new_files([("a.eml", 1, 10)]) == [("a.eml", 1, 10)]
+    with pytest.raises(Exception):
+        index.new_files([])  # closed
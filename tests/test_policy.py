@@ -0,0 +1,43 @@
+from kairos.core.policy import apply_policy, load_policy
+
+def _policy(**deny):
+    return load_policy({}, {"policy": {"deny": deny}})
+
+def _incident(*arts):
+    return {"sev": "P5", "summary": "", "artifacts": list(arts)}
+
+def test_deny_keywords_are_per_policy():
+    strict = _policy(process_cmdline_keywords=["-enc"])
+    lax = _policy(process_cmdline_keywords=["mimikatz"])
+    proc = {"type": "process", "value": "powershell.exe (pid 1) :: powershell -enc SQBFAFgA"}
+    assert apply_policy(_incident(proc), strict)["sev"] == "P1"
+    assert apply_policy(_incident(proc), lax)["sev"] == "P2"
+    assert apply_policy(_incident(proc), strict)["sev"] == "P1"  # not replaced by the later policy
+
+def _allow(*entries):
+    return load_policy({}, {"policy": {"allow": {"ips_or_domains": list(entries)}}})
+
+def _email_url(url, sender="a@mail.test"):
+    from kairos.analyzers.email_rules import url_host
+    return {"type": "email:url", "value": f"{sender} | hi | {url}", "host": url_host(url),
+            "sender_domain": sender.rpartition("@")[2]}
+
+def test_email_allow_is_a_domain_suffix_match():
+    policy = _allow("evil.com")
+    kept = apply_policy(_incident(_email_url("http://evil.com/x"), _email_url("http://cdn.evil.com/x"),
+                                  _email_url("http://notevil.com/x"), _email_url("http://evil.com.attacker.ru/x")),
+                        policy)["artifacts"]
+    assert [a["host"] for a in kept] == ["notevil.com", "evil.com.attacker.ru"]
+
+def test_email_allow_by_sender_domain_and_ip():
+    policy = _allow("partner.example", "203.0.113.0/24")
+    arts = [_email_url("http://bit.ly/x", sender="ops@mail.partner.example"),
+            _email_url("http://203.0.113.9/x"),
+            _email_url("http://bit.ly/y", sender="x@partner.example.evil")]
+    assert [a["value"] for a in apply_policy(_incident(*arts), policy)["artifacts"]] == [arts[2]["value"]]
+
+def test_email_allow_parses_hosts_from_older_artifacts():
+    policy = _allow("evil.com")
+    old = [{"type": "email:url", "value": "a@mail.test | hi | http://www.evil.com/x"},
+           {"type": "email:url", "value": "a@mail.test | hi | http://notevil.com/x"}]
+    assert apply_policy(_incident(*old), policy)["artifacts"] == [old[1]]
@@ -0,0 +1,25 @@
+import threading
+
+from kairos.core.profiling import _Collector
+from kairos.core.stages import StageRunner
+
+def test_timed_out_stage_is_truncated_and_next_stage_profiled():
+    coll = _Collector("cprofile", None)
+    release = threading.Event()
+    runner = StageRunner(serial=True, wrap=coll.wrap)
+    runner.add("slow", lambda: release.wait(5), timeout=0.2)
+    runner.add("fast", lambda: sum(range(1000)))
+    runner.run()
+    release.set()
+    coll.stop_abandoned()
+    assert runner.stats()["slow"]["status"] == "timeout"
+    assert runner.result("fast") == sum(range(1000))
+    assert coll.truncated == ["slow"]
+    assert sorted(coll.stages) == ["fast", "slow"]
+
+def test_only_wraps_selected_stage():
+    coll = _Collector("cprofile", "b")
+    fn = lambda: 1
+    assert coll.wrap("a", fn) is fn
+    assert coll.wrap("b", fn)() == 1
+    assert coll.stages == ["b"]
@@ -0,0 +1,48 @@
+import json
+import os
+import time
+
+from kairos.core import scaffold
+from kairos.core.config import AppConfig
+
+_EML = b"From: a@example.com\r\nTo: b@example.com\r\nSubject: hello\r\n\r\nbody\r\n"
+
+def test_email_timeout_does_not_mark_mail(tmp_path, monkeypatch):
+    mailbox = tmp_path / "mailbox"
+    mailbox.mkdir()
+    msg = mailbox / "one.eml"
+    msg.write_bytes(_EML)
+    old = time.time() - 3600
+    os.utime(msg, (old, old))
+    (tmp_path / "fs").mkdir()
+    monkeypatch.setattr(scaffold, "_load_cfg_dict", lambda: {
+        "yara": {"enabled": False},
+        "filesystem": {"roots": [str(tmp_path / "fs")]},
+        "email": {"local_eml_dir": str(mailbox)},
+        "persistence": {"timeout_seconds": 1},
+        "scan": {"timeouts": {"email": 0.3}},
+    })
+    cfg = AppConfig(tier="basic", alerts={}, paths={"logs": str(tmp_path / "logs")})
+    late = []
+
+    def slow(emails, index):
+        time.sleep(1.0)
+        late.append(len(emails))
+        return []
+
+    monkeypatch.setattr(scaffold, "analyze_emails", slow)
+    out = scaffold.run_process_scan_and_write_incident(cfg, dry=True)
+    assert "email" in json.loads(out.read_text(encoding="utf-8"))["incomplete_stages"]
+    deadline = time.monotonic() + 5
+    while not late and time.monotonic() < deadline:  # the timed-out stage finishes late
+        time.sleep(0.05)
+    assert late == [1]
+
+    seen = []
+    monkeypatch.setattr(scaffold, "analyze_emails", lambda emails, index: seen.extend(emails) or [])
+    scaffold.run_process_scan_and_write_incident(cfg, dry=True)
+    assert [m.subject for m in seen] == ["hello"]
+
+    seen.clear()
+    scaffold.run_process_scan_and_write_incident(cfg, dry=True)
+    assert seen == []  # delivered once, then marked
@@ -0,0 +1,34 @@
+import threading
+
+from kairos.core.stages import Lease, StageRunner
+
+def test_lease_waits_for_timed_out_stage():
+    released = []
+    lease = Lease(lambda: released.append(True))
+    release = threading.Event()
+    finished = threading.Event()
+
+    def slow():
+        with lease.use():
+            release.wait(5)
+        finished.set()
+
+    runner = StageRunner()
+    runner.add("slow", slow, timeout=0.1)
+    runner.run()
+    assert runner.incomplete == ["slow"]
+    lease.close()
+    assert released == []  # the stage thread is still using it
+    release.set()
+    assert finished.wait(2)
+    assert released == [True]
+
+def test_lease_releases_once_when_unused():
+    released = []
+    lease = Lease(lambda: released.append(True))
+    with lease.use():
+        pass
+    assert released == []
+    lease.close()
+    lease.close()
+    assert released == [True]
@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pytest
+
+from kairos.core.config import AppConfig
+from kairos.core.watch import Watcher, artifact_key
+
+@pytest.fixture
+def make_watcher(tmp_path):
+    made = []
+
+    def make(cadences, **watch_cfg):
+        cfg = AppConfig(tier="basic", alerts={}, paths={"logs": str(tmp_path / "logs")})
+        w = Watcher(cfg, dry=True, cfg_dict={
+            "yara": {"enabled": False},
+            "watch": dict({"cadence_seconds": {n: 0 for n in ("processes", "network", "filesystem",
+                                                              "email", "persistence")}}, **watch_cfg),
+        }, cadences=cadences)
+        made.append(w)
+        return w
+
+    yield make
+    for w in made:
+        w.close(grace=1.0)
+
+def _persist(*values):
+    return lambda: [{"type": "persistence", "value": v} for v in values]
+
+def test_artifact_key_uses_remote_endpoint_for_network():
+    a = {"type": "network", "value": "pid=1 x 10.0.0.5:50000 -> 1.2.3.4:443", "raddr": "1.2.3.4", "rport": 443}
+    b = dict(a, value="pid=1 x 10.0.0.5:50001 -> 1.2.3.4:443")
+    assert artifact_key(a) == artifact_key(b) == ("network", "1.2.3.4:443")
+    assert artifact_key({"type": "file", "value": "c:\\x.ps1"}) == ("file", "c:\\x.ps1")
+
+def test_cadence_and_not_relaunched_while_running(make_watcher):
+    w = make_watcher({"persistence": 10})
+    calls = []
+    w._persistence = lambda: calls.append(1) or []
+    w.tick(now=100.0)
+    assert w.drain(2.0)
+    w.tick(now=105.0)  # not due yet
+    w.drain(2.0)
+    assert len(calls) == 1
+    assert w.next_due["persistence"] == 110.0
+
+    release = threading.Event()
+    w._persistence = lambda: release.wait(5) and []
+    w.tick(now=110.0)
+    w.tick(now=125.0)  # due again, but still running
+    release.set()
+    assert w.drain(2.0)
+    assert w.next_due["persistence"] == 120.0
+
+def test_slow_collector_does_not_stall_others(make_watcher):
+    w = make_watcher({"processes": 1, "filesystem": 300})
+    runs = []
+    release = threading.Event()
+    w._processes = lambda: runs.append(time.monotonic()) or {"hits": [], "chains": []}
+    w._filesystem = lambda: release.wait(5) and {"hits": [], "yara": []}
+    t0 = time.monotonic()
+    for i in range(4):
+        w.tick(now=1000.0 + i)  # returns without waiting for filesystem
+        time.sleep(0.05)
+    assert len(runs) == 4
+    assert time.monotonic() - t0 < 2.0
+    assert "filesystem" in w._running
+    release.set()
+    assert w.drain(2.0)
+
+def test_timeout_reported_as_incomplete(make_watcher):
+    w = make_watcher({"persistence": 60})
+    w.timeouts = {"persistence": 5}
+    release = threading.Event()
+    w._persistence = lambda: release.wait(5) and []
+    w.tick(now=0.0)
+    w.tick(now=6.0)
+    assert w.status["persistence"]["status"] == "timeout"
+    assert w.compose()["incomplete_stages"] == ["persistence"]
+    release.set()
+    w.drain(2.0)
+    assert w.status["persistence"]["status"] == "ok"
+
+def test_incident_written_only_when_artifacts_change(make_watcher):
+    w = make_watcher({"persistence": 1})
+    w._persistence = _persist("run key a")
+    w.tick(now=0.0)
+    w.drain(2.0)
+    first = w.tick(now=0.5)
+    assert first is not None and first.exists()
+
+    w.tick(now=1.0)
+    w.drain(2.0)
+    assert w.tick(now=1.5) is None  # same artifacts
+
+    w._persistence = _persist("run key a", "run key b")
+    w.tick(now=2.0)
+    w.drain(2.0)
+    assert w.tick(now=2.5) is not None
+    assert len(w.written) == 2
+
+def test_email_findings_are_sticky_and_bounded(make_watcher):
+    w = make_watcher({"email": 1}, email_artifacts=3)
+    batches = iter([["a", "b"], ["c"], [], ["d", "b"]])
+    w._email = lambda: [{"type": "email:url", "value": v} for v in next(batches)]
+    values = []
+    for i in range(4):
+        w.tick(now=float(i))
+        w.drain(2.0)
+        values.append([a["value"] for a in w.state["email"]])
+    assert values == [["a", "b"], ["a", "b", "c"], ["a", "b", "c"], ["c", "d", "b"]]
+
+def test_close_leaves_caches_held_by_running_collector(make_watcher):
+    w = make_watcher({"filesystem": 300})
+    release = threading.Event()
+    w._filesystem = lambda: release.wait(5) and {"hits": [], "yara": []}
+    w.tick(now=0.0)
+    w.close(grace=0.1)
+    # still open: the running sweep may use it
+    w.stages.hash_cache.flush()
+    with pytest.raises(Exception):
+        w.stages.mail_index.new_files([])
+    release.set()
+    assert w.drain(2.0)
+
+def test_first_incident_waits_for_every_collector(make_watcher):
+    w = make_watcher({"processes": 10, "persistence": 10})
+    release = threading.Event()
+    w._processes = lambda: {"hits": [], "chains": []}
+    w._persistence = lambda: release.wait(5) and [{"type": "persistence", "value": "x"}]
+    w.tick(now=0.0)
+    time.sleep(0.1)
+    assert w.tick(now=0.5) is None  # persistence has not reported yet
+    release.set()
+    w.drain(2.0)
+    assert w.tick(now=1.0) is not None
+    assert len(w.written) == 1
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+yara = pytest.importorskip("yara")
+
+from kairos.analyzers.yara_scan import YaraScanner, scan_files_with_yara
+from kairos.collectors.filesystem import sweep_recent_files
+
+RULE = 'rule has_marker { strings: $a = "MARKER" condition: $a }'
+
+class _Verdicts:
+    hits = 0
+
+    def __init__(self):
+        self.puts = {}
+
+    def get(self, sha256):
+        return None
+
+    def put(self, sha256, matches):
+        self.puts[sha256] = matches
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "a.ps1").write_text("MARKER")
+    (root / "b.ps1").write_text("clean")
+    return root
+
+def test_deadline_skips_are_not_requeued(tree):
+    scanner = YaraScanner(yara.compile(source=RULE), deadline=time.monotonic() - 1)
+    hits = sweep_recent_files([tree], scanner=scanner)
+    assert all(h.yara_matches is None and h.yara_attempted for h in hits)
+    scan_files_with_yara(hits, rules_dir=tree, scanner=scanner)
+    assert scanner.stats()["skipped_deadline"] == 2
+    assert scanner.stats()["scanned"] == 0
+
+def test_hits_from_outside_the_sweep_are_scanned(tree):
+    scanner = YaraScanner(yara.compile(source=RULE))
+    hits = sweep_recent_files([tree])  # no scanner in the sweep
+    arts = scan_files_with_yara(hits, rules_dir=tree, scanner=scanner)
+    assert [a["value"].rsplit(" :: ", 1)[1] for a in arts] == ["has_marker (default)"]
+    assert scanner.stats()["scanned"] == 2
+
+def test_failed_scan_is_not_cached_as_clean(tree):
+    class Failing:
+        def match(self, **kw):
+            raise yara.TimeoutError("slow")
+
+    verdicts = _Verdicts()
+    scanner = YaraScanner(Failing(), verdicts=verdicts)
+    hits = sweep_recent_files([tree], scanner=scanner)
+    assert all(h.yara_matches == [] for h in hits)
+    assert verdicts.puts == {}
+    assert scanner.stats()["timeouts"] == 2
+    ok = YaraScanner(yara.compile(source=RULE), verdicts=verdicts)
+    sweep_recent_files([tree], scanner=ok)
+    assert len(verdicts.puts) == 2
+
+def test_matches_bounded_by_workers():
+    class _Rules:
+        active = peak = 0
+        lock = threading.Lock()
+
+        def match(self, **kw):
+            with self.lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            time.sleep(0.02)
+            with self.lock:
+                self.active -= 1
+            return []
+
+    rules = _Rules()
+    scanner = YaraScanner(rules, workers=2)
+    threads = [threading.Thread(target=scanner.match_buffer, args=(b"x", f"f{i}")) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert rules.peak == 2
+    assert scanner.stats()["scanned"] == 8